@@ -6,6 +6,8 @@
 #define LED_PIN     13   // LED de actividad (verde)
 #define LED_ERROR    12   // LED rojo de error 
 #define BAUDRATE  9600
+#define MAX_BINARIO 32   // bytes de una trama binaria (con COBS) como máximo
+#define MAX_TRAMA  256   // bytes de una trama de texto como máximo
 
 SoftwareSerial mySerial(10, 11);  // RX, TX con Satélite
 
@@ -33,8 +35,10 @@ bool verificarYQuitarChecksum(String &frame) {
   csStr.trim();
   if (csStr.length() == 0) return false;
 
-  int csRecv = csStr.toInt();  // checksum recibido en DECIMAL
-  if (csRecv < 0 || csRecv > 255) return false;
+  // checksum recibido en HEXADECIMAL, igual que lo envía enviarConChecksum ("*HH")
+  char *fin;
+  long csRecv = strtol(csStr.c_str(), &fin, 16);
+  if (*fin != '\0' || csRecv < 0 || csRecv > 255) return false;
 
   uint8_t csCalc = calcularChecksum(data);
   if (csCalc != (uint8_t)csRecv) {
@@ -68,12 +72,37 @@ void loop() {
   // Satélite <--> Estación tierra
 // ================================
   String com ="";    // se declara como nulo para que exista tmb fuera del bucle
-  String com_sat = "";
+  static String com_sat = "";       // trama de texto a medio leer (se completa en la siguiente vuelta)
+  static bool enBinario = false;    // dentro de una trama binaria (0x00 ... 0x00)
+  static uint8_t largoBinario = 0;
   while (mySerial.available()) {
+    int c = mySerial.read();
+
+    // Tramas binarias (16:1:8:1|): 0x00 + COBS + 0x00. Un String no puede guardar
+    // 0x00, así que se reenvían byte a byte tal cual; el checksum lo comprueba Python
+    if (c == 0 || enBinario) {
+      Serial.write((uint8_t)c);
+      if (c == 0) {
+        if (!enBinario) {
+          com_sat = "";             // una trama de texto cortada por la binaria ya no se completa
+        }
+        enBinario = !enBinario;
+        largoBinario = 0;
+      } else if (++largoBinario > MAX_BINARIO) {
+        enBinario = false;          // se perdió el 0x00 de cierre: volvemos a texto
+      }
+      continue;
+    }
 
     // Lee y envia de sat --> Python
-    com_sat = mySerial.readStringUntil('|');   // toda la comuniación pasa por "com_sat" para leerse o enviar
-    
+    if (c != '|') {
+      com_sat += (char)c;           // toda la comuniación pasa por "com_sat" para leerse o enviar
+      if (com_sat.length() > MAX_TRAMA) {
+        com_sat = "";
+      }
+      continue;
+    }
+
     if (com_sat.length() > 0) {
 
       if (!verificarYQuitarChecksum(com_sat)) {
@@ -82,6 +111,7 @@ void loop() {
         Serial.print("CHKERR:");        // hay que corregir este error para que se implemente en el protocolo
         Serial.print(com_sat);
         Serial.print('|');
+        com_sat = "";
         continue;  // NO reenviamos la trama corrupta
       }
 
@@ -99,6 +129,7 @@ void loop() {
         // se apaga si no hay error
         digitalWrite(LED_ERROR, LOW);
       }
+    com_sat = "";
     }
   
 
@@ -54,6 +54,15 @@ int indiceTemp = 0;
 int numTemp = 0;
 float mediaTemp = 0.0;
 
+// Tramas binarias (16:1:8:1|): 0x00 + COBS(tipo, largo, datos, checksum) + 0x00
+// Valores en coma fija y little-endian (ver TRAMAS BINARIAS en protocolo.py)
+bool formatoBinario = false;      // false = tramas de datos en ASCII (por defecto)
+const uint8_t BIN_TH    = 0x01;   // temp, hum, media: int16 en centésimas
+const uint8_t BIN_SERVO = 0x02;   // ángulo del servo: uint8
+const uint8_t BIN_RADAR = 0x03;   // ángulo: uint8, distancia: uint16 en décimas de cm
+const uint8_t BIN_ERROR = 0x80;   // | grupo. Dato: código int8 (16:<grupo>:<código>|)
+const int16_t BIN_SIN_MEDIA = 0x7FFF;
+
 
 // ==========================================================
 // Funciones
@@ -92,8 +101,10 @@ bool verificarYQuitarChecksum(String &frame) {
 
   if (csStr.length() == 0) return false;
 
-  int csRecv = csStr.toInt();
-  if (csRecv < 0 || csRecv > 255) return false;
+  // checksum recibido en HEXADECIMAL, igual que lo envía enviarConChecksum ("*HH")
+  char *fin;
+  long csRecv = strtol(csStr.c_str(), &fin, 16);
+  if (*fin != '\0' || csRecv < 0 || csRecv > 255) return false;
 
   uint8_t csCalc = calcularChecksum(data);
   if (csCalc != (uint8_t)csRecv) {
@@ -104,6 +115,52 @@ bool verificarYQuitarChecksum(String &frame) {
   return true;
 }
 
+// Funciones para las tramas binarias
+void escribirInt16(uint8_t *p, int16_t v) {
+  p[0] = v & 0xFF;          // little-endian
+  p[1] = (v >> 8) & 0xFF;
+}
+
+void enviarBinario(uint8_t tipo, const uint8_t *datos, uint8_t largo) {
+  uint8_t paquete[12];      // tipo + largo + datos (máx. 6) + checksum
+  paquete[0] = tipo;
+  paquete[1] = largo;
+  uint8_t cs = tipo + largo;
+  for (uint8_t i = 0; i < largo; i++) {
+    paquete[2 + i] = datos[i];
+    cs += datos[i];
+  }
+  paquete[2 + largo] = cs;  // misma suma que calcularChecksum
+  uint8_t n = largo + 3;
+
+  // COBS: cada 0x00 se cambia por la distancia hasta el siguiente, así el
+  // único 0x00 en el enlace es el delimitador (bloques de menos de 254 bytes)
+  uint8_t salida[14];
+  uint8_t pos_codigo = 0;
+  uint8_t codigo = 1;
+  uint8_t j = 1;
+  for (uint8_t i = 0; i < n; i++) {
+    if (paquete[i] == 0) {
+      salida[pos_codigo] = codigo;
+      pos_codigo = j++;
+      codigo = 1;
+    } else {
+      salida[j++] = paquete[i];
+      codigo++;
+    }
+  }
+  salida[pos_codigo] = codigo;
+
+  mySerial.write((uint8_t)0);
+  mySerial.write(salida, j);
+  mySerial.write((uint8_t)0);
+}
+
+void enviarErrorBinario(uint8_t grupo, int8_t codigo) {
+  uint8_t dato = (uint8_t)codigo;
+  enviarBinario(BIN_ERROR | grupo, &dato, 1);
+}
+
 
 long medirPulso() {
   digitalWrite(TRIG_PIN, LOW);
@@ -236,7 +293,7 @@ void decodificarComando(const String &com_sat, int &c1, int &c2, int &c3, long &
 void enviarMensajeTexto(const String &msg) {
   String frame = "16:0:";   // frame incluye todo el contenido de comunicación
   frame += msg;
-  enviarConChecksum;
+  enviarConChecksum(frame);
 }
 
 
@@ -347,6 +404,20 @@ void loop() {
             enviarMensajeTexto("Satélite: periodo GLOBAL fuera de rango (500-10000 ms o 0 para desactivar)");
           }
         }
+
+        // 16:1:8:<formato>|  --> tramas de datos en ASCII (0) o en binario (1)
+        // Los mensajes de texto (16:0) siempre van en ASCII
+        else if (c2 == 8) {
+          if (c3 == 0 || c3 == 1) {
+            formatoBinario = (c3 == 1);
+            String msg = "Satélite: formato de tramas = ";
+            msg += c3;
+            msg += formatoBinario ? " (binario)" : " (ASCII)";
+            enviarMensajeTexto(msg);
+          } else {
+            enviarMensajeTexto("Satélite: formato de tramas fuera de rango (0 ASCII, 1 binario)");
+          }
+        }
       }
 
       // ======================================================
@@ -368,10 +439,14 @@ void loop() {
             inicioManual = ahora;
 
             // Confirmación numérica a Tierra: 16:2:0:<anguloServo>|
-            mySerial.print("16:2:0:");
-            mySerial.print(nuevoAnguloServo);
-            mySerial.print("|");
-            enviarConChecksum(frame);
+            if (formatoBinario) {
+              uint8_t dato = (uint8_t)nuevoAnguloServo;
+              enviarBinario(BIN_SERVO, &dato, 1);
+            } else {
+              String frame = "16:2:0:";
+              frame += nuevoAnguloServo;
+              enviarConChecksum(frame);
+            }
 
             // Mensaje de texto 16:0:... para Python
             String msg = "Satélite: servo movido a ";
@@ -380,7 +455,11 @@ void loop() {
             enviarMensajeTexto(msg);
           } else {
             // Ángulo fuera de rango: 16:2:-1| + mensaje 16:0:...
-            mySerial.print("16:2:-1|");
+            if (formatoBinario) {
+              enviarErrorBinario(2, -1);
+            } else {
+              enviarConChecksum("16:2:-1");
+            }
             enviarMensajeTexto("Satélite: ángulo de servo fuera de rango (-90 a 90)");
           }
         }
@@ -402,7 +481,11 @@ void loop() {
       Serial.println();
       
       // 16:1:-1| Error con la lectura del sensor de temperatura y humedad
-      mySerial.print("16:1:-1|");
+      if (formatoBinario) {
+        enviarErrorBinario(1, -1);
+      } else {
+        enviarConChecksum("16:1:-1");
+      }
     } else {
       // Actualizamos media solo si se calcula en el satélite
       if (calcularMediaEnSatelite) {
@@ -414,24 +497,30 @@ void loop() {
 
       digitalWrite(LED_PIN, HIGH);
 
-      // 16:1:01| dato Temperatura (envío regular)
-      mySerial.print("16:1:01:");
-      mySerial.print(t, 2);
-      mySerial.print("|");
-      enviarConChecksum(frame);
-
-      // 16:1:02| dato Humedad (envío regular)
-      mySerial.print("16:1:02:");
-      mySerial.print(h, 2);
-      mySerial.print("|");
-      enviarConChecksum(frame);
-
-      // 16:1:03| dato media temperatura (solo si la calcula el satélite)
-      if (calcularMediaEnSatelite) {
-        mySerial.print("16:1:03:");
-        mySerial.print(mediaTemp, 2);
-        mySerial.print("|");
-        enviarConChecksum(frame);
+      if (formatoBinario) {
+        // T, H y media en una sola trama binaria (12 bytes en lugar de unos 42)
+        uint8_t datos[6];
+        escribirInt16(datos, (int16_t)round(t * 100));
+        escribirInt16(datos + 2, (int16_t)round(h * 100));
+        escribirInt16(datos + 4, calcularMediaEnSatelite ? (int16_t)round(mediaTemp * 100) : BIN_SIN_MEDIA);
+        enviarBinario(BIN_TH, datos, 6);
+      } else {
+        // 16:1:01| dato Temperatura (envío regular)
+        String frame01 = "16:1:01:";
+        frame01 += String(t, 2);
+        enviarConChecksum(frame01);
+
+        // 16:1:02| dato Humedad (envío regular)
+        String frame02 = "16:1:02:";
+        frame02 += String(h, 2);
+        enviarConChecksum(frame02);
+
+        // 16:1:03| dato media temperatura (solo si la calcula el satélite)
+        if (calcularMediaEnSatelite) {
+          String frame03 = "16:1:03:";
+          frame03 += String(mediaTemp, 2);
+          enviarConChecksum(frame03);
+        }
       }
 
       digitalWrite(LED_PIN, LOW);
@@ -471,15 +560,27 @@ void loop() {
 
   if (distancia < 0) {
     // 16:3:-2| Error lectura distancia
-    mySerial.print("16:3:-2|");
-    enviarConChecksum(frame);
+    if (formatoBinario) {
+      enviarErrorBinario(3, -2);
+    } else {
+      enviarConChecksum("16:3:-2");
+    }
+  } else if (formatoBinario) {
+    // 16:3:0:<angulo>:<distancia>| en binario: ángulo uint8 + distancia en décimas de cm
+    uint8_t datos[3];
+    datos[0] = (uint8_t)angulo;
+    uint16_t d10 = (uint16_t)round(distancia * 10);
+    datos[1] = d10 & 0xFF;
+    datos[2] = (d10 >> 8) & 0xFF;
+    enviarBinario(BIN_RADAR, datos, 3);
+
+    Serial.println(distancia); // debug para comprobar si funciona el sensor
   } else {
     // 16:3:0:<angulo>:<distancia>| Envío regular de distancia
-    mySerial.print("16:3:0:");
-    mySerial.print(angulo);
-    mySerial.print(":");
-    mySerial.print(distancia, 1);
-    mySerial.print("|");
+    String frame = "16:3:0:";
+    frame += angulo;
+    frame += ":";
+    frame += String(distancia, 1);
     enviarConChecksum(frame);
 
     Serial.println(distancia); // debug para comprobar si funciona el sensor
@@ -1,69 +1,93 @@
-import serial
+from metricas import CronometroArranque
+arranque = CronometroArranque()   # tiempos de cada fase del arranque (se escriben en el log)
+
+import os
 import threading
 import time
 import tkinter as tk
 from tkinter import ttk, messagebox
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import matplotlib.pyplot as plt
 import numpy as np
 
 import logging
 
-# Configuración básica
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    filename="estacion_tierra.log",   # Archivo donde se guardarán los eventos
-    filemode="a"              # 'a' = append (agregar), 'w' = overwrite (sobrescribir)
+import comandos
+import protocolo
+import registro
+from exportacion import ExportadorTelemetria, exportar_ventana
+from grabacion import GrabadorTelemetria
+from metricas import ServidorMetricas, colector_registro
+from nucleo import EstacionTierra
+from transporte import TransporteAsync, crear_backend
+from render import PlanificadorRender, DibujoBlit, ContadorFrames, PanelMensajes, BannerAlertas
+
+arranque.marcar("imports")
+
+# Registro en archivo desde un hilo propio, por lotes y con rotación
+# (el hilo de recepción nunca espera al disco), ver registro.py
+registro.configurar_registro(
+    "estacion_tierra.log",    # Archivo donde se guardarán los eventos
+    max_bytes=5_000_000,      # rota al llegar a 5 MB ...
+    copias=5                  # ... y guarda estacion_tierra.log.1 ... .5
 )
 
 
 # La estación de Tierra se encarga de comunicarse con el satélite.
-estacion_tierra = 'COM3'      # Puerto de la estación de Tierra
+estacion_tierra = 'COM3'      # Puerto de la estación de Tierra ("simulador"/"pty"/"loopback" para pruebas,
+                              # "grabacion:pase.tlm@10" para reproducir un pase a 10x)
 BAUDRATE = 9600
-com = serial.Serial(estacion_tierra, BAUDRATE, timeout=1)
-time.sleep(2)
+CHECKSUM_COMANDOS = None      # "suma" -> los comandos se envían como 16:x:y*HH| (verificarYQuitarChecksum)
+ARCHIVO_GRABACION = None      # p. ej. "pase.tlm": graba todas las tramas recibidas (grabacion.py)
+DIRECTORIO_EXPORTACION = "exportacion"  # series T/H y radar por bloques (exportacion.py)
+PUERTO_METRICAS = None        # p. ej. 9108 -> http://localhost:9108/metrics y /perfil/iniciar|detener (metricas.py)
+transporte = TransporteAsync(crear_backend(estacion_tierra, BAUDRATE))
+
+# Estado y recepción (sin interfaz) en nucleo.py; este archivo es solo la GUI
+estacion = EstacionTierra(transporte, ventana_puntos=7, max_escala=30,
+                          checksum_comandos=CHECKSUM_COMANDOS)
+grabador = GrabadorTelemetria(ARCHIVO_GRABACION, estacion) if ARCHIVO_GRABACION else None
+exportador = ExportadorTelemetria(DIRECTORIO_EXPORTACION, estacion)
+estacion.metricas.registrar_colector(colector_registro)
+servidor_metricas = ServidorMetricas(estacion.metricas, PUERTO_METRICAS).iniciar() if PUERTO_METRICAS else None
+# Tiempo de dibujado de cada frame (gráfica "TH"/"radar", tipo "completo"/"blit")
+tiempo_render = estacion.metricas.histograma("render_segundos", "Tiempo de dibujado por gráfica y tipo de frame",
+                                             ("grafica", "tipo"))
+
+# La recepción arranca ya, antes de construir la interfaz y de importar
+# matplotlib: lo que llegue mientras tanto queda guardado en `estacion`
+# (esto soluciona los bugs de valores nulos o fantasmas iniciales).
+if estacion.iniciar_recepcion():
+    print("Recepción global arrancada al inicio.")
+    logging.info("Recepción global arrancada al inicio.")
+arranque.marcar("recepción")
 
 
 # VARIABLES GLOBALES - TEMPERATURA / HUMEDAD
 
-temperaturas = []     # historial de temperaturas recibidas
-humedades = []        # historial de humedades recibidas
-medias_10 = []        # media móvil de 10 valores (o valor calculado por Arduino)
-recibiendo = False    # indica si el hilo de recepción está iniciado
-recepcion_activa = False  # indica si se deben almacenar nuevos datos (Parar/Reanudar)
-modo_calculo = "tierra"   # "tierra" o "arduino"
-temp = 0.0
-hum = 0.0
-limite_temp = 30.0      # Valor límite inicial
 nuevo_periodo = 5000    # periodo inicial DHT (ms)
 periodo_global = 5000   # periodo inicial (ms) GLOBAL (límite LoRa)
 
-
-tiempos_TH = []       # tiempos (s) desde el inicio para cada medida de T/H
-t0_TH = None          # tiempo de referencia (primera pulsación de "Iniciar")
 VENTANA_TIEMPO = 30.0 # segundos visibles en el eje X para las gráficas de T/H
+PASO_VENTANA = 0      # 0 = la ventana se desplaza de forma continua; p. ej. 5.0 -> avanza a saltos
+                      # de 5 s y entre saltos solo se hace blit (menos dibujados completos)
+MAX_PUNTOS_TH = 1000  # puntos máximos por línea; si la ventana tiene más se dibuja la envolvente mín./máx.
 
+# Vista de las gráficas de T/H: duración visible y final fijo (None = en vivo, sigue a la última muestra)
+duracion_vista = VENTANA_TIEMPO
+fin_vista = None
+
+# Historial de T/H: tiempo (s desde t0_TH), temperatura, humedad y media móvil
+# (o valor calculado por Arduino). NaN = hueco (error o pausa).
+serie_TH = estacion.serie_TH
 
-# VARIABLES GLOBALES - RADAR ULTRASÓNICO
 
-angulos = []              # ángulos en radianes para la gráfica polar
-distancias = []           # distancias correspondientes
-historial_validas = []    # (tiempo, distancia) para ajuste dinámico de escala
-max_escala = 30           # escala inicial del radar (cm)
-ventana_puntos = 7        # número máximo de puntos visibles
-margen_reduccion_dist = 50.0
-tiempo_ventana_dist = 5.0
-errores_distancia = 0
-ultimo_cambio_escala_tiempo = time.time()
-mensajes_sat = []    # mensajes que manda el sat de confirmación
+# VARIABLES GLOBALES - RADAR ULTRASÓNICO
 
+FPS_MAX_RADAR = 10        # redibujados máximos por segundo de la gráfica radar
+PERIODO_DESVANECIDO = 1.0 # s entre redibujados del radar sin ecos nuevos, mientras la rejilla se desvanece
 
-# Buffers para el nuevo protocolo (T/H/media y ángulo de servo)
-ultimo_angulo_deg = 90.0   # ángulo "frontal" por defecto
-temp_buffer = None
-hum_buffer = None
-media_buffer = None
+# Puntos (ángulo en radianes, distancia) y texto del radar. El hilo de
+# recepción solo publica aquí; la GUI redibuja con el planificador.
+estado_radar = estacion.estado_radar
 
 # =====================================================
 # FUNCIONES AUXILIARES
@@ -76,12 +100,24 @@ def actualizar_radiales(ax, max_escala):
     ax.set_yticks(ticks_visibles)
     ax.set_yticklabels([f"{int(t)}" for t in ticks_visibles], fontsize=9)
 
+def limites_y(valores, actuales):
+    """Límites del eje Y para los valores visibles, redondeados a unidades enteras."""
+    validos = valores[~np.isnan(valores)]
+    if validos.size == 0:
+        return actuales
+    return (float(np.floor(validos.min())) - 1.0, float(np.ceil(validos.max())) + 1.0)
+
 # =====================================================
 # INTERFAZ GRÁFICA (Tkinter)
 # =====================================================
 root = tk.Tk()
 root.title("Panel Satélite - Control de Temperatura/Humedad y Radar")
 
+# Banner de alertas (alertas.py): no bloquea como un messagebox, se actualiza con los mensajes
+etiqueta_alertas = tk.Label(root, anchor="w", padx=10, pady=4, font=("Arial", 11, "bold"))
+etiqueta_alertas.pack(side=tk.TOP, fill=tk.X)
+banner_alertas = BannerAlertas(etiqueta_alertas)
+
 # Frames principales
 frame_izq = ttk.Frame(root, padding=10)
 frame_izq.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -101,45 +137,33 @@ def iniciar():
     Inicia el hilo de recepción (si no lo está) y activa la recepción de datos.
     Ahora el hilo único recibe tanto datos de temperatura/humedad como del radar.
     """
-    global recibiendo, recepcion_activa, t0_TH
-    if not recibiendo:
-        recibiendo = True
-        recepcion_activa = True
-
-        if t0_TH is None:
-            t0_TH = time.time()
-        
-        hilo = threading.Thread(target=recepcion_datos, daemon=True)
-        hilo.start()
+    if estacion.iniciar_recepcion():
         print("Recepción iniciada.")
         # Protocolo: 16:1:1|  -> Iniciar envío
-        com.write(b'16:1:1|')
+        estacion.enviar(protocolo.comando_iniciar())
         print("Enviado: 16:1:1| (Iniciar envío)")
         logging.info("Recepción iniciada.")
         # Enviamos también el período inicial con el protocolo 16:1:4:<periodo>|
-        mensaje = f"16:1:4:{nuevo_periodo}|"
+        mensaje = protocolo.comando_periodo(nuevo_periodo)
         logging.info("Enviando periodo inicial: %s", mensaje)
-        com.write(mensaje.encode('utf-8'))
-        print(f"Enviado: {mensaje}")
+        estacion.enviar(mensaje)
+        print(f"Enviado: {mensaje.decode()}")
     else:
-        recepcion_activa = True
         print("Recepción ya estaba iniciada. Reanudando almacenamiento de datos.")
 
 def parar():
     """Pide al satélite que deje de enviar datos y detiene el almacenamiento (la gráfica puede seguir)."""
-    global recepcion_activa
-    recepcion_activa = False
+    estacion.recepcion_activa = False
     # Protocolo: 16:1:2|  -> Parar
-    com.write(b'16:1:2|')
+    estacion.enviar(protocolo.comando_parar())
     print("Enviado: 16:1:2| (Parar; la gráfica seguirá avanzando sin datos cuando lleguen líneas vacías o errores)")
     logging.info("Recepción pausada por el usuario.")
 
 def reanudar():
     """Pide al satélite que reanude el envío de datos y vuelve a almacenar medidas."""
-    global recepcion_activa
-    recepcion_activa = True
+    estacion.recepcion_activa = True
     # Protocolo: 16:1:3|  -> Reanudar medición
-    com.write(b'16:1:3|')
+    estacion.enviar(protocolo.comando_reanudar())
     print("Enviado: 16:1:3| (Reanudar medición)")
     logging.info("Recepción reanudada por el usuario.")
 
@@ -150,9 +174,10 @@ def periodo():
     try:
         nuevo_periodo = int(valor)
         # Protocolo: 16:1:4:<periodo>|
-        mensaje = f"16:1:4:{nuevo_periodo}|"
-        com.write(mensaje.encode('utf-8'))
-        print(f"Enviado: {mensaje}")
+        mensaje = protocolo.comando_periodo(nuevo_periodo)
+        estacion.enviar(mensaje)
+        estacion.control_enlace.fijar_periodos(periodo_TH=nuevo_periodo)
+        print(f"Enviado: {mensaje.decode()}")
         logging.info("Nuevo periodo de envío de T/H: %s ms", nuevo_periodo)
     except ValueError:
         messagebox.showerror("Error", "Introduce un número entero válido para el periodo")
@@ -164,10 +189,11 @@ def periodo_global_func():
     try:
         periodo_global = int(valor)
         # Protocolo: 16:1:7:<periodo_global>|
-        mensaje = f"16:1:7:{periodo_global}|"
+        mensaje = protocolo.comando_periodo_global(periodo_global)
         logging.info("Nuevo periodo GLOBAL de envío: %s ms", periodo_global)
-        com.write(mensaje.encode('utf-8'))
-        print(f"Enviado: {mensaje}")
+        estacion.enviar(mensaje)
+        estacion.control_enlace.fijar_periodos(periodo_global=periodo_global)
+        print(f"Enviado: {mensaje.decode()}")
     except ValueError:
         messagebox.showerror("Error", "Introduce un número entero válido para el periodo GLOBAL")
 
@@ -186,24 +212,36 @@ modo_combo.pack(side=tk.LEFT)
 
 def cambiar_modo(event):
     """Cambia el modo de cálculo de la media (tierra/arduino)."""
-    global modo_calculo
     seleccion = modo_combo.get()
     if "Tierra" in seleccion:
-        modo_calculo = "tierra"
+        estacion.modo_calculo = "tierra"
         # Protocolo: 16:1:5|  -> Cambiar cálculo de media de temperatura a Python
         logging.info("Cambiando modo de cálculo de media a Tierra (Python)")
-        com.write(b'16:1:5|')
+        estacion.enviar(protocolo.comando_media_tierra())
         print("Enviado: 16:1:5| (Cálculo media en Python)")
     else:
-        modo_calculo = "arduino"
+        estacion.modo_calculo = "arduino"
         # Protocolo: 16:1:6|  -> Cambiar cálculo de media de temperatura a Satélite
-        com.write(b'16:1:6|')
+        estacion.enviar(protocolo.comando_media_satelite())
         print("Enviado: 16:1:6| (Cálculo media en Satélite)")
         logging.info("Cambiando modo de cálculo de media a Satélite (Arduino)")
-    print(f"Modo de cálculo cambiado a: {modo_calculo}")
+    print(f"Modo de cálculo cambiado a: {estacion.modo_calculo}")
 
 modo_combo.bind("<<ComboboxSelected>>", cambiar_modo)
 
+# Formato de las tramas de datos (16:1:8:<0|1>|); si el satélite no lo admite se sigue en ASCII
+formato_binario = tk.BooleanVar(value=False)
+
+def cambiar_formato():
+    """Pide al satélite las tramas de datos en binario o en ASCII."""
+    mensaje = protocolo.comando_formato(formato_binario.get())
+    estacion.enviar(mensaje)
+    print(f"Enviado: {mensaje.decode()}")
+    logging.info("Formato de tramas pedido: %s", "binario" if formato_binario.get() else "ASCII")
+
+ttk.Checkbutton(frame_botones, text="Tramas binarias", variable=formato_binario,
+                command=cambiar_formato).pack(side=tk.LEFT, padx=5)
+
 # -------------------------
 # Límite de temperatura media
 # -------------------------
@@ -211,16 +249,15 @@ frame_limite = ttk.Frame(frame_izq, padding=10)
 frame_limite.pack(side=tk.TOP, fill=tk.X)
 ttk.Label(frame_limite, text="Límite de temperatura media (°C):").pack(side=tk.LEFT)
 limite_entry = ttk.Entry(frame_limite, width=5)
-limite_entry.insert(0, str(limite_temp))
+limite_entry.insert(0, str(estacion.limite_temp))
 limite_entry.pack(side=tk.LEFT)
 
 def actualizar_limite():
     """Actualiza el límite de temperatura media a partir del valor del cuadro de texto."""
-    global limite_temp
     try:
-        limite_temp = float(limite_entry.get())
-        print(f"Límite actualizado a: {limite_temp} °C")
-        logging.info("Límite de temperatura media actualizado a: %s °C", limite_temp)
+        estacion.fijar_limite(float(limite_entry.get()))
+        print(f"Límite actualizado a: {estacion.limite_temp} °C")
+        logging.info("Límite de temperatura media actualizado a: %s °C", estacion.limite_temp)
     except ValueError:
         messagebox.showerror("Error", "Introduce un número válido")
 
@@ -244,15 +281,101 @@ periodo_global_entry.insert(0, str(periodo_global))
 periodo_global_entry.pack(side=tk.LEFT)
 ttk.Button(frame_periodo, text="Actualizar global", command=periodo_global_func).pack(side=tk.LEFT, padx=5)
 
+# Ajuste automático de los dos periodos según la pérdida del enlace (control_enlace.py)
+control_auto = tk.BooleanVar(value=False)
+
+def cambiar_control_enlace():
+    """Activa o desactiva el ajuste automático partiendo de los periodos actuales."""
+    control = estacion.control_enlace
+    if control_auto.get():
+        control.fijar_periodos(periodo_global, nuevo_periodo)
+    control.activo = control_auto.get()
+    logging.info("Control automático del enlace %s", "activado" if control.activo else "desactivado")
+
+ttk.Checkbutton(frame_periodo, text="Automático", variable=control_auto,
+                command=cambiar_control_enlace).pack(side=tk.LEFT, padx=5)
+
+def mostrar_periodos_auto():
+    """Con el ajuste automático, las casillas muestran los periodos que ha fijado."""
+    global nuevo_periodo, periodo_global
+    control = estacion.control_enlace
+    if not control.activo:
+        return
+    for entrada, valor in ((periodo_entry, control.periodo_TH), (periodo_global_entry, control.periodo_global)):
+        if entrada.get() != str(valor) and entrada is not root.focus_get():
+            entrada.delete(0, tk.END)
+            entrada.insert(0, str(valor))
+    nuevo_periodo, periodo_global = control.periodo_TH, control.periodo_global
+
+# Exportación de la ventana visible (se lee de los archivos exportados, no de la GUI)
+def exportar_ventana_visible():
+    """Exporta T/H y radar del intervalo que se ve ahora en las gráficas de T/H."""
+    if estacion.t0_TH is None:
+        messagebox.showinfo("Exportar", "Todavía no hay datos que exportar")
+        return
+    x_min, x_max = ax1.get_xlim()
+    t_ini, t_fin = estacion.t0_TH + x_min, estacion.t0_TH + x_max
+    destino = os.path.join(DIRECTORIO_EXPORTACION, "ventana_" + time.strftime("%Y%m%d-%H%M%S"))
+
+    def _exportar():
+        try:
+            exportador.volcar()
+            rutas = exportar_ventana(DIRECTORIO_EXPORTACION, t_ini, t_fin, destino)
+        except Exception as e:
+            logging.error("Error al exportar la ventana: %s", e)
+            root.after(0, lambda error=e: messagebox.showerror("Exportar", f"Error al exportar: {error}"))
+            return
+        logging.info("Ventana exportada: %s", rutas)
+        root.after(0, lambda: messagebox.showinfo("Exportar", "Exportado en:\n" + "\n".join(rutas)))
+
+    threading.Thread(target=_exportar, name="exportar_ventana", daemon=True).start()
+
+frame_exportar = ttk.Frame(frame_izq, padding=10)
+frame_exportar.pack(side=tk.TOP, fill=tk.X)
+ttk.Button(frame_exportar, text="Exportar ventana", command=exportar_ventana_visible).pack(side=tk.LEFT)
+
+# Zoom y desplazamiento de las gráficas de T/H
+def zoom_TH(factor):
+    """Multiplica la duración visible (factor > 1 aleja, < 1 acerca)."""
+    global duracion_vista
+    duracion_vista = min(max(duracion_vista * factor, VENTANA_TIEMPO / 4), 7 * 24 * 3600.0)
+
+def desplazar_TH(fraccion):
+    """Mueve la vista fraccion * duración visible (negativo = hacia atrás)."""
+    global fin_vista
+    fin = fin_vista if fin_vista is not None else max(duracion_vista, estacion.tiempo_relativo())
+    fin = max(duracion_vista, fin + fraccion * duracion_vista)
+    fin_vista = None if fin >= estacion.tiempo_relativo() else fin
+
+def vista_en_vivo():
+    global duracion_vista, fin_vista
+    duracion_vista, fin_vista = VENTANA_TIEMPO, None
+
+ttk.Label(frame_exportar, text="Vista T/H:").pack(side=tk.LEFT, padx=(20, 5))
+ttk.Button(frame_exportar, text="−", width=3, command=lambda: zoom_TH(2.0)).pack(side=tk.LEFT)
+ttk.Button(frame_exportar, text="+", width=3, command=lambda: zoom_TH(0.5)).pack(side=tk.LEFT)
+ttk.Button(frame_exportar, text="◀", width=3, command=lambda: desplazar_TH(-0.5)).pack(side=tk.LEFT)
+ttk.Button(frame_exportar, text="▶", width=3, command=lambda: desplazar_TH(0.5)).pack(side=tk.LEFT)
+ttk.Button(frame_exportar, text="En vivo", command=vista_en_vivo).pack(side=tk.LEFT, padx=5)
+
+
+# matplotlib se importa aquí y no al principio: es lo más lento del
+# arranque y mientras tanto la recepción ya está en marcha.
+# Figure en vez de pyplot: la GUI no usa el gestor de figuras de pyplot.
+arranque.marcar("interfaz")
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+from matplotlib.figure import Figure
+arranque.marcar("matplotlib")
 
 # =====================================================
 # GRÁFICAS TEMPERATURA/HUMEDAD
 # =====================================================
-fig_temp, (ax1, ax2, ax3) = plt.subplots(3, 1, figsize=(6, 8))
+fig_temp = Figure(figsize=(6, 8))
+ax1, ax2, ax3 = fig_temp.subplots(3, 1)
 fig_temp.tight_layout(pad=3)
 linea_temp, = ax1.plot([], [], 'y-', label="Temperatura")
 linea_hum, = ax2.plot([], [], 'c-', label="Humedad")
-linea_media, = ax3.plot([], [], 'r-', label="Media móvil 10 valores")
+linea_media, = ax3.plot([], [], 'r-', label=f"Media móvil {estacion.estadistica_temp.ventana} valores")
 
 for ax in (ax1, ax2, ax3):
     ax.legend()
@@ -265,6 +388,14 @@ ax3.set_xlabel("Tiempo (s)")
 canvas_temp = FigureCanvasTkAgg(fig_temp, master=frame_izq)
 canvas_temp.get_tk_widget().pack(fill=tk.BOTH, expand=True)
 
+# Solo las líneas y los títulos se repintan en cada frame; ejes y rejilla quedan en el fondo
+contador_frames_TH = ContadorFrames(tiempo_render, "TH")
+blit_TH = DibujoBlit(canvas_temp,
+                     (linea_temp, linea_hum, linea_media, ax1.title, ax2.title, ax3.title),
+                     contador_frames_TH)
+firma_TH = None            # datos que se dibujaron en el último frame de T/H
+ventana_TH_dibujada = None # (t_min, t_max, límites Y) del último dibujado completo
+
 # Mensajes del satélite
 frame_mensajes_satelite = ttk.Frame(frame_der, padding=10)
 frame_mensajes_satelite.pack(fill="both", expand=False)
@@ -273,45 +404,82 @@ ttk.Label(frame_mensajes_satelite, text="Mensajes de texto del satélite:").pack
 
 text_mensajes_satelite = tk.Text(frame_mensajes_satelite, height=6, state="disabled", wrap="word")
 text_mensajes_satelite.pack(fill="both", expand=True)
+# Últimos 5 mensajes de menos de 4 s; el historial completo queda en la grabación (grabacion.py)
+panel_mensajes = PanelMensajes(text_mensajes_satelite, max_visibles=5, vida=4.0)
 
 # =====================================================
 # GRÁFICA RADAR ULTRASÓNICO (polar)
 # =====================================================
-fig_radar = plt.Figure(figsize=(6, 6))
+fig_radar = Figure(figsize=(6, 6))
 ax_radar = fig_radar.add_subplot(111, polar=True)
-ax_radar.set_ylim(0, max_escala)
+ax_radar.set_ylim(0, estado_radar.max_escala)
 ax_radar.set_theta_zero_location("N")
 ax_radar.set_theta_direction(-1)
 ax_radar.set_thetamin(-90)
 ax_radar.set_thetamax(90)
+# Rejilla de ocupación (todos los barridos recientes, se desvanecen) debajo de la línea del barrido actual
+def crear_malla_radar(bordes_distancia, ocupacion):
+    """pcolormesh de la rejilla; se rehace cuando la rejilla cambia de alcance con la escala."""
+    return ax_radar.pcolormesh(estado_radar.rejilla.bordes_angulo, bordes_distancia,
+                               ocupacion.T, cmap="Greens", vmin=0.0, vmax=1.0,
+                               shading="flat", zorder=0)
+
+bordes_radar_dibujados, ocupacion_radar = estado_radar.ocupacion()
+malla_radar = crear_malla_radar(bordes_radar_dibujados, ocupacion_radar)
 line_radar, = ax_radar.plot([], [], marker='', linestyle='-', linewidth=2)
 ax_radar.set_title("Radar ultrasónico", pad=25)
 text_label = ax_radar.text(0.5, 1.0, "", transform=ax_radar.transAxes,
                            ha='center', va='bottom', fontsize=12, color='gray')
-actualizar_radiales(ax_radar, max_escala)
+actualizar_radiales(ax_radar, estado_radar.max_escala)
 
 canvas_radar = FigureCanvasTkAgg(fig_radar, master=frame_der)
 canvas_radar.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+escala_radar_dibujada = estado_radar.max_escala
+contador_frames_radar = ContadorFrames(tiempo_render, "radar")
+blit_radar = DibujoBlit(canvas_radar, (malla_radar, line_radar, text_label), contador_frames_radar)
+rejilla_visible = False   # queda algo de la rejilla por desvanecer
+
+def dibujar_radar():
+    """Vuelca en la gráfica polar el último estado publicado por el hilo de recepción (hilo de Tk)."""
+    global escala_radar_dibujada, bordes_radar_dibujados, malla_radar, rejilla_visible
+    _, angs, dists, texto, escala = estado_radar.instantanea()
+    # En el instante de la estación: al reproducir una grabación, el de la última trama
+    bordes, ocupacion = estado_radar.ocupacion(estacion.ahora())
+    if np.array_equal(bordes, bordes_radar_dibujados):
+        malla_radar.set_array(ocupacion.T.ravel())
+    else:
+        # La rejilla ha cambiado de alcance con la escala: malla nueva
+        malla_nueva = crear_malla_radar(bordes, ocupacion)
+        blit_radar.sustituir(malla_radar, malla_nueva)
+        malla_radar.remove()
+        malla_radar, bordes_radar_dibujados = malla_nueva, bordes
+    rejilla_visible = ocupacion.max() > 0.005
+    line_radar.set_data(angs, dists)
+    text_label.set_text(texto)
+    # Solo hace falta un dibujado completo si cambia la escala (ylim y radiales)
+    cambio_escala = escala != escala_radar_dibujada
+    if cambio_escala:
+        ax_radar.set_ylim(0, escala)
+        actualizar_radiales(ax_radar, escala)
+        escala_radar_dibujada = escala
+    blit_radar.actualizar(completo=cambio_escala)
+
+def version_radar():
+    """Cambia con cada dato nuevo y, mientras la rejilla se desvanece, cada PERIODO_DESVANECIDO s."""
+    if rejilla_visible:
+        return estado_radar.version, int(time.time() / PERIODO_DESVANECIDO)
+    return estado_radar.version, None
+
+# Varias tramas de radar seguidas se agrupan en un único redibujado
+planificador_render = PlanificadorRender(root, FPS_MAX_RADAR)
+planificador_render.registrar(version_radar, dibujar_radar)
 
 def actualizar_mensajes_satelite():
-    """Actualiza la lista visible de mensajes del satélite (máx 5 y máx 4 segundos)."""
-    global mensajes_sat
-    ahora = time.time()
-
-    # Eliminamos los mensajes con más de 4 segundos de antigüedad
-    mensajes_sat = [
-        (txt, ts) for (txt, ts) in mensajes_sat
-        if ahora - ts <= 4.0 
-    ]
-
-    # Mostramos solo los últimos 5 (como máximo)
-    mensajes_visibles = mensajes_sat[-5:]
-
-    text_mensajes_satelite.configure(state="normal")
-    text_mensajes_satelite.delete("1.0", tk.END)
-    for txt, ts in mensajes_visibles:
-        text_mensajes_satelite.insert(tk.END, txt + "\n")
-    text_mensajes_satelite.configure(state="disabled")
+    """Pasa al cuadro los mensajes nuevos y quita los caducados (máx 5 y máx 4 segundos)."""
+    panel_mensajes.actualizar()
+    banner_alertas.actualizar(estacion.alertas.activas())
+    mostrar_periodos_auto()
+    root.after(200, actualizar_mensajes_satelite)
 
 
 # -------------------------
@@ -338,8 +506,7 @@ def enviar_angulo():
         print("El ángulo debe estar entre -90 y 90.")
         return
 
-    comando = f"16:2:1:{ang_esc}|"
-    com.write(comando.encode("ascii"))
+    estacion.enviar(protocolo.comando_angulo(ang_esc))
     print("Ángulo enviado a estación (16:2:1):", ang_esc)
     logging.info("Ángulo enviado a estación: %s", ang_esc)
     entry_angulo.delete(0, tk.END)
@@ -351,400 +518,150 @@ btn_enviar.pack(side="left", padx=5)
 # Muestra en la interfaz los mensajes del satéllite
 def append_mensaje_sat(texto):
     """Añade un mensaje de texto del satélite al cuadro de mensajes (desde cualquier hilo)."""
-    def _inner():
-        ahora = time.time()
-        mensajes_sat.append((texto, ahora))
-        # Actualizamos inmediatamente la zona de mensajes
-        actualizar_mensajes_satelite()
-    root.after(0, _inner)
+    # No se toca Tk aquí: actualizar_mensajes_satelite() lo pinta en el siguiente tick
+    panel_mensajes.agregar(texto)
 
 
 
-# =====================================================
-# HILO DE RECEPCIÓN ÚNICO (Tº/H y RADAR)
-# =====================================================
-def recepcion_datos():
-    """
-    Hilo que recibe continuamente datos desde la estación de Tierra.
-    - Si la línea empieza por 'T:' se asume T:H:M: (temperatura/humedad/media).
-    - Si la línea contiene 'ángulo,distancia' se interpreta como dato de radar.
-    - Otros mensajes se muestran por consola.
-    """
-    global temp, hum, recibiendo, recepcion_activa
-    global temperaturas, humedades, medias_10
-    global angulos, distancias, max_escala, historial_validas
-    global errores_distancia, ultimo_cambio_escala_tiempo
-    global ultimo_angulo_deg, temp_buffer, hum_buffer, media_buffer
-    global modo_calculo, limite_temp
-    global tiempos_TH, t0_TH
+def informar_alerta(alerta):
+    """Deja constancia de cada alerta en el cuadro de mensajes (el banner muestra las activas)."""
+    if alerta.activa:
+        append_mensaje_sat(f"Alerta: {alerta.texto}")
+    else:
+        append_mensaje_sat(f"Alerta resuelta: {alerta.texto}")
 
+def informar_comando(comando, estado):
+    """Avisa en el cuadro de mensajes de los comandos rechazados o sin respuesta (comandos.py)."""
+    if estado in (comandos.RECHAZADO, comandos.SIN_CONFIRMAR):
+        texto = comando.decode("utf-8", errors="replace").rstrip("|")
+        append_mensaje_sat(f"Tierra: comando {texto} {estado.replace('_', ' ')}")
 
-    while recibiendo:
-        try:
-            # Leemos hasta el delimitador '|' del protocolo
-            linea_bytes = com.read_until(b'|')
-            if not linea_bytes:
-                time.sleep(0.05)
-                continue
-
-            linea = linea_bytes.decode('utf-8', errors='ignore').strip()
-            linea = linea.rstrip('|')
-
-            if not linea:
-                time.sleep(0.05)
-                continue
-
-            partes = linea.split(':')
-
-            # Esperamos formato 16:grupo:codigo[:valor]
-            if len(partes) < 3 or partes[0] != '16':
-                print("Mensaje:", linea)
-                continue
-
-            grupo = partes[1]
-            codigo = partes[2]
-            valor = partes[3] if len(partes) > 3 else None
-            
-            # ------------------------------
-            # Grupo 0: Mensajes de texto (16:0:lo_que_sea)
-            # ------------------------------
-            if grupo == '0':
-                # Recuperamos todo lo que va después de "16:0:"
-                if len(linea) > 5:
-                    mensaje_texto = linea[5:]
-                else:
-                    mensaje_texto = ""
-
-                # Si dentro del texto aparece otra cabecera "16:", cortamos ahí
-                idx_proto = mensaje_texto.find("16:")
-                if idx_proto != -1:
-                    mensaje_texto = mensaje_texto[:idx_proto]
-
-                mensaje_texto = mensaje_texto.strip()
-
-                print("MENSAJE DE TEXTO DESDE SATÉLITE:", mensaje_texto)
-                append_mensaje_sat(mensaje_texto)
-
-                continue
-
-
-            
-            # ------------------------------
-            # Grupo 1: Sensor humedad/temperatura (16:1:...)
-            # ------------------------------
-            if grupo == '1':
-                # Errores de lectura/envío
-                if codigo in ('-2', '-1'):
-                    print("Error de T/H recibido:", linea)
-                    if t0_TH is not None:
-                        t_rel = time.time() - t0_TH
-                    else:
-                        t_rel = 0.0
-                    tiempos_TH.append(t_rel)
-                    temperaturas.append(np.nan if recepcion_activa else None)
-                    humedades.append(np.nan if recepcion_activa else None)
-                    while len(medias_10) < len(temperaturas):
-                        medias_10.append(np.nan)
-                    continue
-
-                # 16:1:01:<temp>|
-                if codigo == '01' and valor is not None:
-                    try:
-                        temp = float(valor)
-                        temp_buffer = temp
-                        logging.info('Temp %s',linea)
-                    except ValueError:
-                        print("Temperatura corrupta: %s", linea)
-                        logging.warning("Humedad corrupta: %s", linea)
-                    continue
-
-                # 16:1:02:<hum>|
-                if codigo == '02' and valor is not None:
-                    try:
-                        hum = float(valor)
-                        hum_buffer = hum
-                        logging.info('Hum %s',linea)
-
-                    except ValueError:
-                        print("Humedad corrupta: %s", linea)
-                        logging.warning("Humedad corrupta:%s", linea)
-                    continue
-
-                # 16:1:03:<media>|
-                if codigo == '03' and valor is not None:
-                    try:
-                        media_buffer = float(valor)
-                        logging.info('Media %s',linea)
-
-                    except ValueError:
-                        print("Media corrupta: %s", linea)
-                        logging.warning("Media corrupta: %s", linea)
-
-                        media_buffer = None
-
-                    # Solo generamos un "nuevo punto" cuando llega el 03 (paquete completo)
-                    if temp_buffer is None or hum_buffer is None:
-                        print("Faltan T/H para completar paquete:%s", linea)
-                        logging.warning("Faltant T/H para copmletar paquete:%s", linea)
-                        continue
-
-                    if t0_TH is not None:
-                        t_rel = time.time() - t0_TH
-                    else:
-                        t_rel = 0.0
-                    tiempos_TH.append(t_rel)
-
-                    if recepcion_activa:
-                        temperaturas.append(temp_buffer)
-                        humedades.append(hum_buffer)
-                    else:
-                        temperaturas.append(None)
-                        humedades.append(None)
-
-                    # Rellenar medias_10 con np.nan si es necesario
-                    while len(medias_10) < len(temperaturas):
-                        medias_10.append(np.nan)
-
-                    # Cálculo de la media según el modo
-                    if modo_calculo == "tierra":
-                        logging.info('Calculo media en: %s',modo_calculo)
-                        if len(temperaturas) >= 10:
-                            ultimos = [t for t in temperaturas[-10:] if t is not None]
-                            if len(ultimos) == 10:
-                                medias_10[-1] = sum(ultimos) / 10
-                    else:
-                        if media_buffer is not None:
-                            medias_10[-1] = media_buffer
-
-                    # Alerta si tres últimas medias válidas > límite
-                    if len(medias_10) >= 3:
-                        ultimas_3 = medias_10[-3:]
-                        if all((m is not None) and not np.isnan(m) and m > limite_temp for m in ultimas_3):
-                            messagebox.showwarning("Alerta", f"¡Tres medias consecutivas > {limite_temp} °C!")
-                            logging.warning("Alerta: Tres medias consecutivas > límite")
-                            # CAMBIO 10: ahora se envía la alarma a la estación de Tierra
-                            com.write(b'ALARMA\n')
-
-                    continue  # siguiente iteración del bucle
-
-                # Códigos no reconocidos del grupo 1
-                print("Mensaje grupo 1 no reconocido:", linea)
-                logging.warning("Mensaje grupo 1 no reconocido: %s", linea)
-                continue
-
-            # ------------------------------
-            # Grupo 2: Servo (16:2:...)
-            # ------------------------------
-            if grupo == '2':
-                # 16:2:-1|
-                if codigo == '-1':
-                    text_label.set_text("Ángulo N/A")
-                    canvas_radar.draw()
-                    continue
-
-                # 16:2:0:<angulo>|
-                if codigo == '0' and valor is not None:
-                    try:
-                        ultimo_angulo_deg = float(valor)
-                        logging.info('Angulo servo %s',linea)
-                    except ValueError:
-                        print("Ángulo servo corrupto:", linea)
-                        logging.warning("Ángulo servo corrupto: %s", linea)
-                    continue
-
-                # Otros códigos del grupo 2 (p.e. órdenes de mover / velocidad) no necesitan tratamiento aquí
-                print("Mensaje grupo 2:", linea)
-                continue
-
-            # ------------------------------
-            # Grupo 3: Distancia (16:3:...)
-            # ------------------------------
-            if grupo == '3':
-                # Errores de distancia: 16:3:-1| o 16:3:-2|
-                if codigo in ('-2', '-1'):
-                    # Usamos el último ángulo conocido
-                    angulo_rad = np.deg2rad(ultimo_angulo_deg - 90.0)
-                    errores_distancia += 1
-                    angulos.append(angulo_rad)
-                    distancias.append(np.nan)
-
-                    if len(angulos) > ventana_puntos:
-                        angulos[:] = angulos[-ventana_puntos:]
-                        distancias[:] = distancias[-ventana_puntos:]
-
-                    line_radar.set_xdata(angulos)
-                    line_radar.set_ydata(distancias)
-                    text_label.set_text("Error distancia")
-                    canvas_radar.draw()
-                    continue
-
-                # 16:3:0:<anguloServo>:<distancia>|
-                if codigo == '0':
-                    # Esperamos al menos 5 partes: 16, 3, 0, anguloServo, distancia
-                    if len(partes) < 5:
-                        print("Mensaje grupo 3 incompleto:", linea)
-                        logging.warning("Mensaje grupo 3 incompleto: %s", linea)
-                        continue
-
-                    try:
-                        angulo_servo = float(partes[3])     # 0..180
-                        d = float(partes[4])                # distancia en cm
-                        logging.info('Distancia radar %s',linea)
-                    except ValueError:
-                        # Texto no convertible a float: tratamos como dato corrupto
-                        errores_distancia += 1
-                        angulo_rad = np.deg2rad(ultimo_angulo_deg - 90.0)
-                        angulos.append(angulo_rad)
-                        distancias.append(np.nan)
-                        if len(angulos) > ventana_puntos:
-                            angulos[:] = angulos[-ventana_puntos:]
-                            distancias[:] = distancias[-ventana_puntos:]
-                        line_radar.set_xdata(angulos)
-                        line_radar.set_ydata(distancias)
-                        text_label.set_text("Dato corrupto")
-                        canvas_radar.draw()
-                        continue
-
-                    # Actualizamos el último ángulo del servo recibido
-                    ultimo_angulo_deg = angulo_servo
-                    angulo_rad = np.deg2rad(angulo_servo - 90.0)
-
-                    errores_distancia = 0
-                    angulos.append(angulo_rad)
-                    distancias.append(d)
-
-                    if len(angulos) > ventana_puntos:
-                        angulos[:] = angulos[-ventana_puntos:]
-                        distancias[:] = distancias[-ventana_puntos:]
-
-                    line_radar.set_xdata(angulos)
-                    line_radar.set_ydata(distancias)
-
-                    ahora = time.time()
-                    historial_validas.append((ahora, d))
-                    historial_validas = [
-                        (t, val) for (t, val) in historial_validas
-                        if ahora - t <= tiempo_ventana_dist
-                    ]
-
-                    # Ajuste dinámico de la escala radial
-                    if historial_validas:
-                        max_reciente = max(val for (t, val) in historial_validas)
-
-                        if max_reciente > max_escala:
-                            max_escala = int(max_reciente) + 1
-                            ax_radar.set_ylim(0, max_escala)
-                            actualizar_radiales(ax_radar, max_escala)
-                            ultimo_cambio_escala_tiempo = ahora
-
-                        elif (max_escala - max_reciente >= margen_reduccion_dist and
-                              (ahora - ultimo_cambio_escala_tiempo >= tiempo_ventana_dist)):
-                            max_escala = int(max_reciente) + 1
-                            ax_radar.set_ylim(0, max_escala)
-                            actualizar_radiales(ax_radar, max_escala)
-                            ultimo_cambio_escala_tiempo = ahora
-
-                    # Mostramos el ángulo ya centrado en [-90, 90]
-                    text_label.set_text(
-                        f"Ángulo: {angulo_servo-90:.0f}º    Distancia: {d:.1f} cm"
-                    )
-                    canvas_radar.draw()
-                    continue
-
-                # Códigos no reconocidos del grupo 3
-                print("Mensaje grupo 3 no reconocido:", linea)
-                logging.warning("Mensaje grupo 3 no reconocido: %s", linea)
-                continue
-            # ------------------------------
-            # Otros grupos no previstos
-            # ------------------------------
-            print("Mensaje grupo no previsto:", linea)
-            logging.warning("Mensaje grupo no previsto: %s", linea)
+estacion.suscribir("mensaje", append_mensaje_sat)
+estacion.suscribir("alerta", informar_alerta)
+estacion.suscribir("comando", informar_comando)
 
-        except Exception as e:
-            print("Error en recepción:", e)
-            logging.error("Error en recepción")
-            break
 
 # =====================================================
 # ACTUALIZACIÓN PERIÓDICA DE LAS GRÁFICAS T/H
 # =====================================================
 def actualizar_graficas():
-    """Actualiza las gráficas de temperatura, humedad y media en la interfaz."""
+    """
+    Actualiza las gráficas de temperatura, humedad y media en la interfaz.
+    Si no ha cambiado nada desde el último frame no se dibuja; si solo han
+    cambiado los datos se hace blit, y solo se redibuja todo cuando cambia la
+    ventana del eje X o los límites del eje Y.
+    """
+    global firma_TH, ventana_TH_dibujada
     # Tiempo transcurrido desde la primera pulsación de "Iniciar"
-    if t0_TH is not None:
-        tiempo_actual = time.time() - t0_TH
-    else:
-        tiempo_actual = 0.0
-
-    # Aseguramos que todas las series tienen la misma longitud
-    n = min(len(tiempos_TH), len(temperaturas), len(humedades), len(medias_10))
-    if n > 0:
-        x_vals = tiempos_TH[:n]
-        y_temp = temperaturas[:n]
-        y_hum = humedades[:n]
-        y_media = medias_10[:n]
-
-        linea_temp.set_data(x_vals, y_temp)
-        linea_hum.set_data(x_vals, y_hum)
-        linea_media.set_data(x_vals, y_media)
-    else:
-        # Si aún no hay datos, vaciamos las curvas
-        linea_temp.set_data([], [])
-        linea_hum.set_data([], [])
-        linea_media.set_data([], [])
-        x_vals = []
-
-    # Ventana deslizante fija de VENTANA_TIEMPO segundos
-    if t0_TH is not None:
-        t_max_ventana = max(VENTANA_TIEMPO, tiempo_actual)
-        t_min_ventana = max(0.0, t_max_ventana - VENTANA_TIEMPO)
+    tiempo_actual = estacion.tiempo_relativo()
+
+    # Ventana de duracion_vista segundos: en vivo se desplaza con el tiempo actual (o
+    # avanza a saltos proporcionales a PASO_VENTANA); si se ha desplazado la vista, queda fija en fin_vista
+    paso = PASO_VENTANA * duracion_vista / VENTANA_TIEMPO
+    if fin_vista is not None:
+        t_max_ventana = fin_vista
+    elif estacion.t0_TH is not None:
+        fin = np.ceil(tiempo_actual / paso) * paso if paso > 0 else tiempo_actual
+        t_max_ventana = max(duracion_vista, fin)
     else:
-        t_min_ventana = 0.0
-        t_max_ventana = VENTANA_TIEMPO
-
-    for ax in (ax1, ax2, ax3):
-        ax.set_xlim(t_min_ventana, t_max_ventana)
-        ax.relim()
-        ax.autoscale_view(scalex=False, scaley=True)
+        t_max_ventana = duracion_vista
+    t_min_ventana = max(0.0, t_max_ventana - duracion_vista)
+
+    # Si no hay muestras nuevas ni cambia la ventana, nos saltamos el frame
+    firma = (serie_TH.total, t_min_ventana, t_max_ventana, estacion.temp, estacion.hum)
+    if firma == firma_TH:
+        contador_frames_TH.omitido()
+        root.after(500, actualizar_graficas)
+        return
+    firma_TH = firma
+
+    # Como mucho MAX_PUNTOS_TH puntos por línea: muestras originales (vistas del
+    # buffer, sin copia) o, con ventanas largas, la envolvente mín./máx. de la pirámide
+    _, visibles = estacion.lod_TH.consultar(t_min_ventana, t_max_ventana, MAX_PUNTOS_TH)
+    linea_temp.set_data(*visibles["temperatura"])
+    linea_hum.set_data(*visibles["humedad"])
+    linea_media.set_data(*visibles["media"])
+
+    limites = tuple(
+        limites_y(visibles[col][1], ax.get_ylim())
+        for ax, col in ((ax1, "temperatura"), (ax2, "humedad"), (ax3, "media"))
+    )
+    ventana = (t_min_ventana, t_max_ventana, limites)
+    completo = ventana != ventana_TH_dibujada
+    if completo:
+        for ax, lim in zip((ax1, ax2, ax3), limites):
+            ax.set_xlim(t_min_ventana, t_max_ventana)
+            ax.set_ylim(*lim)
+        ventana_TH_dibujada = ventana
 
     # Actualizar títulos con valores actuales
-    ax1.set_title(f"Temperatura actual: {temp:.2f} °C")
-    ax2.set_title(f"Humedad actual: {hum:.2f} %")
-    if len(medias_10) > 0 and not np.isnan(medias_10[-1]):
-        ax3.set_title(f"Media actual: {medias_10[-1]:.2f} °C")
+    ax1.set_title(f"Temperatura actual: {estacion.temp:.2f} °C")
+    ax2.set_title(f"Humedad actual: {estacion.hum:.2f} %")
+    media_actual = serie_TH.ultimo("media")
+    if not np.isnan(media_actual):
+        ax3.set_title(f"Media actual: {media_actual:.2f} °C")
     else:
         ax3.set_title("Media actual: N/A")
 
-    canvas_temp.draw()
+    blit_TH.actualizar(completo=completo)
     root.after(500, actualizar_graficas)
 
 
+def informar_frames():
+    """Registra cada 30 s los contadores de frames (completos/blit/omitidos) y los del enlace."""
+    logging.info("Frames T/H: %s", contador_frames_TH.resumen())
+    logging.info("Frames radar: %s", contador_frames_radar.resumen())
+    logging.info("Enlace: %s", estacion.decodificador.contadores.resumen())
+    logging.info("Métricas: %s", estacion.metricas.resumen())
+    root.after(30000, informar_frames)
+
+
+def metricas_frames():
+    """Colector de metricas.py con los frames dibujados, por blit y omitidos de cada gráfica."""
+    return [("frames_total", "counter", "Frames de las gráficas por tipo", ("grafica", "tipo"),
+             [((grafica, tipo), n)
+              for grafica, contador in (("TH", contador_frames_TH), ("radar", contador_frames_radar))
+              for tipo, n in contador.frames.items()])]
+
+estacion.metricas.registrar_colector(metricas_frames)
+
+
 
 
 # =====================================================
 # INICIO DE LA APLICACIÓN
 # =====================================================
 
-# esto soluciona los bugs de valores nulos o fantasmas iniciales
-def arrancar_recepcion_al_inicio():
-
-    #Arranca el hilo de recepción nada más abrir la GUI,
-    #de modo que se reciban radar, servo y mensajes 16:0 aunque aún no
-    #se hayan pedido datos de T/H.
-    global recibiendo, recepcion_activa, t0_TH
-
-    if not recibiendo:
-        recibiendo = True
-        recepcion_activa = True
-        if t0_TH is None:
-            t0_TH = time.time()
-        hilo = threading.Thread(target=recepcion_datos, daemon=True)
-        hilo.start()
-        print("Recepción global arrancada al inicio.")
-        logging.info("Recepción global arrancada al inicio.")
-        
-root.after(100, arrancar_recepcion_al_inicio)        
+arranque.marcar("figuras")
+
+def informar_arranque(intentos=50):
+    """Escribe en el log los tiempos de arranque cuando la placa ya envía datos (máx. ~10 s)."""
+    if transporte.t_primeros_datos is None and intentos > 0:
+        root.after(200, informar_arranque, intentos - 1)
+        return
+    backend = transporte.backend
+    if getattr(backend, "t_abierto", None) is not None:
+        arranque.marcar("puerto abierto", backend.t_abierto)
+    if getattr(backend, "t_listo", None) is not None:
+        arranque.marcar("placa lista", backend.t_listo)
+    if transporte.t_primeros_datos is not None:
+        arranque.marcar("primeros datos", transporte.t_primeros_datos)
+    logging.info("Arranque: %s", arranque.resumen())
+
+def interfaz_lista():
+    arranque.marcar("primer ciclo Tk")
+    informar_arranque()
+
+root.after_idle(interfaz_lista)
 root.after(500, actualizar_graficas)
 root.after(200, actualizar_mensajes_satelite)  # refresca mensajes del cada 200 ms
+planificador_render.iniciar()                  # redibuja el radar (máx. FPS_MAX_RADAR por segundo)
+root.after(30000, informar_frames)
 root.mainloop()
+
+estacion.cerrar()
+exportador.cerrar()
+if servidor_metricas is not None:
+    servidor_metricas.detener()
+if grabador is not None:
+    grabador.cerrar()
@@ -0,0 +1,168 @@
+"""
+Alertas de la estación de Tierra: reglas evaluadas muestra a muestra.
+
+Cada Regla vigila una magnitud (media de temperatura, racha de errores de
+T/H o del radar...) y pasa de inactiva a activa cuando el valor supera el
+umbral en `consecutivas` muestras seguidas; vuelve a inactiva cuando baja
+de umbral - histeresis. Un NaN corta la racha pero no resuelve una alerta
+activa (no se sabe el valor). Evaluar una muestra es O(1) y no bloquea.
+
+Solo se notifican los cambios de estado ("activa" / "resuelta"), así que
+mientras la condición dura no se repite nada. Además, una regla que se
+reactiva antes de `enfriamiento` s desde su último aviso no se vuelve a
+notificar (evita avisos en ráfaga si el valor oscila alrededor del umbral).
+
+Las notificaciones salen de un hilo propio ("alertas"), nunca del que
+llamó a evaluar(): el hilo de recepción no espera a la interfaz ni al
+envío. Para la interfaz, activas() da una copia del estado actual que se
+puede leer desde el hilo de Tk (ver BannerAlertas en render.py).
+"""
+
+import logging
+import math
+import queue
+import threading
+import time
+
+ACTIVA = "activa"
+RESUELTA = "resuelta"
+
+
+class Regla:
+    """
+    Condición valor > umbral durante `consecutivas` muestras.
+
+    mensaje admite {umbral}, {valor} y {consecutivas}. enlace=True -> al
+    activarse se avisa también a la estación de Tierra (nucleo.py).
+    """
+
+    def __init__(self, nombre, umbral, consecutivas=1, histeresis=0.0,
+                 enfriamiento=60.0, mensaje="", enlace=False):
+        self.nombre = nombre
+        self.umbral = umbral
+        self.consecutivas = consecutivas
+        self.histeresis = histeresis
+        self.enfriamiento = enfriamiento
+        self.mensaje = mensaje or nombre
+        self.enlace = enlace
+        self.activa = False
+        self.racha = 0
+        self.notificada = False     # la activación actual se ha notificado
+        self.t_aviso = None         # último aviso de activación
+        self.valor = math.nan       # último valor válido
+
+    def evaluar(self, valor, t):
+        """Actualiza la regla con una muestra. Devuelve ACTIVA, RESUELTA o None (sin cambio)."""
+        if valor is None or math.isnan(valor):
+            self.racha = 0
+            return None
+        self.valor = valor
+        if not self.activa:
+            self.racha = self.racha + 1 if valor > self.umbral else 0
+            if self.racha < self.consecutivas:
+                return None
+            self.activa = True
+            self.notificada = self.t_aviso is None or t - self.t_aviso >= self.enfriamiento
+            if not self.notificada:
+                return None
+            self.t_aviso = t
+            return ACTIVA
+        if valor <= self.umbral - self.histeresis:
+            self.activa = False
+            self.racha = 0
+            return RESUELTA if self.notificada else None
+        return None
+
+    def texto(self):
+        return self.mensaje.format(umbral=self.umbral, valor=self.valor,
+                                   consecutivas=self.consecutivas)
+
+
+class Alerta:
+    """Un cambio de estado de una regla, tal como se notifica."""
+
+    __slots__ = ("regla", "estado", "texto", "valor", "t")
+
+    def __init__(self, regla, estado, t):
+        self.regla = regla.nombre
+        self.estado = estado
+        self.texto = regla.texto()
+        self.valor = regla.valor
+        self.t = t
+
+    @property
+    def activa(self):
+        return self.estado == ACTIVA
+
+    def __repr__(self):
+        return f"Alerta({self.regla!r}, {self.estado!r}, {self.texto!r})"
+
+
+class MotorAlertas:
+    """
+    Conjunto de reglas por nombre. evaluar(nombre, valor) se llama desde el
+    hilo de recepción; las funciones de suscribir(funcion) reciben cada
+    Alerta desde el hilo "alertas".
+    """
+
+    def __init__(self, reglas=()):
+        self.reglas = {}
+        for regla in reglas:
+            self.agregar_regla(regla)
+        self._suscriptores = []
+        self._lock = threading.Lock()
+        self._cola = queue.SimpleQueue()
+        self.contadores = {ACTIVA: 0, RESUELTA: 0}
+        self.suprimidas = 0     # activaciones sin aviso por el enfriamiento
+        self._hilo = threading.Thread(target=self._bucle, name="alertas", daemon=True)
+        self._hilo.start()
+
+    def agregar_regla(self, regla):
+        self.reglas[regla.nombre] = regla
+
+    def suscribir(self, funcion):
+        self._suscriptores.append(funcion)
+
+    def evaluar(self, nombre, valor, t=None):
+        """Pasa una muestra a la regla `nombre`. Seguro desde cualquier hilo; nunca bloquea."""
+        t = time.monotonic() if t is None else t
+        with self._lock:
+            regla = self.reglas[nombre]
+            estaba_activa = regla.activa
+            estado = regla.evaluar(valor, t)
+            if estado is None:
+                if regla.activa and not estaba_activa:
+                    self.suprimidas += 1
+                return None
+            self.contadores[estado] += 1
+            alerta = Alerta(regla, estado, t)
+        self._cola.put(alerta)
+        return estado
+
+    def fijar_umbral(self, nombre, umbral):
+        with self._lock:
+            self.reglas[nombre].umbral = umbral
+
+    def activas(self):
+        """[(nombre, texto)] de las reglas activas (copia; se puede llamar desde la GUI)."""
+        with self._lock:
+            return [(r.nombre, r.texto()) for r in self.reglas.values() if r.activa]
+
+    def detener(self):
+        self._cola.put(None)
+        self._hilo.join(timeout=1.0)
+
+    def _bucle(self):
+        while True:
+            alerta = self._cola.get()
+            if alerta is None:
+                return
+            if alerta.activa:
+                logging.warning("Alerta %s: %s", alerta.regla, alerta.texto)
+            else:
+                logging.info("Alerta %s resuelta", alerta.regla)
+            for funcion in self._suscriptores:
+                try:
+                    funcion(alerta)
+                except Exception:
+                    logging.exception("Error al notificar la alerta %s", alerta.regla)
@@ -0,0 +1,449 @@
+"""
+Banco de pruebas de rendimiento: recepción -> decodificación -> almacenamiento -> dibujado.
+
+No necesita puerto serie ni pantalla: alimenta la estación con un flujo de
+bytes sintético (simulador.py) o grabado (bytes crudos tal y como llegan
+del puerto) y dibuja con el backend Agg de matplotlib. Mide:
+    - tramas por segundo de cada etapa (separar tramas, decodificar, procesar);
+    - percentiles de latencia por trama de cada etapa;
+    - crecimiento de memoria a lo largo de horas de telemetría simulada;
+    - tiempo por frame de las gráficas de T/H y radar (completo y blit);
+    - convergencia del ajuste automático de periodos (control_enlace.py)
+      con un enlace de capacidad limitada, frente a periodos fijos;
+    - tramas ASCII frente a binarias (16:1:8:1|): bytes por muestra, coste
+      por muestra y muestras útiles por segundo con el mismo enlace.
+Los resultados se guardan en JSON para comparar versiones. Uso:
+
+    python benchmark.py --horas 2 --salida resultados.json
+    python benchmark.py --entrada captura.bin
+    python benchmark.py --control-enlace 1800 --capacidad 50
+    python benchmark.py --formatos 1800 --capacidad 50
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import platform
+import subprocess
+import time
+import tracemalloc
+
+import numpy as np
+
+import protocolo
+import registro
+from control_enlace import ControlEnlace
+from nucleo import EstacionTierra
+from simulador import SateliteSimulado, generar_flujo
+
+
+class _TransporteNulo:
+    """Transporte que no envía nada (la estación solo recibe en el banco de pruebas)."""
+
+    def __init__(self):
+        self.al_trama = None
+        self.al_cerrar = None
+        self.enviados = 0
+
+    def enviar(self, datos):
+        self.enviados += 1
+
+    def iniciar_en_hilo(self):
+        pass
+
+    def detener(self):
+        pass
+
+
+def percentiles(tiempos_ns):
+    """Resumen de latencias (en microsegundos) de una lista de tiempos en ns."""
+    if not tiempos_ns:
+        return {}
+    t = np.asarray(tiempos_ns, dtype=float) / 1000.0
+    return {
+        "n": int(t.size),
+        "media_us": float(t.mean()),
+        "p50_us": float(np.percentile(t, 50)),
+        "p90_us": float(np.percentile(t, 90)),
+        "p99_us": float(np.percentile(t, 99)),
+        "max_us": float(t.max()),
+    }
+
+
+def separar_tramas(bloques, separador=None):
+    """Separa los bloques de bytes en tramas igual que el transporte (SeparadorTramas)."""
+    separador = separador or protocolo.SeparadorTramas()
+    for datos in bloques:
+        yield from separador.agregar(datos)
+
+
+def flujo_sintetico(segundos, periodo_TH, intervalo_dist, tasa_error, tasa_corrupcion,
+                    checksum=None, semilla=1, binario=False):
+    sim = SateliteSimulado(periodo_TH=periodo_TH, periodo_global=0, intervalo_dist=intervalo_dist,
+                           tasa_error_TH=tasa_error, tasa_error_dist=tasa_error,
+                           tasa_corrupcion=tasa_corrupcion, checksum=checksum, semilla=semilla,
+                           binario=binario)
+    return generar_flujo(sim, segundos)
+
+
+# =====================================================
+# ETAPAS
+# =====================================================
+def medir_pipeline(bloques):
+    """Mide separar tramas, decodificar y procesar (estado completo) trama a trama."""
+    estacion = EstacionTierra(_TransporteNulo())
+    estacion.recibiendo = estacion.recepcion_activa = True
+    estacion.t0_TH = time.time()
+
+    # La separación se mide en bloque (por trama sería sobre todo el coste del reloj)
+    separador = protocolo.SeparadorTramas()
+    t_ini = time.perf_counter_ns()
+    tramas = list(separar_tramas(bloques, separador))
+    t_sep_s = (time.perf_counter_ns() - t_ini) / 1e9
+
+    t_dec, t_proc = [], []
+    decodificador = estacion.decodificador
+
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for datos in tramas:
+            a = time.perf_counter_ns()
+            datos = protocolo.limpiar(datos)
+            if isinstance(datos, protocolo.PaqueteBinario):
+                lista = decodificador.decodificar_binario(datos) or ()
+            else:
+                trama = decodificador.decodificar(datos)
+                lista = (trama,) if trama is not None else ()
+            b = time.perf_counter_ns()
+            for trama in lista:
+                decodificador.despachar(trama)
+            c = time.perf_counter_ns()
+            t_dec.append(b - a)
+            t_proc.append(c - b)
+    estacion.cerrar()
+
+    def etapa(tiempos):
+        total_s = sum(tiempos) / 1e9
+        return {"tramas_s": len(tiempos) / total_s if total_s else 0.0, **percentiles(tiempos)}
+
+    return {
+        "tramas": len(tramas),
+        "enlace": estacion.decodificador.contadores.resumen(),
+        "separar": {"tramas_s": len(tramas) / t_sep_s if t_sep_s else 0.0,
+                    "resincronizaciones": separador.resincronizaciones,
+                    "bytes_descartados": separador.descartados},
+        "decodificar": etapa(t_dec),
+        "procesar": etapa(t_proc),
+    }
+
+
+def medir_memoria(horas):
+    """
+    Memoria asignada (tracemalloc) tras cada hora de telemetría simulada.
+    Se usan los periodos por defecto del firmware: interesa el crecimiento
+    en una sesión real, no la carga máxima.
+    """
+    estacion = EstacionTierra(_TransporteNulo())
+    estacion.recibiendo = estacion.recepcion_activa = True
+    estacion.t0_TH = time.time()
+    sim = SateliteSimulado(semilla=2)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    muestras = []
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        for hora in range(1, horas + 1):
+            for datos in separar_tramas(generar_flujo(sim, 3600)):
+                datos = protocolo.limpiar(datos)
+                if datos:
+                    estacion.procesar_trama(datos)
+            actual = tracemalloc.get_traced_memory()[0]
+            muestras.append({"hora": hora, "bytes": actual - base})
+    tracemalloc.stop()
+    estacion.cerrar()
+    return muestras
+
+
+def simular_enlace(segundos, capacidad, periodo, controlado, semilla=3, paso_ms=100, binario=False):
+    """
+    Satélite simulado con un enlace de `capacidad` bytes/s y la estación en
+    tiempo simulado. Con controlado=True los periodos los ajusta ControlEnlace
+    (sus comandos llegan al satélite en seguida); si no, quedan fijos en `periodo`.
+    Devuelve la serie de periodos y, por tercios del tiempo, los paquetes de T/H
+    útiles (01, 02 y 03 seguidas) por segundo y la proporción de tramas
+    perdidas en el enlace. binario=True -> tramas binarias (16:1:8:1|).
+    """
+    sim = SateliteSimulado(periodo_TH=periodo, periodo_global=periodo,
+                           capacidad_enlace=capacidad, semilla=semilla, binario=binario)
+    estacion = EstacionTierra(_TransporteNulo())
+    estacion.recibiendo = estacion.recepcion_activa = True
+    contadores = estacion.decodificador.contadores
+    separador = protocolo.SeparadorTramas(binario=binario)
+    separador.al_resincronizar = lambda datos: contadores.resincronizada(protocolo.grupo_crudo(datos))
+    control = ControlEnlace(sim.recibir, contadores, periodo_global=periodo, periodo_TH=periodo,
+                            activo=controlado)
+
+    tercios = [{"utiles": 0, "enviadas": 0, "perdidas": 0} for _ in range(3)]
+    periodos = []
+    anterior = b""
+    with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+        while sim.ahora < segundos * 1000:
+            enviadas, perdidas = sim.enviadas, sim.perdidas
+            sim.avanzar(sim.ahora + paso_ms)
+            t = sim.ahora / 1000.0
+            tercio = tercios[min(2, int(3 * t / segundos))]
+            tercio["enviadas"] += sim.enviadas - enviadas
+            tercio["perdidas"] += sim.perdidas - perdidas
+            for datos in separador.agregar(sim.leer_salida()):
+                datos = protocolo.limpiar(datos)
+                if not datos:
+                    continue
+                estacion.procesar_trama(datos)
+                if isinstance(datos, protocolo.PaqueteBinario):
+                    lineas = [trama.datos for trama in protocolo.desempaquetar(datos) or ()]
+                else:
+                    lineas = [datos]
+                for linea in lineas:
+                    codigo = linea[:7]
+                    if codigo == b"16:1:03" and anterior == b"16:1:02":
+                        tercio["utiles"] += 1
+                    anterior = codigo if codigo != b"16:1:02" or anterior == b"16:1:01" else b""
+                    control.registrar_trama(t, linea)
+            if not periodos or periodos[-1][1:] != (sim.periodo_global, sim.periodo_TH):
+                periodos.append((t, sim.periodo_global, sim.periodo_TH))
+    estacion.cerrar()
+
+    duracion = segundos / 3
+    return {
+        "periodos": periodos,
+        "ajustes": control.ajustes,
+        "tercios": [{"paquetes_s": x["utiles"] / duracion,
+                     "perdida": x["perdidas"] / x["enviadas"] if x["enviadas"] else 0.0}
+                    for x in tercios],
+    }
+
+
+def medir_control_enlace(segundos, capacidad):
+    """
+    Periodos fijos (el de por defecto y el mínimo del firmware) frente al
+    ajuste automático. En el último tercio el controlado debe haber
+    convergido: pérdida cerca del objetivo y periodo dentro del diente de
+    sierra de AIMD (máximo menos del doble del mínimo).
+    """
+    resultados = {
+        "fijo_5000": simular_enlace(segundos, capacidad, 5000, controlado=False),
+        "fijo_500": simular_enlace(segundos, capacidad, 500, controlado=False),
+        "controlado": simular_enlace(segundos, capacidad, 5000, controlado=True),
+    }
+    control = resultados["controlado"]
+    final = [g for t, g, _ in control["periodos"] if t >= 2 * segundos / 3] or [control["periodos"][-1][1]]
+    objetivo = ControlEnlace(None).perdida_objetivo
+    control["periodo_final_ms"] = {"min": min(final), "max": max(final)}
+    control["convergido"] = (control["tercios"][2]["perdida"] <= 2 * objetivo
+                             and max(final) < 2 * min(final))
+    return resultados
+
+
+def medir_formatos(segundos, capacidad, segundos_flujo=60):
+    """
+    Tramas ASCII frente a binarias con el mismo satélite simulado:
+        - bytes en el enlace y tiempo de separar + decodificar + procesar por
+          muestra (T/H o punto del radar), con segundos_flujo s de telemetría
+          a 100 ms (T/H) y 20 ms (radar);
+        - paquetes de T/H útiles por segundo con el ajuste automático sobre
+          un enlace de `capacidad` bytes/s (simular_enlace).
+    """
+    resultados = {}
+    for nombre, binario in (("ascii", False), ("binario", True)):
+        bloques = list(flujo_sintetico(segundos_flujo, 100, 20, 0.0, 0.0, semilla=5, binario=binario))
+        estacion = EstacionTierra(_TransporteNulo())
+        estacion.recibiendo = estacion.recepcion_activa = True
+        estacion.t0_TH = time.time()
+        t_ini = time.perf_counter()
+        with open(os.devnull, "w") as nulo, contextlib.redirect_stdout(nulo):
+            for datos in separar_tramas(bloques, protocolo.SeparadorTramas(binario=binario)):
+                datos = protocolo.limpiar(datos)
+                if datos:
+                    estacion.procesar_trama(datos)
+        duracion = time.perf_counter() - t_ini
+        muestras = estacion.serie_TH.total + estacion.serie_radar.total
+        estacion.cerrar()
+        enlace = simular_enlace(segundos, capacidad, 5000, controlado=True, binario=binario)
+        resultados[nombre] = {
+            "bytes_muestra": sum(len(b) for b in bloques) / muestras,
+            "us_muestra": 1e6 * duracion / muestras,
+            "paquetes_s": enlace["tercios"][2]["paquetes_s"],
+            "perdida": enlace["tercios"][2]["perdida"],
+            "periodo_global_final": enlace["periodos"][-1][1],
+        }
+    ascii_, binario = resultados["ascii"], resultados["binario"]
+    resultados["reduccion_bytes"] = ascii_["bytes_muestra"] / binario["bytes_muestra"]
+    resultados["mejora_paquetes"] = (binario["paquetes_s"] / ascii_["paquetes_s"]
+                                     if ascii_["paquetes_s"] else None)
+    return resultados
+
+
+def medir_render(frames, puntos_TH):
+    """Tiempo por frame de las gráficas (Agg), dibujado completo frente a blit."""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from render import DibujoBlit, ContadorFrames
+    from radar import RejillaOcupacion
+
+    x = np.arange(puntos_TH, dtype=float)
+    y = 25 + np.sin(x / 10)
+
+    fig_temp, ejes = plt.subplots(3, 1, figsize=(6, 8))
+    lineas = [ax.plot(x, y)[0] for ax in ejes]
+    fig_radar = plt.figure(figsize=(6, 6))
+    ax_radar = fig_radar.add_subplot(111, polar=True)
+    ax_radar.set_thetamin(-90)
+    ax_radar.set_thetamax(90)
+    ax_radar.set_ylim(0, 200)
+    rejilla = RejillaOcupacion()
+    malla = ax_radar.pcolormesh(rejilla.bordes_angulo, rejilla.bordes_distancia,
+                                rejilla.ocupacion().T, vmin=0.0, vmax=1.0, shading="flat")
+    linea_radar, = ax_radar.plot([], [], linewidth=2)
+    texto = ax_radar.text(0.5, 1.0, "", transform=ax_radar.transAxes, ha="center")
+
+    resultados = {}
+    for nombre, fig, artistas in (("TH", fig_temp, lineas + [ax.title for ax in ejes]),
+                                  ("radar", fig_radar, [malla, linea_radar, texto])):
+        completos = []
+        for i in range(frames):
+            t = time.perf_counter_ns()
+            fig.canvas.draw()
+            completos.append(time.perf_counter_ns() - t)
+
+        contador = ContadorFrames()
+        blit = DibujoBlit(fig.canvas, artistas, contador)
+        blit.actualizar(completo=True)
+        blits = []
+        for i in range(frames):
+            for linea in lineas:
+                linea.set_ydata(np.roll(y, i))
+            angulo = np.deg2rad(i * 2 % 180 - 90)
+            rejilla.agregar(angulo, 100.0 + 20 * np.sin(i), t=i * 0.6)
+            malla.set_array(rejilla.ocupacion(t=i * 0.6).T.ravel())
+            linea_radar.set_data(np.deg2rad(np.arange(7) * 2 + i % 180 - 90), np.full(7, 100.0))
+            texto.set_text(f"frame {i}")
+            t = time.perf_counter_ns()
+            blit.actualizar()
+            blits.append(time.perf_counter_ns() - t)
+        resultados[nombre] = {"completo": percentiles(completos), "blit": percentiles(blits)}
+        plt.close(fig)
+    return resultados
+
+
+def version_codigo():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banco de pruebas de la estación de Tierra")
+    parser.add_argument("--entrada", help="archivo con bytes crudos grabados del puerto")
+    parser.add_argument("--segundos", type=float, default=300,
+                        help="segundos de telemetría sintética para el pipeline")
+    parser.add_argument("--periodo-th", type=int, default=100, help="periodo T/H simulado (ms)")
+    parser.add_argument("--intervalo-dist", type=int, default=20, help="periodo del radar simulado (ms)")
+    parser.add_argument("--tasa-error", type=float, default=0.01)
+    parser.add_argument("--tasa-corrupcion", type=float, default=0.01)
+    parser.add_argument("--checksum", choices=("suma", "crc16"), default=None,
+                        help="el satélite simulado añade checksum a cada trama")
+    parser.add_argument("--binario", action="store_true",
+                        help="el satélite simulado envía las tramas de datos en binario (16:1:8:1|)")
+    parser.add_argument("--horas", type=int, default=0, help="horas simuladas para medir memoria")
+    parser.add_argument("--frames", type=int, default=50, help="frames para medir el dibujado")
+    parser.add_argument("--puntos-th", type=int, default=300, help="puntos visibles en T/H")
+    parser.add_argument("--control-enlace", type=float, default=0,
+                        help="segundos simulados para probar el ajuste automático de periodos")
+    parser.add_argument("--capacidad", type=float, default=50,
+                        help="capacidad del enlace simulado (bytes/s) para --control-enlace y --formatos")
+    parser.add_argument("--formatos", type=float, default=0,
+                        help="segundos simulados para comparar tramas ASCII y binarias en el enlace")
+    parser.add_argument("--salida", default="benchmark.json")
+    parser.add_argument("--log", help="archivo de registro (por defecto se descarta el registro)")
+    parser.add_argument("--log-sincrono", action="store_true",
+                        help="escribe el registro en el hilo que registra (para comparar con la cola)")
+    args = parser.parse_args(argv)
+
+    if args.log and not args.log_sincrono:
+        registro.configurar_registro(args.log, modo="w", max_bytes=0)
+    elif args.log:
+        logging.basicConfig(level=logging.INFO, filename=args.log, filemode="w",
+                            format="%(asctime)s - %(levelname)s - %(message)s")
+    else:
+        logging.basicConfig(level=logging.INFO, handlers=[logging.NullHandler()])
+
+    if args.entrada:
+        with open(args.entrada, "rb") as f:
+            bloques = [f.read()]
+        origen = args.entrada
+    else:
+        bloques = list(flujo_sintetico(args.segundos, args.periodo_th, args.intervalo_dist,
+                                       args.tasa_error, args.tasa_corrupcion, args.checksum,
+                                       binario=args.binario))
+        origen = "sintetico"
+
+    resultados = {
+        "version": version_codigo(),
+        "fecha": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "origen": origen,
+        "parametros": vars(args),
+        "pipeline": medir_pipeline(bloques),
+    }
+    if args.horas:
+        resultados["memoria"] = medir_memoria(args.horas)
+    if args.frames:
+        resultados["render"] = medir_render(args.frames, args.puntos_th)
+    if args.control_enlace:
+        resultados["control_enlace"] = medir_control_enlace(args.control_enlace, args.capacidad)
+    if args.formatos:
+        resultados["formatos"] = medir_formatos(args.formatos, args.capacidad)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+
+    p = resultados["pipeline"]
+    print(f"Tramas: {p['tramas']}")
+    for etapa in ("separar", "decodificar", "procesar"):
+        e = p[etapa]
+        print(f"  {etapa:12s} {e.get('tramas_s', 0):12.0f} tramas/s   p50 {e.get('p50_us', 0):8.1f} us"
+              f"   p99 {e.get('p99_us', 0):8.1f} us")
+    for nombre, r in resultados.get("render", {}).items():
+        print(f"  render {nombre:6s} completo p50 {r['completo']['p50_us'] / 1000:6.1f} ms"
+              f"   blit p50 {r['blit']['p50_us'] / 1000:6.1f} ms")
+    for m in resultados.get("memoria", []):
+        print(f"  memoria tras {m['hora']} h: {m['bytes'] / 1e6:.1f} MB")
+    for nombre, r in resultados.get("control_enlace", {}).items():
+        ultimo = r["tercios"][2]
+        print(f"  enlace {nombre:10s} último tercio: {ultimo['paquetes_s']:.2f} paquetes T/H/s"
+              f"   pérdida {ultimo['perdida']:.1%}   ajustes {r['ajustes']}")
+    control = resultados.get("control_enlace", {}).get("controlado")
+    if control:
+        print(f"  periodo_global final {control['periodo_final_ms']['min']}-{control['periodo_final_ms']['max']} ms"
+              f"   convergido: {'sí' if control['convergido'] else 'no'}")
+    formatos = resultados.get("formatos")
+    if formatos:
+        for nombre in ("ascii", "binario"):
+            f = formatos[nombre]
+            print(f"  formato {nombre:8s} {f['bytes_muestra']:5.1f} bytes/muestra   {f['us_muestra']:6.1f} us/muestra"
+                  f"   {f['paquetes_s']:.2f} paquetes T/H/s (pérdida {f['perdida']:.1%},"
+                  f" periodo_global {f['periodo_global_final']} ms)")
+        mejora = formatos["mejora_paquetes"]
+        print(f"  binario: {formatos['reduccion_bytes']:.1f}x menos bytes"
+              + (f", {mejora:.1f}x paquetes T/H útiles" if mejora else ""))
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Buffer circular de tamaño fijo (NumPy) para las series temporales de la estación.
+
+Sustituye a las listas que crecían sin límite (tiempos_TH, temperaturas,
+humedades, medias_10). Todo se guarda en float64 y los huecos (errores de
+lectura o recepción en pausa) se guardan como NaN, que matplotlib dibuja
+como un corte en la línea.
+"""
+
+import numpy as np
+
+
+class BufferCircular:
+    """
+    Buffer circular preasignado con una columna de tiempos monótona y varias
+    columnas de datos.
+
+    Cada muestra se escribe dos veces (posición i e i + capacidad) para que las
+    últimas n muestras estén siempre contiguas en memoria. Así ventana() y
+    ultimos() devuelven vistas de NumPy sin copiar nada, da igual cuánto tiempo
+    lleve funcionando la estación.
+    """
+
+    def __init__(self, capacidad, columnas):
+        if capacidad <= 0:
+            raise ValueError("La capacidad del buffer debe ser positiva")
+        self.capacidad = int(capacidad)
+        self.columnas = ("tiempo",) + tuple(columnas)
+        self._indice = {nombre: i for i, nombre in enumerate(self.columnas)}
+        self._datos = np.full((len(self.columnas), 2 * self.capacidad), np.nan)
+        self._pos = 0      # siguiente posición de escritura (0..capacidad-1)
+        self._n = 0        # muestras válidas guardadas (máx. capacidad)
+        self.total = 0     # muestras añadidas desde el inicio (incluye las sobrescritas)
+
+    def __len__(self):
+        return self._n
+
+    def _rango(self, n):
+        """Índices [inicio, fin) de las últimas n muestras dentro de la zona duplicada."""
+        fin = self._pos + self.capacidad
+        return fin - n, fin
+
+    def agregar(self, t, *valores):
+        """Añade una muestra (tiempo + un valor por columna). Los tiempos nunca retroceden."""
+        if len(valores) != len(self.columnas) - 1:
+            raise ValueError("Número de valores distinto al número de columnas")
+        if self._n and t < self.ultimo("tiempo"):
+            t = self.ultimo("tiempo")
+
+        i = self._pos
+        j = i + self.capacidad
+        self._datos[0, i] = self._datos[0, j] = t
+        for k, v in enumerate(valores, start=1):
+            v = np.nan if v is None else v
+            self._datos[k, i] = self._datos[k, j] = v
+
+        self._pos = (i + 1) % self.capacidad
+        if self._n < self.capacidad:
+            self._n += 1
+        self.total += 1
+
+    def fijar_ultimo(self, columna, valor):
+        """Sobrescribe el valor de una columna en la última muestra añadida."""
+        if not self._n:
+            return
+        k = self._indice[columna]
+        i = (self._pos - 1) % self.capacidad
+        valor = np.nan if valor is None else valor
+        self._datos[k, i] = self._datos[k, i + self.capacidad] = valor
+
+    def ultimo(self, columna):
+        """Último valor de una columna (NaN si el buffer está vacío)."""
+        if not self._n:
+            return np.nan
+        return float(self._datos[self._indice[columna], (self._pos - 1) % self.capacidad])
+
+    def ultimos(self, columna, n):
+        """Vista (sin copia) de los últimos n valores de una columna."""
+        n = min(n, self._n)
+        ini, fin = self._rango(n)
+        return self._datos[self._indice[columna], ini:fin]
+
+    def vista(self, columna):
+        """Vista (sin copia) de toda la columna, de la muestra más antigua a la más reciente."""
+        return self.ultimos(columna, self._n)
+
+    def ventana(self, t_min, t_max):
+        """
+        Devuelve un diccionario columna -> vista con las muestras cuyo tiempo
+        está en [t_min, t_max]. Incluye la muestra anterior a t_min para que la
+        línea entre desde el borde izquierdo de la gráfica.
+        """
+        ini, fin = self._rango(self._n)
+        tiempos = self._datos[0, ini:fin]
+        a = int(np.searchsorted(tiempos, t_min, side="left"))
+        b = int(np.searchsorted(tiempos, t_max, side="right"))
+        if a > 0:
+            a -= 1
+        return {nombre: self._datos[k, ini + a:ini + b]
+                for nombre, k in self._indice.items()}
+
+    def cercano(self, t):
+        """
+        Muestra más cercana en el tiempo a t (búsqueda binaria, O(log n)).
+        Devuelve un diccionario columna -> valor, o None si el buffer está vacío.
+        """
+        if not self._n:
+            return None
+        ini, fin = self._rango(self._n)
+        tiempos = self._datos[0, ini:fin]
+        i = int(np.searchsorted(tiempos, t))
+        if i == len(tiempos) or (i > 0 and t - tiempos[i - 1] <= tiempos[i] - t):
+            i -= 1
+        return {nombre: float(self._datos[k, ini + i]) for nombre, k in self._indice.items()}
+
+    def vaciar(self):
+        """Elimina todas las muestras (no libera la memoria preasignada)."""
+        self._datos.fill(np.nan)
+        self._pos = 0
+        self._n = 0
+        self.total = 0
@@ -0,0 +1,323 @@
+"""
+Cola de comandos hacia el satélite con confirmación y reenvío adaptativo.
+
+Los comandos (16:1:4:<periodo>|, 16:2:1:<ang>|...) ya no se escriben sin
+más: PlanificadorComandos los envía de uno en uno y espera la respuesta
+que el satélite da a cada uno antes de mandar el siguiente (parada y
+espera). Hace falta porque:
+    - la estación de Tierra (Estacion_tierra.ino) lee todo lo que hay en
+      el puerto y solo reenvía el último comando: dos comandos seguidos
+      pierden el primero;
+    - el enlace LoRa está limitado por periodo_global.
+
+Cada comando tiene una clave (periodo, periodo_global, angulo, envio,
+media, formato). Mientras hay uno en vuelo, los que llegan con la misma clave se
+sustituyen: solo se envía el último ángulo o periodo pedido. Las
+respuestas se reconocen así:
+    - mensajes 16:0 del satélite ("periodo de envío = 2000 ms", "fuera
+      de rango"...) -> confirmado / rechazado;
+    - 16:2:0:<anguloServo>| y 16:2:-1| para el servo;
+    - "checksum incorrecto" -> se reenvía en seguida.
+Si no llega respuesta en el tiempo de espera se reenvía con espera doble
+(hasta `reintentos` veces). El tiempo de espera se adapta al tiempo de ida
+y vuelta medido (SRTT + 4·RTTVAR, como TCP; los reenvíos no se miden).
+
+El firmware ignora un comando idéntico al último que recibió: si la
+respuesta se pierde, reenviarlo no produce otra y el comando acaba como
+"sin_confirmar" (puede que sí se aplicara). Por lo mismo, un comando igual
+al último confirmado no se vuelve a enviar ("omitido").
+
+Un firmware que no responde a los comandos (sin mensajes 16:0) no debe
+dejar la cola parada en reenvíos: si el primer comando se queda sin
+respuesta y el satélite aún no ha contestado a ninguno, ese y los
+siguientes se envían sin esperar ("enviado"), respetando la separación
+mínima. En cuanto llega cualquier mensaje 16:0 o 16:2 se vuelve a esperar
+por cada comando; al vaciar la cola (otro puerto) se vuelve a probar.
+
+Estados finales que se notifican con al_resultado(comando, estado):
+    confirmado, rechazado, sin_confirmar, reemplazado, omitido, enviado
+("enviado" = comando sin respuesta conocida, se envía y no se espera).
+"""
+
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import protocolo
+
+# (grupo, codigo) -> (clave, confirmación, rechazo). Expresiones sobre el texto
+# de los mensajes 16:0; {v} es el valor del comando. Sin acentos a propósito.
+RESPUESTAS = {
+    (1, 1): ("envio", r"T/H activado", None),
+    (1, 3): ("envio", r"T/H activado", None),
+    (1, 2): ("envio", r"T/H detenido", None),
+    (1, 4): ("periodo", r"periodo de env\S* = {v} ms", r"periodo de env\S* fuera de rango"),
+    (1, 5): ("media", r"calculada en Tierra", None),
+    (1, 6): ("media", r"calculada en el propio sat", None),
+    (1, 7): ("periodo_global", r"periodo GLOBAL de env\S* = {v} ms", r"periodo GLOBAL fuera de rango"),
+    (1, 8): ("formato", r"formato de tramas = {v}", r"formato de tramas fuera de rango"),
+    (2, 1): ("angulo", None, r"servo fuera de rango"),   # confirmación: 16:2:0:<anguloServo>|
+}
+CHECKSUM_INCORRECTO = "checksum incorrecto"
+
+CONFIRMADO = "confirmado"
+RECHAZADO = "rechazado"
+SIN_CONFIRMAR = "sin_confirmar"
+REEMPLAZADO = "reemplazado"
+OMITIDO = "omitido"
+ENVIADO = "enviado"
+
+
+class Comando:
+    """Un comando en la cola: bytes, clave de agrupación y cómo reconocer su respuesta."""
+
+    __slots__ = ("datos", "clave", "valor", "confirmacion", "rechazo",
+                 "secuencia", "intentos", "t_envio", "t_primero", "limite")
+
+    def __init__(self, datos, secuencia):
+        self.datos = datos
+        self.secuencia = secuencia
+        self.intentos = 0
+        self.t_envio = self.t_primero = self.limite = None
+        campos = protocolo.limpiar(datos).split(protocolo.SEPARADOR)
+        try:
+            grupo, codigo = int(campos[1]), int(campos[2])
+        except (IndexError, ValueError):
+            grupo = codigo = None
+        self.valor = campos[3].decode("ascii", errors="replace") if len(campos) > 3 else ""
+        clave, confirmacion, rechazo = RESPUESTAS.get((grupo, codigo), (None, None, None))
+        self.clave = clave
+        v = re.escape(self.valor)
+        self.confirmacion = re.compile(confirmacion.replace("{v}", v)) if confirmacion else None
+        self.rechazo = re.compile(rechazo.replace("{v}", v)) if rechazo else None
+
+    @property
+    def espera_respuesta(self):
+        return self.clave is not None
+
+    def __repr__(self):
+        return f"Comando({self.secuencia}, {self.datos!r})"
+
+
+class PlanificadorComandos:
+    """
+    Envía los comandos de uno en uno con transmitir(bytes) y espera su
+    respuesta. encolar() se puede llamar desde cualquier hilo; las
+    respuestas llegan con recibir_texto() / recibir_servo() desde el hilo
+    de recepción. Un hilo propio vigila los tiempos de espera.
+    """
+
+    def __init__(self, transmitir, al_resultado=None, reintentos=3,
+                 espera_inicial=2.0, espera_min=0.5, espera_max=20.0, separacion=0.1):
+        self.transmitir = transmitir
+        self.al_resultado = al_resultado
+        self.reintentos = reintentos
+        self.espera_min = espera_min
+        self.espera_max = espera_max
+        self.separacion = separacion       # s mínimos entre dos transmisiones
+        self._espera = espera_inicial      # tiempo de espera actual (RTO)
+        self._srtt = None
+        self._rttvar = None
+        self._pendientes = OrderedDict()   # clave (o secuencia) -> Comando, en orden de llegada
+        self._en_vuelo = None
+        self._ultimo_confirmado = None     # bytes del último comando confirmado (firmware: ultimo_comando)
+        self._t_ultima_tx = 0.0
+        self._secuencia = 0
+        self.responde = None               # None: aún no se sabe si el satélite responde a los comandos
+        self.contadores = {e: 0 for e in (CONFIRMADO, RECHAZADO, SIN_CONFIRMAR, REEMPLAZADO,
+                                          OMITIDO, ENVIADO)}
+        self.transmisiones = 0
+        self.reenvios = 0
+        self._cond = threading.Condition()
+        self._activo = True
+        self._hilo = threading.Thread(target=self._bucle, name="comandos", daemon=True)
+        self._hilo.start()
+
+    # -------------------------
+    # Entrada
+    # -------------------------
+    def encolar(self, datos):
+        """Añade un comando (bytes con '|'). Sustituye al pendiente con la misma clave."""
+        resultados = []
+        with self._cond:
+            self._secuencia += 1
+            comando = Comando(bytes(datos), self._secuencia)
+            clave = comando.clave or ("_", comando.secuencia)
+            anterior = self._pendientes.pop(clave, None)
+            if anterior is not None:
+                resultados.append((anterior, REEMPLAZADO))
+            self._pendientes[clave] = comando
+            self._cond.notify()
+        self._notificar(resultados)
+        return comando.secuencia
+
+    def recibir_texto(self, texto):
+        """Mensaje 16:0 del satélite: puede confirmar o rechazar el comando en vuelo."""
+        with self._cond:
+            self.responde = True
+            comando = self._en_vuelo
+            if comando is None:
+                return
+            if CHECKSUM_INCORRECTO in texto:
+                # El comando llegó dañado: se reenvía ya (cuenta como intento)
+                comando.limite = time.monotonic()
+                self._cond.notify()
+                return
+            if comando.rechazo is not None and comando.rechazo.search(texto):
+                resultado = RECHAZADO
+            elif comando.confirmacion is not None and comando.confirmacion.search(texto):
+                resultado = CONFIRMADO
+            else:
+                return
+        self._resolver(comando, resultado)
+
+    def recibir_servo(self, angulo_servo=None):
+        """16:2:0:<anguloServo>| (angulo_servo) o 16:2:-1| (None)."""
+        with self._cond:
+            self.responde = True
+            comando = self._en_vuelo
+            if comando is None or comando.clave != "angulo":
+                return
+            if angulo_servo is None:
+                resultado = RECHAZADO
+            else:
+                try:
+                    pedido = float(comando.valor) + 90.0
+                except ValueError:
+                    return
+                if abs(angulo_servo - pedido) > 0.5:
+                    return
+                resultado = CONFIRMADO
+        self._resolver(comando, resultado)
+
+    # -------------------------
+    # Estado
+    # -------------------------
+    @property
+    def pendientes(self):
+        """Comandos en cola más el que está en vuelo."""
+        with self._cond:
+            return len(self._pendientes) + (self._en_vuelo is not None)
+
+    @property
+    def espera(self):
+        """Tiempo de espera actual antes de reenviar (s)."""
+        return self._espera
+
+    def vaciar(self):
+        """Olvida los pendientes (p. ej. al cerrar el puerto)."""
+        with self._cond:
+            self._pendientes.clear()
+            self._en_vuelo = None
+            self._ultimo_confirmado = None
+            self.responde = None
+
+    def detener(self):
+        with self._cond:
+            self._activo = False
+            self._cond.notify()
+        self._hilo.join(timeout=1.0)
+
+    # -------------------------
+    # Interno
+    # -------------------------
+    def _resolver(self, comando, resultado):
+        with self._cond:
+            if self._en_vuelo is not comando:
+                return
+            self._en_vuelo = None
+            if resultado == CONFIRMADO:
+                self._ultimo_confirmado = comando.datos
+                if comando.intentos == 1:   # Karn: solo se mide sin reenvíos
+                    self._medir_rtt(time.monotonic() - comando.t_envio)
+            elif resultado == RECHAZADO:
+                # El firmware lo recibió y lo guardó como último comando
+                self._ultimo_confirmado = comando.datos
+            self._cond.notify()
+        self._notificar([(comando, resultado)])
+
+    def _medir_rtt(self, rtt):
+        if self._srtt is None:
+            self._srtt, self._rttvar = rtt, rtt / 2
+        else:
+            self._rttvar = 0.75 * self._rttvar + 0.25 * abs(self._srtt - rtt)
+            self._srtt = 0.875 * self._srtt + 0.125 * rtt
+        self._espera = min(self.espera_max, max(self.espera_min, self._srtt + 4 * self._rttvar))
+
+    def _notificar(self, resultados):
+        for comando, resultado in resultados:
+            self.contadores[resultado] += 1
+            if resultado in (RECHAZADO, SIN_CONFIRMAR):
+                logging.warning("Comando %s: %s", comando.datos, resultado)
+            else:
+                logging.info("Comando %s: %s", comando.datos, resultado)
+            if self.al_resultado is not None:
+                try:
+                    self.al_resultado(comando.datos, resultado)
+                except Exception:
+                    logging.exception("Error al notificar el resultado de un comando")
+
+    def _bucle(self):
+        while True:
+            resultados = []
+            a_transmitir = None
+            with self._cond:
+                if not self._activo:
+                    return
+                ahora = time.monotonic()
+                espera = None
+                comando = self._en_vuelo
+                if comando is not None and ahora >= comando.limite:
+                    # Sin respuesta: si ya hay uno nuevo con la misma clave, este se abandona
+                    if comando.clave in self._pendientes:
+                        self._en_vuelo = None
+                        resultados.append((comando, REEMPLAZADO))
+                    elif not self.responde:
+                        # El satélite no ha contestado nunca: no se reenvía ni se esperan los demás
+                        self.responde = False
+                        self._en_vuelo = None
+                        resultados.append((comando, ENVIADO))
+                    elif comando.intentos > self.reintentos:
+                        self._en_vuelo = None
+                        resultados.append((comando, SIN_CONFIRMAR))
+                    else:
+                        a_transmitir = comando
+                        self.reenvios += 1
+                elif comando is None and self._pendientes:
+                    hueco = self._t_ultima_tx + self.separacion - ahora
+                    if hueco > 0:
+                        espera = hueco
+                    else:
+                        _, siguiente = self._pendientes.popitem(last=False)
+                        if siguiente.espera_respuesta and siguiente.datos == self._ultimo_confirmado:
+                            resultados.append((siguiente, OMITIDO))
+                        else:
+                            a_transmitir = siguiente
+                            if siguiente.espera_respuesta and self.responde is not False:
+                                self._en_vuelo = siguiente
+                            else:
+                                resultados.append((siguiente, ENVIADO))
+                if a_transmitir is not None:
+                    if a_transmitir.datos != self._ultimo_confirmado:
+                        self._ultimo_confirmado = None   # el firmware ya tendrá otro "último comando"
+                    a_transmitir.intentos += 1
+                    a_transmitir.t_envio = self._t_ultima_tx = ahora
+                    if a_transmitir.t_primero is None:
+                        a_transmitir.t_primero = ahora
+                    # Espera exponencial: se dobla con cada reenvío
+                    a_transmitir.limite = ahora + min(self.espera_max,
+                                                      self._espera * 2 ** (a_transmitir.intentos - 1))
+                    self.transmisiones += 1
+                elif not resultados:
+                    if self._en_vuelo is not None:
+                        espera = max(0.0, self._en_vuelo.limite - ahora)
+                    self._cond.wait(espera)
+                    continue
+            if a_transmitir is not None:
+                try:
+                    self.transmitir(a_transmitir.datos)
+                except Exception:
+                    logging.exception("Error al transmitir %s", a_transmitir.datos)
+            self._notificar(resultados)
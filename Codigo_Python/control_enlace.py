@@ -0,0 +1,199 @@
+"""
+Ajuste automático de los periodos de envío según el estado del enlace.
+
+ControlEnlace mide en Tierra, por ventanas, lo que llega del satélite:
+    - el tiempo entre llegadas de cada tipo de trama periódica: 16:1:01,
+      02 y 03 (cada periodo de T/H) y 16:3 (cada INTERVALO_DIST del radar).
+      Un hueco de k periodos son k - 1 tramas perdidas. Se mira cada tipo
+      por separado porque al saturarse LoRa la primera trama de cada
+      ráfaga suele llegar y se pierden las de detrás;
+    - tramas dañadas: checksum incorrecto y resincronizaciones
+      (protocolo.ContadoresEnlace) y bytes que no son tramas 16:;
+    - tramas de error del DHT (16:1:-1 / 16:1:-2).
+y ajusta con AIMD (como TCP) dos periodos:
+    - periodo del enlace -> periodo_global (16:1:7): si la pérdida de la
+      ventana no pasa de perdida_objetivo la tasa (paquetes/s) sube
+      `incremento`; si la pasa se multiplica por `reduccion`. Así se queda
+      oscilando justo por debajo de lo que aguanta el enlace LoRa;
+    - periodo del sensor -> periodo (16:1:4): lo mismo con la proporción de
+      tramas de error del DHT. Nunca es menor que el del enlace.
+Solo se envía un comando cuando el periodo redondeado cambia, y cada ajuste
+queda en el log. Mientras haya comandos sin confirmar (pendientes()) la
+ventana se descarta: el satélite aún no tiene los periodos que se creen. El hueco entre la última trama de T/H con el periodo
+anterior y la primera con el nuevo no se mide.
+
+Las medidas se hacen con las tramas que llegan (registrar_trama), sin hilo
+propio: si no llega nada no se evalúa (con el radar llega algo cada 600 ms).
+Los tiempos los da quien llama, así que funciona igual en tiempo simulado
+(benchmark.py --control-enlace, test_control_enlace.py).
+"""
+
+import collections
+import logging
+
+import protocolo
+
+# Rangos que acepta el firmware (Satélite.ino)
+PERIODO_MIN = 500
+PERIODO_MAX_TH = 5000
+PERIODO_MAX_GLOBAL = 10000
+INTERVALO_RADAR = 600   # INTERVALO_DIST (ms), fijo en el firmware
+REDONDEO_MS = 50
+_TRAMAS_TH = (b"01", b"02", b"03")
+_ERRORES = (b"-1", b"-2")
+
+
+class ControlEnlace:
+    """
+    enviar(bytes) manda los comandos (EstacionTierra.enviar); contadores es
+    el protocolo.ContadoresEnlace del decodificador y pendientes() el número
+    de comandos aún sin respuesta. Con activo=False registrar_trama() no
+    hace nada.
+    """
+
+    def __init__(self, enviar, contadores=None, pendientes=None, periodo_global=5000, periodo_TH=5000,
+                 perdida_objetivo=0.05, errores_objetivo=0.05, incremento=0.05,
+                 reduccion=0.75, paquetes_ventana=8, ventana_min=10.0, activo=False):
+        self.enviar = enviar
+        self.contadores = contadores
+        self.pendientes = pendientes
+        self.perdida_objetivo = perdida_objetivo
+        self.errores_objetivo = errores_objetivo
+        self.incremento = incremento          # paquetes/s que sube la tasa en cada ventana buena
+        self.reduccion = reduccion            # factor de la tasa en una ventana con pérdidas
+        self.paquetes_ventana = paquetes_ventana
+        self.ventana_min = ventana_min        # s mínimos por ventana
+        self.activo = activo
+        self.ajustes = 0
+        self.perdida = None                   # pérdida de la última ventana
+        self.historial = collections.deque(maxlen=1000)   # (t, perdida, errores, global, TH)
+        self._llegadas = {}                   # (grupo, código) -> instante de la última trama
+        self.fijar_periodos(periodo_global, periodo_TH)
+
+    # -------------------------
+    # Estado
+    # -------------------------
+    def fijar_periodos(self, periodo_global=None, periodo_TH=None):
+        """Periodos en vigor (p. ej. puestos a mano desde la GUI). Empieza una ventana nueva."""
+        if periodo_global is not None:
+            self.periodo_global = int(periodo_global)
+            self._tasa_enlace = 1000.0 / max(PERIODO_MIN, self.periodo_global or PERIODO_MIN)
+        if periodo_TH is not None:
+            self.periodo_TH = int(periodo_TH)
+            self._tasa_sensor = 1000.0 / self.periodo_TH
+        self._reiniciar_ventana(None)
+        self._olvidar_TH()
+
+    @property
+    def periodo_efectivo(self):
+        """Periodo real de los paquetes de T/H (ms): el del sensor limitado por el global."""
+        return max(self.periodo_TH, self.periodo_global)
+
+    def _reiniciar_ventana(self, t):
+        self._t_ventana = t
+        self._paquetes = 0
+        self._recibidas = 0
+        self._perdidas = 0
+        self._errores = 0
+        self._no_tramas = 0
+        self._danadas_base = self._danadas_totales()
+
+    def _danadas_totales(self):
+        if self.contadores is None:
+            return 0
+        return sum(fila["malas"] + fila["resincronizadas"] for fila in self.contadores.resumen().values())
+
+    # -------------------------
+    # Medida
+    # -------------------------
+    def registrar_trama(self, t, datos):
+        """Una trama recibida (bytes sin '|') en el instante t (s)."""
+        if not self.activo:
+            return
+        if self._t_ventana is None:
+            self._t_ventana = t
+        payload, _ = protocolo.verificar(protocolo.limpiar(datos))
+        partes = payload.split(protocolo.SEPARADOR, 3)
+        if len(partes) < 3 or partes[0] != b"16":
+            self._no_tramas += 1
+        elif partes[1] == b"1" and partes[2] in _TRAMAS_TH:
+            if partes[2] == b"01":
+                self._paquetes += 1
+            self._llegada(t, (b"1", partes[2]), self.periodo_efectivo)
+        elif partes[1] == b"1" and partes[2] in _ERRORES:
+            # Paquete con error: ocupa el sitio de 01, 02 y 03 de ese periodo
+            self._paquetes += 1
+            self._errores += 1
+            for codigo in _TRAMAS_TH:
+                if codigo == b"01" or (b"1", codigo) in self._llegadas:
+                    self._llegada(t, (b"1", codigo), self.periodo_efectivo)
+        elif partes[1] == b"3":
+            self._llegada(t, (b"3", None), INTERVALO_RADAR)
+        if t - self._t_ventana >= max(self.ventana_min,
+                                      self.paquetes_ventana * self.periodo_efectivo / 1000.0):
+            self._ajustar(t)
+
+    def _llegada(self, t, clave, periodo_ms):
+        self._recibidas += 1
+        anterior = self._llegadas.get(clave)
+        if anterior is not None:
+            self._perdidas += max(0, round((t - anterior) * 1000.0 / periodo_ms) - 1)
+        self._llegadas[clave] = t
+
+    def _olvidar_TH(self):
+        # El hueco hasta la primera trama con el periodo nuevo no cuenta
+        for clave in [c for c in self._llegadas if c[0] == b"1"]:
+            del self._llegadas[clave]
+
+    # -------------------------
+    # Ajuste (AIMD)
+    # -------------------------
+    def _ajustar(self, t):
+        if self.pendientes is not None and self.pendientes():
+            self._olvidar_TH()
+            self._reiniciar_ventana(t)
+            return
+        danadas = self._danadas_totales() - self._danadas_base + self._no_tramas
+        esperadas = self._recibidas + self._perdidas
+        if esperadas == 0:
+            self._reiniciar_ventana(t)
+            return
+        perdida = min(1.0, (self._perdidas + danadas) / esperadas)
+        errores = self._errores / self._paquetes if self._paquetes else 0.0
+        self.perdida = perdida
+
+        if perdida > self.perdida_objetivo:
+            self._tasa_enlace *= self.reduccion
+        else:
+            self._tasa_enlace += self.incremento
+        if errores > self.errores_objetivo:
+            self._tasa_sensor *= self.reduccion
+        else:
+            self._tasa_sensor += self.incremento
+        self._tasa_enlace = min(1000.0 / PERIODO_MIN, max(1000.0 / PERIODO_MAX_GLOBAL, self._tasa_enlace))
+        self._tasa_sensor = min(self._tasa_enlace, max(1000.0 / PERIODO_MAX_TH, self._tasa_sensor))
+
+        nuevo_global = _redondear(1000.0 / self._tasa_enlace, PERIODO_MAX_GLOBAL)
+        nuevo_TH = _redondear(1000.0 / self._tasa_sensor, PERIODO_MAX_TH)
+        self.historial.append((t, perdida, errores, nuevo_global, nuevo_TH))
+        cambios = []
+        if nuevo_global != self.periodo_global:
+            self.enviar(protocolo.comando_periodo_global(nuevo_global))
+            cambios.append(f"periodo_global {self.periodo_global} -> {nuevo_global} ms")
+            self.periodo_global = nuevo_global
+        if nuevo_TH != self.periodo_TH:
+            self.enviar(protocolo.comando_periodo(nuevo_TH))
+            cambios.append(f"periodo {self.periodo_TH} -> {nuevo_TH} ms")
+            self.periodo_TH = nuevo_TH
+        if cambios:
+            self.ajustes += 1
+            self._olvidar_TH()
+            logging.info("Control de enlace: pérdida %.1f%% (%d perdidas, %d dañadas de %d), "
+                         "errores DHT %.1f%% -> %s", 100 * perdida, self._perdidas, danadas,
+                         esperadas, 100 * errores, ", ".join(cambios))
+        self._reiniciar_ventana(t)
+
+
+def _redondear(periodo, maximo):
+    periodo = int(round(periodo / REDONDEO_MS)) * REDONDEO_MS
+    return min(maximo, max(PERIODO_MIN, periodo))
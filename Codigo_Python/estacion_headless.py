@@ -0,0 +1,156 @@
+"""
+Estación de Tierra sin interfaz gráfica.
+
+Recibe del puerto serie igual que la GUI y guarda la telemetría en un CSV,
+para poder dejar la estación funcionando como servicio en un equipo sin
+pantalla. Uso:
+
+    python estacion_headless.py --puerto /dev/ttyUSB0 --salida telemetria.csv
+"""
+
+import argparse
+import csv
+import logging
+import signal
+import threading
+import time
+
+import protocolo
+import registro
+from exportacion import ExportadorTelemetria, FORMATOS
+from grabacion import GrabadorTelemetria
+from metricas import ServidorMetricas, colector_registro
+from nucleo import EstacionTierra
+from transporte import TransporteAsync, crear_backend
+
+
+class EscritorTelemetria:
+    """
+    Escribe en CSV los eventos de una EstacionTierra:
+    tiempo (unix), tipo (TH / RADAR / MSG) y los valores de cada tipo.
+    """
+
+    def __init__(self, ruta, estacion):
+        self._lock = threading.Lock()
+        self._archivo = open(ruta, "a", newline="", encoding="utf-8", buffering=1)
+        self._csv = csv.writer(self._archivo)
+        if self._archivo.tell() == 0:
+            self._csv.writerow(["tiempo", "tipo", "v1", "v2", "v3", "texto"])
+        self._estacion = estacion
+        estacion.suscribir("muestra_TH", self._muestra_TH)
+        estacion.suscribir("radar", self._radar)
+        estacion.suscribir("mensaje", self._mensaje)
+
+    def _escribir(self, fila):
+        with self._lock:
+            self._csv.writerow(fila)
+
+    def _muestra_TH(self, t_rel, temp, hum, media):
+        t0 = self._estacion.t0_TH or time.time()
+        self._escribir([f"{t0 + t_rel:.3f}", "TH", temp, hum, media, ""])
+
+    def _radar(self, t, angulo_servo, distancia):
+        self._escribir([f"{t:.3f}", "RADAR", angulo_servo, distancia, "", ""])
+
+    def _mensaje(self, texto):
+        self._escribir([f"{self._estacion.ahora():.3f}", "MSG", "", "", "", texto])
+
+    def cerrar(self):
+        with self._lock:
+            self._archivo.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Estación de Tierra sin interfaz gráfica")
+    parser.add_argument("--puerto", default="COM3",
+                        help='puerto serie de la estación de Tierra ("simulador", "pty", "loopback" '
+                             'o "grabacion:<ruta>[@velocidad]" para pruebas)')
+    parser.add_argument("--baudios", type=int, default=9600)
+    parser.add_argument("--salida", default="telemetria.csv", help="archivo CSV de telemetría")
+    parser.add_argument("--checksum", choices=("suma", "crc16"), default=None,
+                        help="añade checksum a los comandos (*HH suma, como el firmware, o *HHHH CRC-16)")
+    parser.add_argument("--exigir-checksum", action="store_true",
+                        help="descarta las tramas recibidas sin checksum")
+    parser.add_argument("--exportar", default=None,
+                        help="directorio donde exportar las series T/H y radar por bloques")
+    parser.add_argument("--formato", choices=FORMATOS, default=None,
+                        help="formato de exportación (por defecto parquet si hay pyarrow, si no npz)")
+    parser.add_argument("--grabar", default=None,
+                        help="graba todas las tramas en binario (grabacion.py) en este archivo")
+    parser.add_argument("--log", default="estacion_tierra.log", help="archivo de registro")
+    parser.add_argument("--log-max-mb", type=float, default=5.0,
+                        help="tamaño máximo del registro antes de rotar (0 = sin rotación)")
+    parser.add_argument("--log-rotar", default=None,
+                        help='rotación por tiempo en lugar de por tamaño ("midnight", "H"...)')
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="sirve las métricas (formato Prometheus) y el perfilador en este puerto local")
+    parser.add_argument("--metricas-intervalo", type=float, default=60.0,
+                        help="segundos entre volcados de las métricas al registro (0 = nunca)")
+    parser.add_argument("--periodo", type=int, default=None,
+                        help="si se indica, pide al satélite iniciar el envío de T/H con este periodo (ms)")
+    parser.add_argument("--media-satelite", action="store_true",
+                        help="la media de temperatura la calcula el satélite")
+    parser.add_argument("--control-enlace", action="store_true",
+                        help="ajusta periodo_global y el periodo DHT según la pérdida medida")
+    parser.add_argument("--binario", action="store_true",
+                        help="pide al satélite las tramas de datos en binario (16:1:8:1|); "
+                             "si no lo admite se sigue recibiendo en ASCII")
+    args = parser.parse_args(argv)
+
+    registro.configurar_registro(args.log, max_bytes=int(args.log_max_mb * 1e6),
+                                 cuando=args.log_rotar)
+
+    estacion = EstacionTierra(TransporteAsync(crear_backend(args.puerto, args.baudios)),
+                              checksum_comandos=args.checksum,
+                              exigir_checksum=args.exigir_checksum)
+    escritor = EscritorTelemetria(args.salida, estacion)
+    grabador = GrabadorTelemetria(args.grabar, estacion) if args.grabar else None
+    exportador = ExportadorTelemetria(args.exportar, estacion, args.formato) if args.exportar else None
+    estacion.metricas.registrar_colector(colector_registro)
+    servidor_metricas = None
+    if args.metricas_puerto is not None:
+        servidor_metricas = ServidorMetricas(estacion.metricas, args.metricas_puerto).iniciar()
+
+    estacion.iniciar_recepcion()
+    logging.info("Recepción sin interfaz arrancada en %s", args.puerto)
+    print(f"Recibiendo de {args.puerto}. Telemetría en {args.salida}. Ctrl+C para salir.")
+
+    if args.media_satelite:
+        estacion.modo_calculo = "arduino"
+        estacion.enviar(protocolo.comando_media_satelite())
+    if args.periodo is not None:
+        estacion.enviar(protocolo.comando_iniciar())
+        estacion.enviar(protocolo.comando_periodo(args.periodo))
+    if args.binario:
+        estacion.enviar(protocolo.comando_formato(True))
+    if args.control_enlace:
+        estacion.control_enlace.fijar_periodos(periodo_TH=args.periodo)
+        estacion.control_enlace.activo = True
+
+    # Como servicio se para con SIGTERM: se cierra igual que con Ctrl+C (grabación, exportación y log)
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    t_metricas = time.monotonic()
+    try:
+        while estacion.recibiendo:
+            time.sleep(0.5)
+            if args.metricas_intervalo and time.monotonic() - t_metricas >= args.metricas_intervalo:
+                t_metricas = time.monotonic()
+                logging.info("Métricas: %s", estacion.metricas.resumen())
+    except KeyboardInterrupt:
+        print("Deteniendo la estación.")
+    finally:
+        estacion.cerrar()
+        logging.info("Enlace: %s", estacion.decodificador.contadores.resumen())
+        logging.info("Métricas: %s", estacion.metricas.resumen())
+        if servidor_metricas is not None:
+            servidor_metricas.detener()
+        escritor.cerrar()
+        if grabador is not None:
+            grabador.cerrar()
+        if exportador is not None:
+            exportador.cerrar()
+        logging.info("Recepción sin interfaz detenida.")
+
+
+if __name__ == "__main__":
+    main()
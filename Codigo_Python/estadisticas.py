@@ -0,0 +1,168 @@
+"""
+Estadísticas incrementales para el modo de cálculo "tierra" y la escala del radar.
+
+Cada muestra nueva actualiza la suma, la varianza, el mínimo y el máximo de
+la ventana en O(1) (amortizado), sin recorrer ni copiar el historial. Los
+huecos (NaN o None) ocupan su sitio en la ventana igual que antes ocupaban
+su sitio en la lista de temperaturas.
+"""
+
+from collections import deque
+import math
+
+
+class EstadisticaMovil:
+    """
+    Media, varianza, mínimo y máximo de las últimas `ventana` muestras.
+
+    La media solo se considera válida cuando la ventana está llena y no hay
+    ningún hueco, igual que la media de 10 valores calculada antes con listas.
+    """
+
+    def __init__(self, ventana=10):
+        if ventana <= 0:
+            raise ValueError("La ventana debe ser positiva")
+        self.ventana = int(ventana)
+        self._valores = deque()    # (índice, valor o NaN) en orden de llegada
+        self._maximos = deque()    # índices con valores decrecientes (cola monótona)
+        self._minimos = deque()    # índices con valores crecientes (cola monótona)
+        self._indice = 0
+        self._huecos = 0           # NaN dentro de la ventana
+        self._validos = 0
+        self._suma = 0.0
+        self._media_w = 0.0        # media de Welford de los valores válidos
+        self._m2 = 0.0             # suma de cuadrados de las desviaciones (Welford)
+
+    def __len__(self):
+        return len(self._valores)
+
+    def agregar(self, valor):
+        """Añade una muestra y devuelve la media de la ventana (NaN si no es válida)."""
+        if valor is None:
+            valor = math.nan
+        valor = float(valor)
+        i = self._indice
+        self._indice += 1
+
+        self._valores.append((i, valor))
+        if math.isnan(valor):
+            self._huecos += 1
+        else:
+            self._sumar_valido(valor)
+            while self._maximos and self._maximos[-1][1] <= valor:
+                self._maximos.pop()
+            self._maximos.append((i, valor))
+            while self._minimos and self._minimos[-1][1] >= valor:
+                self._minimos.pop()
+            self._minimos.append((i, valor))
+
+        if len(self._valores) > self.ventana:
+            j, viejo = self._valores.popleft()
+            if math.isnan(viejo):
+                self._huecos -= 1
+            else:
+                self._restar_valido(viejo)
+            if self._maximos and self._maximos[0][0] == j:
+                self._maximos.popleft()
+            if self._minimos and self._minimos[0][0] == j:
+                self._minimos.popleft()
+
+        return self.media
+
+    def _sumar_valido(self, x):
+        self._validos += 1
+        self._suma += x
+        d = x - self._media_w
+        self._media_w += d / self._validos
+        self._m2 += d * (x - self._media_w)
+
+    def _restar_valido(self, x):
+        self._validos -= 1
+        self._suma -= x
+        if self._validos == 0:
+            self._suma = self._media_w = self._m2 = 0.0
+            return
+        d = x - self._media_w
+        self._media_w -= d / self._validos
+        self._m2 = max(0.0, self._m2 - d * (x - self._media_w))
+
+    @property
+    def completa(self):
+        """True si la ventana está llena y sin huecos."""
+        return len(self._valores) == self.ventana and self._huecos == 0
+
+    @property
+    def media(self):
+        if not self.completa:
+            return math.nan
+        return self._suma / self.ventana
+
+    @property
+    def varianza(self):
+        """Varianza muestral de los valores válidos de la ventana."""
+        if self._validos < 2:
+            return math.nan
+        return self._m2 / (self._validos - 1)
+
+    @property
+    def minimo(self):
+        return self._minimos[0][1] if self._minimos else math.nan
+
+    @property
+    def maximo(self):
+        return self._maximos[0][1] if self._maximos else math.nan
+
+    @property
+    def validos(self):
+        return self._validos
+
+    def reiniciar(self):
+        self.__init__(self.ventana)
+
+
+class ExtremosVentanaTiempo:
+    """
+    Máximo y mínimo de los valores de los últimos `duracion` segundos.
+
+    Colas monótonas de (tiempo, valor): cada valor entra y sale una sola vez,
+    así que agregar() es O(1) amortizado aunque lleguen muchas muestras por
+    segundo. Los NaN se ignoran. Los tiempos deben llegar en orden.
+    """
+
+    def __init__(self, duracion):
+        self.duracion = float(duracion)
+        self._maximos = deque()   # (t, valor) con valores decrecientes
+        self._minimos = deque()   # (t, valor) con valores crecientes
+
+    def agregar(self, t, valor):
+        if valor is not None and not math.isnan(valor):
+            while self._maximos and self._maximos[-1][1] <= valor:
+                self._maximos.pop()
+            self._maximos.append((t, valor))
+            while self._minimos and self._minimos[-1][1] >= valor:
+                self._minimos.pop()
+            self._minimos.append((t, valor))
+        self.caducar(t)
+
+    def caducar(self, ahora):
+        """Quita los valores con ahora - t > duracion."""
+        limite = ahora - self.duracion
+        while self._maximos and self._maximos[0][0] < limite:
+            self._maximos.popleft()
+        while self._minimos and self._minimos[0][0] < limite:
+            self._minimos.popleft()
+
+    @property
+    def maximo(self):
+        return self._maximos[0][1] if self._maximos else math.nan
+
+    @property
+    def minimo(self):
+        return self._minimos[0][1] if self._minimos else math.nan
+
+    def __bool__(self):
+        return bool(self._maximos)
+
+    def reiniciar(self):
+        self._maximos.clear()
+        self._minimos.clear()
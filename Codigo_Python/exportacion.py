@@ -0,0 +1,253 @@
+"""
+Exportación de la telemetría (T/H y radar) a archivos por bloques.
+
+ExportadorTelemetria se suscribe a una EstacionTierra y va acumulando las
+muestras en bloques de NumPy de tamaño fijo (memoria acotada, da igual
+cuánto dure el pase). Cada bloque lleno (o con muestras de hace más de
+`intervalo` segundos, aunque no lleguen más) se escribe desde un hilo
+propio como un archivo independiente:
+
+    <directorio>/TH/TH_<t_ini_ms>_<t_fin_ms>.parquet   tiempo, temperatura, humedad, media
+    <directorio>/radar/radar_<t_ini_ms>_<t_fin_ms>.parquet   tiempo, angulo, distancia
+
+Se usa Parquet si pyarrow está instalado; si no, NPZ (o CSV si se pide).
+El intervalo de tiempo de cada bloque va en el nombre del archivo, así
+exportar_ventana() solo abre los bloques que tocan la ventana pedida y
+nunca depende de lo que hay en memoria en la GUI. Los tiempos son unix.
+"""
+
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+SERIES = {
+    "TH": ("tiempo", "temperatura", "humedad", "media"),
+    "radar": ("tiempo", "angulo", "distancia"),
+}
+FORMATOS = ("parquet", "npz", "csv")
+_FIN = object()
+
+
+def formato_por_defecto():
+    return "parquet" if pq is not None else "npz"
+
+
+# =====================================================
+# LECTURA / ESCRITURA DE UN ARCHIVO
+# =====================================================
+def escribir_archivo(ruta, columnas):
+    """Escribe un dict {nombre: array} en el formato indicado por la extensión de ruta."""
+    formato = os.path.splitext(ruta)[1].lstrip(".")
+    temporal = ruta + ".tmp"
+    if formato == "parquet":
+        if pq is None:
+            raise RuntimeError("Para exportar a Parquet hace falta pyarrow")
+        pq.write_table(pa.table(columnas), temporal)
+    elif formato == "npz":
+        with open(temporal, "wb") as f:
+            np.savez(f, **columnas)
+    elif formato == "csv":
+        np.savetxt(temporal, np.column_stack(list(columnas.values())), delimiter=",",
+                   header=",".join(columnas), comments="", fmt="%.6f")
+    else:
+        raise ValueError(f"Formato de exportación no soportado: {formato}")
+    # Quien lea el directorio nunca ve un archivo a medio escribir
+    os.replace(temporal, ruta)
+
+
+def leer_archivo(ruta, nombres):
+    """Lee un archivo escrito con escribir_archivo() como dict {nombre: array}."""
+    formato = os.path.splitext(ruta)[1].lstrip(".")
+    if formato == "parquet":
+        tabla = pq.read_table(ruta, columns=list(nombres))
+        return {n: tabla.column(n).to_numpy() for n in nombres}
+    if formato == "npz":
+        with np.load(ruta) as datos:
+            return {n: datos[n] for n in nombres}
+    datos = np.loadtxt(ruta, delimiter=",", skiprows=1, ndmin=2)
+    return {n: datos[:, i] for i, n in enumerate(nombres)}
+
+
+# =====================================================
+# EXPORTACIÓN EN STREAMING
+# =====================================================
+class _Bloque:
+    """Bloque preasignado de una serie; se reutiliza tras cada escritura."""
+
+    def __init__(self, nombres, tam):
+        self.nombres = nombres
+        self.datos = np.empty((len(nombres), tam))
+        self.n = 0
+        self.t_volcado = time.monotonic()
+
+    def agregar(self, valores):
+        if self.n == 0:
+            self.t_volcado = time.monotonic()   # el intervalo cuenta desde la primera muestra
+        self.datos[:, self.n] = valores
+        self.n += 1
+        return self.n == self.datos.shape[1]
+
+    def extraer(self):
+        columnas = {n: self.datos[i, :self.n].copy() for i, n in enumerate(self.nombres)}
+        self.n = 0
+        self.t_volcado = time.monotonic()
+        return columnas
+
+
+class ExportadorTelemetria:
+    """
+    Exporta las series de una EstacionTierra mientras llegan. Como mucho
+    guarda en memoria un bloque de tam_bloque muestras por serie; si un
+    bloque tarda más de `intervalo` segundos en llenarse el hilo escritor
+    lo escribe igual (aunque la estación ya no reciba nada).
+    """
+
+    def __init__(self, directorio, estacion=None, formato=None, tam_bloque=4096, intervalo=60.0):
+        self.directorio = directorio
+        self.formato = formato or formato_por_defecto()
+        if self.formato not in FORMATOS:
+            raise ValueError(f"Formato de exportación no soportado: {self.formato}")
+        if self.formato == "parquet" and pq is None:
+            raise RuntimeError("Para exportar a Parquet hace falta pyarrow")
+        self.intervalo = intervalo
+        self.archivos = 0
+        self._estacion = estacion
+        self._lock = threading.Lock()
+        self._bloques = {serie: _Bloque(nombres, tam_bloque) for serie, nombres in SERIES.items()}
+        for serie in SERIES:
+            os.makedirs(os.path.join(directorio, serie), exist_ok=True)
+
+        self._cola = queue.Queue()
+        self._hilo = threading.Thread(target=self._escritor, name="exportacion", daemon=True)
+        self._hilo.start()
+        if estacion is not None:
+            estacion.suscribir("muestra_TH", self._muestra_TH)
+            estacion.suscribir("radar", self._radar)
+
+    def _muestra_TH(self, t_rel, temp, hum, media):
+        t0 = self._estacion.t0_TH or time.time()
+        self.agregar("TH", (t0 + t_rel, temp, hum, media))
+
+    def _radar(self, t, angulo_servo, distancia):
+        self.agregar("radar", (t, angulo_servo - 90.0, distancia))
+
+    def agregar(self, serie, valores):
+        with self._lock:
+            bloque = self._bloques[serie]
+            if bloque.agregar(valores):
+                self._encolar(serie, bloque)
+
+    def _encolar(self, serie, bloque):
+        if bloque.n:
+            self._cola.put((serie, bloque.extraer()))
+
+    def volcar(self):
+        """Manda a escribir los bloques a medias (p. ej. antes de exportar una ventana)."""
+        with self._lock:
+            for serie, bloque in self._bloques.items():
+                self._encolar(serie, bloque)
+        self._cola.join()
+
+    def cerrar(self):
+        self.volcar()
+        self._cola.put(_FIN)
+        self._hilo.join()
+
+    def _volcar_caducados(self):
+        """Manda a escribir los bloques a medias de hace `intervalo` s. Devuelve los s hasta el siguiente."""
+        ahora = time.monotonic()
+        espera = self.intervalo
+        with self._lock:
+            for serie, bloque in self._bloques.items():
+                if not bloque.n:
+                    continue
+                restante = bloque.t_volcado + self.intervalo - ahora
+                if restante <= 0:
+                    self._encolar(serie, bloque)
+                else:
+                    espera = min(espera, restante)
+        return espera
+
+    def _escritor(self):
+        while True:
+            try:
+                trabajo = self._cola.get(timeout=self._volcar_caducados())
+            except queue.Empty:
+                continue
+            try:
+                if trabajo is _FIN:
+                    return
+                serie, columnas = trabajo
+                tiempos = columnas["tiempo"]
+                nombre = (f"{serie}_{int(tiempos.min() * 1000)}_"
+                          f"{int(np.ceil(tiempos.max() * 1000))}.{self.formato}")
+                escribir_archivo(os.path.join(self.directorio, serie, nombre), columnas)
+                self.archivos += 1
+            except Exception as e:
+                print("Error al exportar:", e)
+            finally:
+                self._cola.task_done()
+
+
+# =====================================================
+# EXPORTAR UNA VENTANA
+# =====================================================
+def bloques_en_ventana(directorio, serie, t_ini=None, t_fin=None):
+    """Archivos de una serie cuyo intervalo de tiempo (en el nombre) toca [t_ini, t_fin]."""
+    carpeta = os.path.join(directorio, serie)
+    if not os.path.isdir(carpeta):
+        return []
+    seleccion = []
+    for nombre in os.listdir(carpeta):
+        base, ext = os.path.splitext(nombre)
+        partes = base.split("_")
+        if ext.lstrip(".") not in FORMATOS or len(partes) != 3 or partes[0] != serie:
+            continue
+        ini_ms, fin_ms = int(partes[1]), int(partes[2])
+        if t_fin is not None and ini_ms > t_fin * 1000:
+            continue
+        if t_ini is not None and fin_ms < t_ini * 1000:
+            continue
+        seleccion.append((ini_ms, os.path.join(carpeta, nombre)))
+    return [ruta for _, ruta in sorted(seleccion)]
+
+
+def leer_ventana(directorio, serie, t_ini=None, t_fin=None):
+    """Lee de los archivos exportados las muestras de una serie con t_ini <= tiempo <= t_fin."""
+    nombres = SERIES[serie]
+    trozos = {n: [] for n in nombres}
+    for ruta in bloques_en_ventana(directorio, serie, t_ini, t_fin):
+        datos = leer_archivo(ruta, nombres)
+        sel = np.ones(len(datos["tiempo"]), dtype=bool)
+        if t_ini is not None:
+            sel &= datos["tiempo"] >= t_ini
+        if t_fin is not None:
+            sel &= datos["tiempo"] <= t_fin
+        for n in nombres:
+            trozos[n].append(datos[n][sel])
+    columnas = {n: np.concatenate(v) if v else np.empty(0) for n, v in trozos.items()}
+    orden = np.argsort(columnas["tiempo"], kind="stable")
+    return {n: v[orden] for n, v in columnas.items()}
+
+
+def exportar_ventana(directorio, t_ini, t_fin, destino, formato=None):
+    """
+    Exporta las series T/H y radar entre t_ini y t_fin (unix) a
+    <destino>_TH.<formato> y <destino>_radar.<formato>. Devuelve las rutas.
+    """
+    formato = formato or formato_por_defecto()
+    rutas = []
+    for serie in SERIES:
+        ruta = f"{destino}_{serie}.{formato}"
+        escribir_archivo(ruta, leer_ventana(directorio, serie, t_ini, t_fin))
+        rutas.append(ruta)
+    return rutas
@@ -0,0 +1,396 @@
+"""
+Grabación binaria de la telemetría y reproducción de pases.
+
+Cada trama recibida se guarda como un registro de ancho fijo (DTYPE_REGISTRO):
+instante de recepción (unix), estación que la recibió, grupo, código y
+hasta dos valores numéricos.
+Lo que no se puede guardar como números (mensajes del grupo 0, tramas
+corruptas o que no son del protocolo) va tal cual a un archivo de texto
+anexo (<ruta>.txt) y el registro guarda su posición y longitud.
+
+    pase.tlm      cabecera (16 bytes) + registros
+    pase.tlm.txt  bytes de las tramas de texto/corruptas
+
+LectorGrabacion abre la grabación con np.memmap: buscar un intervalo de
+tiempo es un searchsorted sobre la columna de tiempos, sin leer el resto
+del archivo. BackendGrabacion reproduce una grabación a través del
+transporte (1x, Nx o sin esperas), así que la estación y las gráficas
+funcionan igual que con el puerto serie. Uso:
+
+    python estacion_headless.py --puerto simulador --grabar pase.tlm
+    python Python.py            (con estacion_tierra = "grabacion:pase.tlm@10")
+    python grabacion.py pase.tlm --desde 60 --hasta 120
+
+Versión 2 añade el campo "estacion" (índice de la estación en supervisor.py,
+0 con una sola estación). Las grabaciones de la versión 1 se siguen leyendo.
+"""
+
+import argparse
+import asyncio
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+import protocolo
+
+MAGICO = b"GT16"
+VERSION = 2
+CABECERA = struct.Struct("<4sHH8x")   # mágico, versión, tamaño del registro
+SIN_CODIGO = b"?"
+SIN_TEXTO = -1
+
+DTYPE_REGISTRO = np.dtype([
+    ("tiempo", "<f8"),       # instante de recepción (s, unix)
+    ("estacion", "u1"),      # estación que recibió la trama (supervisor.py)
+    ("grupo", "i1"),         # -1 = trama que no es del protocolo
+    ("codigo", "S3"),        # tal cual llega ("01", "-2", "0"...)
+    ("n", "u1"),             # valores numéricos guardados (0..2)
+    ("valores", "<f8", 2),
+    ("texto", "<i8"),        # posición en el archivo .txt (SIN_TEXTO si no hay)
+    ("largo", "<u4"),        # longitud en el archivo .txt
+])
+DTYPE_REGISTRO_V1 = np.dtype([d for d in DTYPE_REGISTRO.descr if d[0] != "estacion"])
+DTYPES = {1: DTYPE_REGISTRO_V1, 2: DTYPE_REGISTRO}
+
+
+def ruta_texto(ruta):
+    return ruta + ".txt"
+
+
+# =====================================================
+# GRABACIÓN
+# =====================================================
+class GrabadorTelemetria:
+    """
+    Añade a la grabación cada trama de una EstacionTierra (evento "trama").
+    Los registros se acumulan en un bloque de NumPy y se escriben juntos,
+    cuando el bloque se llena o cada intervalo_volcado s (desde agregar() y
+    desde un hilo propio si no llega nada): si el programa muere sin
+    cerrar() se pierden como mucho esos segundos. La cabecera se escribe
+    al crear el archivo.
+    Con varias estaciones (supervisor.py) se llama a agregar() con su índice.
+    """
+
+    def __init__(self, ruta, estacion=None, tam_bloque=256, intervalo_volcado=1.0):
+        self._lock = threading.Lock()
+        nuevo = not os.path.exists(ruta) or os.path.getsize(ruta) == 0
+        self._archivo = open(ruta, "ab")
+        if nuevo:
+            self._archivo.write(CABECERA.pack(MAGICO, VERSION, DTYPE_REGISTRO.itemsize))
+            self._archivo.flush()
+        elif _leer_cabecera(ruta) is not DTYPE_REGISTRO:
+            raise ValueError(f"{ruta}: no se puede añadir a una grabación de una versión anterior")
+        self._texto = open(ruta_texto(ruta), "ab")
+        self._pos_texto = self._texto.tell()
+        self._bloque = np.zeros(tam_bloque, dtype=DTYPE_REGISTRO)
+        self._n = 0
+        self._ultimo_t = -np.inf
+        self.total = 0
+        self.intervalo_volcado = intervalo_volcado
+        self._t_volcado = time.monotonic()
+        self._fin = threading.Event()
+        self._hilo = threading.Thread(target=self._volcar_periodicamente, name="grabacion", daemon=True)
+        self._hilo.start()
+        if estacion is not None:
+            estacion.suscribir("trama", self.agregar)
+
+    def agregar(self, t, datos, trama=None, estacion=0):
+        """Guarda una trama (bytes sin '|') recibida en t. trama: la Trama ya decodificada o None."""
+        with self._lock:
+            r = self._bloque[self._n]
+            # El tiempo se mantiene monótono para poder buscar con searchsorted
+            self._ultimo_t = max(t, self._ultimo_t)
+            r["tiempo"] = self._ultimo_t
+            r["estacion"] = estacion
+            if not self._numerica(r, trama):
+                r["grupo"] = int(trama.grupo) if trama is not None and trama.grupo.isdigit() else -1
+                r["codigo"] = trama.codigo[:3] if trama is not None else SIN_CODIGO
+                r["n"] = 0
+                r["texto"] = self._pos_texto
+                r["largo"] = len(datos)
+                self._texto.write(datos)
+                self._pos_texto += len(datos)
+            self._n += 1
+            self.total += 1
+            if (self._n == len(self._bloque)
+                    or time.monotonic() - self._t_volcado >= self.intervalo_volcado):
+                self._volcar()
+
+    @staticmethod
+    def _numerica(r, trama):
+        """Rellena r si la trama es del protocolo y sus valores son números. False si no."""
+        if trama is None or trama.grupo == b"0" or len(trama.codigo) > 3:
+            return False
+        partes = trama.partes
+        try:
+            grupo = int(trama.grupo)
+            valores = [float(v) for v in partes[3:]]
+        except ValueError:
+            return False
+        if len(valores) > 2 or not -128 <= grupo <= 127:
+            return False
+        r["grupo"] = grupo
+        r["codigo"] = trama.codigo
+        r["n"] = len(valores)
+        r["valores"] = valores + [np.nan] * (2 - len(valores))
+        r["texto"] = SIN_TEXTO
+        r["largo"] = 0
+        return True
+
+    def _volcar(self):
+        self._t_volcado = time.monotonic()
+        if self._n:
+            self._texto.flush()
+            self._archivo.write(self._bloque[:self._n].tobytes())
+            self._archivo.flush()
+            self._n = 0
+
+    def volcar(self):
+        with self._lock:
+            if not self._archivo.closed:
+                self._volcar()
+
+    def _volcar_periodicamente(self):
+        # Lo que queda en el bloque cuando deja de llegar telemetría
+        while not self._fin.wait(self.intervalo_volcado):
+            self.volcar()
+
+    def cerrar(self):
+        self._fin.set()
+        self._hilo.join(timeout=1.0)
+        with self._lock:
+            self._volcar()
+            self._archivo.close()
+            self._texto.close()
+
+
+# =====================================================
+# LECTURA
+# =====================================================
+def _leer_cabecera(ruta):
+    """Comprueba la cabecera y devuelve el dtype de los registros de esa versión."""
+    with open(ruta, "rb") as f:
+        cabecera = f.read(CABECERA.size)
+    if len(cabecera) < CABECERA.size:
+        raise ValueError(f"{ruta}: grabación vacía o sin cabecera")
+    magico, version, tam = CABECERA.unpack(cabecera)
+    if magico != MAGICO:
+        raise ValueError(f"{ruta} no es una grabación de la estación de Tierra")
+    dtype = DTYPES.get(version)
+    if dtype is None or tam != dtype.itemsize:
+        raise ValueError(f"{ruta}: versión de grabación {version} no soportada")
+    return dtype
+
+
+class LectorGrabacion:
+    """Acceso aleatorio (memmap) a una grabación, por tiempo, grupo y código."""
+
+    def __init__(self, ruta):
+        dtype = _leer_cabecera(ruta)
+        n = (os.path.getsize(ruta) - CABECERA.size) // dtype.itemsize
+        if n > 0:
+            self.registros = np.memmap(ruta, dtype=dtype, mode="r",
+                                       offset=CABECERA.size, shape=(n,))
+        else:
+            self.registros = np.zeros(0, dtype=dtype)
+        self._texto = None
+        if os.path.exists(ruta_texto(ruta)) and os.path.getsize(ruta_texto(ruta)):
+            with open(ruta_texto(ruta), "rb") as f:
+                self._texto = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.registros)
+
+    @property
+    def inicio(self):
+        return float(self.registros["tiempo"][0]) if len(self) else 0.0
+
+    @property
+    def fin(self):
+        return float(self.registros["tiempo"][-1]) if len(self) else 0.0
+
+    def indices(self, t_ini=None, t_fin=None):
+        """Índices [i0, i1) de los registros con t_ini <= tiempo <= t_fin (unix)."""
+        tiempos = self.registros["tiempo"]
+        i0 = 0 if t_ini is None else int(np.searchsorted(tiempos, t_ini, side="left"))
+        i1 = len(tiempos) if t_fin is None else int(np.searchsorted(tiempos, t_fin, side="right"))
+        return i0, max(i0, i1)
+
+    def rango(self, t_ini=None, t_fin=None):
+        """Registros del intervalo (vista del memmap, sin copiar)."""
+        i0, i1 = self.indices(t_ini, t_fin)
+        return self.registros[i0:i1]
+
+    @property
+    def estaciones(self):
+        """Índices de las estaciones presentes en la grabación."""
+        if "estacion" not in self.registros.dtype.names:
+            return np.zeros(1, dtype=np.uint8)
+        return np.unique(self.registros["estacion"])
+
+    def serie(self, grupo, codigo, t_ini=None, t_fin=None, columna=0, estacion=None):
+        """(tiempos, valores) de un (grupo, codigo), p. ej. serie(1, "01") -> temperaturas."""
+        r = self.rango(t_ini, t_fin)
+        sel = (r["grupo"] == grupo) & (r["codigo"] == codigo.encode("ascii")) & (r["n"] > columna)
+        if estacion is not None and "estacion" in r.dtype.names:
+            sel &= r["estacion"] == estacion
+        return r["tiempo"][sel], r["valores"][sel, columna]
+
+    def texto(self, registro):
+        """Bytes guardados en el archivo .txt para un registro (b"" si no tiene)."""
+        if registro["texto"] == SIN_TEXTO or self._texto is None:
+            return b""
+        pos = int(registro["texto"])
+        return self._texto[pos:pos + int(registro["largo"])]
+
+    def trama(self, registro):
+        """Reconstruye los bytes de la trama (sin '|')."""
+        if registro["texto"] != SIN_TEXTO:
+            return self.texto(registro)
+        campos = [b"16", str(int(registro["grupo"])).encode("ascii"), bytes(registro["codigo"])]
+        campos += [repr(float(v)).encode("ascii") for v in registro["valores"][:registro["n"]]]
+        return b":".join(campos)
+
+    def mensajes(self, t_ini=None, t_fin=None, buscar=None, estacion=None):
+        """
+        Genera (tiempo, texto) de los mensajes 16:0 del satélite del intervalo;
+        con `buscar`, solo los que contienen ese texto (sin distinguir mayúsculas).
+        """
+        r = self.rango(t_ini, t_fin)
+        sel = (r["grupo"] == 0) & (r["texto"] != SIN_TEXTO)
+        if estacion is not None and "estacion" in r.dtype.names:
+            sel &= r["estacion"] == estacion
+        buscar = buscar.lower() if buscar else None
+        for registro in r[sel]:
+            payload, _ = protocolo.verificar(self.texto(registro), estricto=False)
+            trama = protocolo.decodificar(payload)
+            if trama is None:
+                continue
+            texto = protocolo.texto_mensaje(trama)
+            if buscar is None or buscar in texto.lower():
+                yield float(registro["tiempo"]), texto
+
+    def tramas(self, t_ini=None, t_fin=None):
+        """Genera (tiempo, bytes) de cada trama del intervalo."""
+        for registro in self.rango(t_ini, t_fin):
+            yield float(registro["tiempo"]), self.trama(registro)
+
+    def cerrar(self):
+        if self._texto is not None:
+            self._texto.close()
+        if isinstance(self.registros, np.memmap):
+            self.registros._mmap.close()
+
+
+# =====================================================
+# REPRODUCCIÓN
+# =====================================================
+class BackendGrabacion:
+    """
+    Backend del transporte que reproduce una grabación respetando los
+    tiempos de recepción. velocidad = 1 -> tiempo real; 10 -> diez veces
+    más rápido; 0 -> sin esperas. Con `estacion` solo se reproducen las
+    tramas de esa estación. Lo que la estación envía se descarta.
+
+    leer() devuelve [(tiempo, trama)]: cada trama llega a la estación con
+    su instante grabado (TransporteAsync.t_trama), así las muestras de T/H
+    y del radar conservan sus tiempos aunque se reproduzca a 10x o sin esperas.
+    """
+
+    TAM_LOTE = 64   # tramas por lectura a velocidad máxima
+
+    def __init__(self, ruta, velocidad=1.0, t_ini=None, t_fin=None, estacion=None):
+        self.ruta = ruta
+        self.velocidad = velocidad
+        self.t_ini = t_ini
+        self.t_fin = t_fin
+        self.estacion = estacion
+        self._lector = None
+        self._registros = None
+        self._pos = self._fin = 0
+        self._loop = None
+        self._t0_real = self._t0_grab = None
+
+    async def abrir(self):
+        self._lector = LectorGrabacion(self.ruta)
+        self._registros = self._lector.rango(self.t_ini, self.t_fin)
+        if self.estacion is not None and "estacion" in self._registros.dtype.names:
+            self._registros = self._registros[self._registros["estacion"] == self.estacion]
+        self._pos, self._fin = 0, len(self._registros)
+        self._loop = asyncio.get_running_loop()
+        self._t0_real = self._loop.time()
+        if self._pos < self._fin:
+            self._t0_grab = float(self._registros["tiempo"][self._pos])
+
+    async def leer(self):
+        if self._pos >= self._fin:
+            raise EOFError("Fin de la grabación")
+        registros = self._registros
+        if self.velocidad:
+            t_grab = float(registros["tiempo"][self._pos]) - self._t0_grab
+            espera = t_grab / self.velocidad - (self._loop.time() - self._t0_real)
+            if espera > 0:
+                await asyncio.sleep(espera)
+            # Todas las tramas que ya "han llegado" en una sola lectura
+            ahora = self._t0_grab + (self._loop.time() - self._t0_real) * self.velocidad
+            fin = int(np.searchsorted(registros["tiempo"], ahora, side="right"))
+            fin = min(self._fin, max(fin, self._pos + 1))
+        else:
+            await asyncio.sleep(0)
+            fin = min(self._fin, self._pos + self.TAM_LOTE)
+        tramas = [(float(r["tiempo"]), self._lector.trama(r)) for r in registros[self._pos:fin]]
+        self._pos = fin
+        return tramas
+
+    async def escribir(self, datos):
+        pass
+
+    def cerrar(self):
+        if self._lector is not None:
+            self._registros = None
+            self._lector.cerrar()
+            self._lector = None
+
+
+# =====================================================
+# ANÁLISIS RÁPIDO
+# =====================================================
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Resumen de una grabación de telemetría")
+    parser.add_argument("ruta")
+    parser.add_argument("--desde", type=float, default=None, help="segundos desde el inicio")
+    parser.add_argument("--hasta", type=float, default=None, help="segundos desde el inicio")
+    parser.add_argument("--mensajes", nargs="?", const="", default=None, metavar="TEXTO",
+                        help="lista los mensajes del satélite (los que contienen TEXTO, si se indica)")
+    args = parser.parse_args(argv)
+
+    lector = LectorGrabacion(args.ruta)
+    t0 = lector.inicio
+    t_ini = None if args.desde is None else t0 + args.desde
+    t_fin = None if args.hasta is None else t0 + args.hasta
+    r = lector.rango(t_ini, t_fin)
+    print(f"{len(lector)} tramas, {lector.fin - t0:.1f} s grabados; en el intervalo: {len(r)}")
+    if "estacion" in r.dtype.names and len(lector.estaciones) > 1:
+        for estacion in lector.estaciones:
+            print(f"  estación {estacion}: {int(np.count_nonzero(r['estacion'] == estacion))} tramas")
+    for grupo in np.unique(r["grupo"]):
+        print(f"  grupo {grupo:2d}: {int(np.count_nonzero(r['grupo'] == grupo))} tramas")
+    for nombre, codigo in (("temperatura", "01"), ("humedad", "02")):
+        _, v = lector.serie(1, codigo, t_ini, t_fin)
+        if v.size:
+            print(f"  {nombre}: media {np.nanmean(v):.2f}  min {np.nanmin(v):.2f}  max {np.nanmax(v):.2f}")
+    _, d = lector.serie(3, "0", t_ini, t_fin, columna=1)
+    if d.size:
+        print(f"  radar: {d.size} distancias, media {np.nanmean(d):.1f} cm")
+    if args.mensajes is not None:
+        for t, texto in lector.mensajes(t_ini, t_fin, args.mensajes):
+            print(f"  {t - t0:9.3f} s  {texto}")
+    lector.cerrar()
+
+
+if __name__ == "__main__":
+    main()
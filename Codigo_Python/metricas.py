@@ -0,0 +1,407 @@
+"""
+Métricas de la estación de Tierra y perfilado en caliente.
+
+RegistroMetricas guarda contadores e histogramas (con etiquetas, p. ej. el
+grupo de la trama) que se actualizan desde cualquier hilo. Lo que ya se
+cuenta en otro sitio (contadores del enlace, transporte, registro de log,
+frames de las gráficas) no se duplica: se lee en el momento de exportar con
+"colectores" (funciones que devuelven sus valores actuales).
+
+Se exporta en formato de texto de Prometheus:
+    - ServidorMetricas: servidor HTTP local (hilo propio)
+        GET /metrics          métricas
+        GET /perfil/iniciar   arranca el perfilador de muestreo
+        GET /perfil/detener   lo para y devuelve el informe
+        GET /perfil           informe hasta ahora (sin parar)
+    - resumen(): texto corto para volcarlo periódicamente al log.
+
+PerfiladorMuestreo toma cada `intervalo` s la pila de todos los hilos
+(sys._current_frames), así ve también el hilo del transporte y el de Tk,
+cosa que cProfile (un solo hilo) no hace. Se puede activar y desactivar con
+el programa en marcha. Uso:
+
+    python estacion_headless.py --puerto simulador --metricas-puerto 9108
+    curl localhost:9108/metrics
+"""
+
+import bisect
+import collections
+import logging
+import math
+import sys
+import threading
+import time
+
+# Límites (s) de los histogramas de tiempos: de 10 µs a 1 s
+LIMITES_TIEMPO = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3,
+                  1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0)
+PREFIJO = "estacion_"
+
+
+def _etiquetas(nombres, valores):
+    if not nombres:
+        return ""
+    pares = ",".join(f'{n}="{str(v)}"' for n, v in zip(nombres, valores))
+    return "{" + pares + "}"
+
+
+def _numero(valor):
+    if valor is None or (isinstance(valor, float) and math.isnan(valor)):
+        return "NaN"
+    if isinstance(valor, float) and math.isinf(valor):
+        return "+Inf" if valor > 0 else "-Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+# =====================================================
+# CONTADORES E HISTOGRAMAS
+# =====================================================
+class Contador:
+    """Contador monótono, opcionalmente separado por etiquetas."""
+
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._valores = collections.defaultdict(float)
+        self._lock = threading.Lock()
+
+    def incrementar(self, n=1, *valores):
+        with self._lock:
+            self._valores[valores] += n
+
+    def valor(self, *valores):
+        return self._valores.get(valores, 0.0)
+
+    def lineas(self):
+        with self._lock:
+            valores = sorted(self._valores.items())
+        for clave, v in valores:
+            yield f"{self.nombre}{_etiquetas(self.etiquetas, clave)} {_numero(v)}"
+
+
+class Histograma:
+    """Histograma acumulado al estilo de Prometheus (cubos con límite superior)."""
+
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, etiquetas=(), limites=LIMITES_TIEMPO):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self.limites = tuple(sorted(limites))
+        self._series = {}   # valores de etiquetas -> [cuentas por cubo (+Inf al final), suma, n]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, *valores):
+        i = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None:
+                serie = self._series[valores] = [[0] * (len(self.limites) + 1), 0.0, 0]
+            serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+
+    def medir(self, *valores):
+        """Context manager que observa el tiempo que tarda el bloque."""
+        return _Cronometro(self, valores)
+
+    def estadisticas(self, *valores):
+        """(n, media, percentil 95 aproximado por el límite de su cubo)."""
+        with self._lock:
+            serie = self._series.get(valores)
+            if serie is None or not serie[2]:
+                return 0, math.nan, math.nan
+            cuentas, suma, n = list(serie[0]), serie[1], serie[2]
+        objetivo = 0.95 * n
+        acumulado = 0
+        for limite, c in zip(self.limites + (math.inf,), cuentas):
+            acumulado += c
+            if acumulado >= objetivo:
+                return n, suma / n, limite
+        return n, suma / n, math.inf
+
+    def lineas(self):
+        with self._lock:
+            series = sorted((k, (list(v[0]), v[1], v[2])) for k, v in self._series.items())
+        nombres = self.etiquetas + ("le",)
+        for clave, (cuentas, suma, n) in series:
+            acumulado = 0
+            for limite, c in zip(self.limites + (math.inf,), cuentas):
+                acumulado += c
+                le = "+Inf" if math.isinf(limite) else repr(limite)
+                yield f"{self.nombre}_bucket{_etiquetas(nombres, clave + (le,))} {acumulado}"
+            yield f"{self.nombre}_sum{_etiquetas(self.etiquetas, clave)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(self.etiquetas, clave)} {n}"
+
+
+class _Cronometro:
+    __slots__ = ("histograma", "valores", "t_ini")
+
+    def __init__(self, histograma, valores):
+        self.histograma = histograma
+        self.valores = valores
+
+    def __enter__(self):
+        self.t_ini = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histograma.observar(time.perf_counter() - self.t_ini, *self.valores)
+        return False
+
+
+class RegistroMetricas:
+    """Conjunto de métricas de un proceso (o de una estación)."""
+
+    def __init__(self, prefijo=PREFIJO):
+        self.prefijo = prefijo
+        self._metricas = {}
+        self._colectores = []
+
+    def contador(self, nombre, ayuda, etiquetas=()):
+        return self._agregar(Contador(self.prefijo + nombre, ayuda, etiquetas))
+
+    def histograma(self, nombre, ayuda, etiquetas=(), limites=LIMITES_TIEMPO):
+        return self._agregar(Histograma(self.prefijo + nombre, ayuda, etiquetas, limites))
+
+    def _agregar(self, metrica):
+        # Pedir dos veces la misma métrica devuelve la misma (p. ej. al reabrir la GUI)
+        return self._metricas.setdefault(metrica.nombre, metrica)
+
+    def registrar_colector(self, colector):
+        """
+        colector() devuelve una lista de (nombre, tipo, ayuda, etiquetas, [(valores, valor), ...])
+        con tipo "counter" o "gauge"; se llama en cada exportación.
+        """
+        self._colectores.append(colector)
+
+    def texto_prometheus(self):
+        lineas = []
+        for metrica in self._metricas.values():
+            lineas.append(f"# HELP {metrica.nombre} {metrica.ayuda}")
+            lineas.append(f"# TYPE {metrica.nombre} {metrica.tipo}")
+            lineas.extend(metrica.lineas())
+        for colector in self._colectores:
+            try:
+                familias = colector()
+            except Exception:
+                logging.exception("Error en un colector de métricas")
+                continue
+            for nombre, tipo, ayuda, etiquetas, muestras in familias:
+                nombre = self.prefijo + nombre
+                lineas.append(f"# HELP {nombre} {ayuda}")
+                lineas.append(f"# TYPE {nombre} {tipo}")
+                for valores, valor in muestras:
+                    lineas.append(f"{nombre}{_etiquetas(etiquetas, valores)} {_numero(valor)}")
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self):
+        """Una línea con los histogramas (n, media, p95) y los contadores, para el log."""
+        partes = []
+        for metrica in self._metricas.values():
+            nombre = metrica.nombre[len(self.prefijo):]
+            if isinstance(metrica, Histograma):
+                for clave in sorted(metrica._series):
+                    n, media, p95 = metrica.estadisticas(*clave)
+                    etiqueta = f"[{','.join(map(str, clave))}]" if clave else ""
+                    partes.append(f"{nombre}{etiqueta}: n={n} media={1e3 * media:.3f} ms "
+                                  f"p95<={1e3 * p95:.3f} ms")
+            else:
+                total = sum(metrica._valores.values())
+                partes.append(f"{nombre}={total:g}")
+        return "; ".join(partes)
+
+
+def colector_registro():
+    """Colector con el estado de la cola del log (registro.configurar_registro)."""
+    import registro
+    estado = registro.estado()
+    if estado is None:
+        return []
+    return [
+        ("log_pendientes", "gauge", "Registros de log en la cola sin escribir", (), [((), estado["pendientes"])]),
+        ("log_descartados_total", "counter", "Registros de log descartados por cola llena", (),
+         [((), estado["descartados"])]),
+        ("log_escritos_total", "counter", "Registros de log escritos", (), [((), estado["escritos"])]),
+        ("log_escritura_segundos_total", "counter", "Tiempo del hilo de log escribiendo lotes", (),
+         [((), estado["tiempo_escritura"])]),
+    ]
+
+
+# =====================================================
+# TIEMPOS DE ARRANQUE
+# =====================================================
+class CronometroArranque:
+    """
+    Instantes de cada fase del arranque desde que se crea el objeto (crearlo
+    lo antes posible). marcar(fase, t) admite un perf_counter tomado en otro
+    hilo (p. ej. el transporte al recibir los primeros datos).
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.fases = []
+
+    def marcar(self, fase, t=None):
+        t = time.perf_counter() if t is None else t
+        self.fases.append((fase, t - self.t0))
+
+    def resumen(self):
+        """'fase +Δ ms (total ms)' de cada fase, por orden de tiempo."""
+        partes = []
+        anterior = 0.0
+        for fase, t in sorted(self.fases, key=lambda f: f[1]):
+            partes.append(f"{fase} +{1e3 * (t - anterior):.0f} ms ({1e3 * t:.0f})")
+            anterior = t
+        return "; ".join(partes)
+
+
+# =====================================================
+# PERFILADOR DE MUESTREO
+# =====================================================
+class PerfiladorMuestreo:
+    """
+    Perfilador estadístico de todos los hilos. Cada muestra suma uno a la
+    función que se está ejecutando ("propio") y a todas las de su pila
+    ("acumulado"), separado por hilo.
+    """
+
+    def __init__(self, intervalo=0.005, profundidad=60):
+        self.intervalo = intervalo
+        self.profundidad = profundidad
+        self.muestras = 0
+        self._propio = collections.Counter()
+        self._acumulado = collections.Counter()
+        self._hilo = None
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self.t_ini = self.t_fin = None
+
+    @property
+    def activo(self):
+        return self._hilo is not None and self._hilo.is_alive()
+
+    def iniciar(self):
+        if self.activo:
+            return False
+        with self._lock:
+            self._propio.clear()
+            self._acumulado.clear()
+            self.muestras = 0
+        self._parar.clear()
+        self.t_ini, self.t_fin = time.time(), None
+        self._hilo = threading.Thread(target=self._bucle, name="perfilador", daemon=True)
+        self._hilo.start()
+        logging.info("Perfilador de muestreo iniciado (cada %.1f ms)", 1e3 * self.intervalo)
+        return True
+
+    def detener(self):
+        if not self.activo:
+            return False
+        self._parar.set()
+        self._hilo.join()
+        self.t_fin = time.time()
+        logging.info("Perfilador de muestreo detenido (%d muestras)", self.muestras)
+        return True
+
+    def _bucle(self):
+        propio_id = threading.get_ident()
+        while not self._parar.wait(self.intervalo):
+            nombres = {h.ident: h.name for h in threading.enumerate()}
+            pilas = sys._current_frames()
+            with self._lock:
+                self.muestras += 1
+                for ident, frame in pilas.items():
+                    if ident == propio_id:
+                        continue
+                    hilo = nombres.get(ident, str(ident))
+                    vistas = set()
+                    profundidad = 0
+                    while frame is not None and profundidad < self.profundidad:
+                        codigo = frame.f_code
+                        funcion = (hilo, f"{codigo.co_name} ({codigo.co_filename.rsplit('/', 1)[-1]}:"
+                                         f"{codigo.co_firstlineno})")
+                        if profundidad == 0:
+                            self._propio[funcion] += 1
+                        if funcion not in vistas:
+                            self._acumulado[funcion] += 1
+                            vistas.add(funcion)
+                        frame = frame.f_back
+                        profundidad += 1
+
+    def informe(self, n=25):
+        """Texto con las n funciones con más muestras propias y acumuladas, por hilo."""
+        with self._lock:
+            muestras = self.muestras
+            propio = self._propio.most_common(n)
+            acumulado = self._acumulado.most_common(n)
+        fin = self.t_fin or time.time()
+        lineas = [f"{muestras} muestras en {fin - (self.t_ini or fin):.1f} s"
+                  f" ({'activo' if self.activo else 'parado'})", "", "Propio:"]
+        for (hilo, funcion), c in propio:
+            lineas.append(f"  {100.0 * c / max(1, muestras):6.1f}%  [{hilo}] {funcion}")
+        lineas += ["", "Acumulado:"]
+        for (hilo, funcion), c in acumulado:
+            lineas.append(f"  {100.0 * c / max(1, muestras):6.1f}%  [{hilo}] {funcion}")
+        return "\n".join(lineas) + "\n"
+
+
+# =====================================================
+# SERVIDOR HTTP
+# =====================================================
+class ServidorMetricas:
+    """Servidor HTTP local (hilo propio) con /metrics y el control del perfilador."""
+
+    def __init__(self, metricas, puerto=9108, host="127.0.0.1", perfilador=None):
+        import http.server   # solo si se usa: no retrasa el arranque de la GUI
+        import urllib.parse
+        self.metricas = metricas
+        self.perfilador = perfilador if perfilador is not None else PerfiladorMuestreo()
+        servidor = self
+
+        class _Manejador(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                ruta = urllib.parse.urlparse(self.path).path.rstrip("/")
+                codigo, cuerpo, tipo = servidor._responder(ruta)
+                datos = cuerpo.encode("utf-8")
+                self.send_response(codigo)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(datos)))
+                self.end_headers()
+                self.wfile.write(datos)
+
+            def log_message(self, formato, *args):
+                pass   # las peticiones de Prometheus no se registran
+
+        self._http = http.server.ThreadingHTTPServer((host, puerto), _Manejador)
+        self._http.daemon_threads = True
+        self.puerto = self._http.server_address[1]
+        self._hilo = threading.Thread(target=self._http.serve_forever, name="metricas", daemon=True)
+
+    def _responder(self, ruta):
+        texto = "text/plain; charset=utf-8"
+        if ruta in ("", "/metrics"):
+            return 200, self.metricas.texto_prometheus(), "text/plain; version=0.0.4; charset=utf-8"
+        if ruta == "/perfil/iniciar":
+            iniciado = self.perfilador.iniciar()
+            return 200, "Perfilador iniciado\n" if iniciado else "El perfilador ya estaba activo\n", texto
+        if ruta == "/perfil/detener":
+            self.perfilador.detener()
+            return 200, self.perfilador.informe(), texto
+        if ruta == "/perfil":
+            return 200, self.perfilador.informe(), texto
+        return 404, "No encontrado\n", texto
+
+    def iniciar(self):
+        self._hilo.start()
+        logging.info("Métricas en http://%s:%d/metrics", *self._http.server_address[:2])
+        return self
+
+    def detener(self):
+        self.perfilador.detener()
+        self._http.shutdown()
+        self._http.server_close()
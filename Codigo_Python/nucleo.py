@@ -0,0 +1,535 @@
+"""
+Núcleo de la estación de Tierra, independiente de la interfaz gráfica.
+
+Contiene el estado (series de T/H, radar, mensajes del satélite), el
+procesado de cada trama recibida y el envío de comandos. No importa
+tkinter ni matplotlib, así que se puede usar sin pantalla (ver
+estacion_headless.py) o con la GUI de Python.py como interfaz opcional.
+El acceso al puerto lo hace un TransporteAsync (transporte.py).
+"""
+
+import logging
+import time
+
+import numpy as np
+
+import protocolo
+from alertas import MotorAlertas, Regla
+from buffer_circular import BufferCircular
+from comandos import PlanificadorComandos
+from control_enlace import ControlEnlace
+from estadisticas import EstadisticaMovil, ExtremosVentanaTiempo
+from metricas import RegistroMetricas
+from piramide import PiramideMinMax
+from radar import EstadoRadar
+
+
+CAPACIDAD_TH = 65536  # muestras de T/H guardadas (≈3.8 días a 5 s por muestra)
+CAPACIDAD_RADAR = 65536  # puntos del radar guardados (≈11 h a 600 ms por punto)
+VENTANA_MEDIA = 10    # número de temperaturas de la media móvil (modo "tierra")
+N_MEDIAS_ALARMA = 3   # medias consecutivas por encima del límite para dar la alerta
+N_ERRORES_TH = 3      # paquetes de T/H seguidos con error (16:1:-1|, 16:1:-2|) para dar la alerta
+N_ERRORES_DISTANCIA = 5  # errores seguidos del radar para dar la alerta
+
+
+class EstacionTierra:
+    """
+    Estado y lógica de recepción de la estación de Tierra.
+
+    Los eventos se notifican con suscribir(evento, funcion):
+        "mensaje"    -> funcion(texto)                      mensaje 16:0 del satélite
+        "muestra_TH" -> funcion(t, temp, hum, media)        nuevo punto de T/H (NaN = hueco)
+        "radar"      -> funcion(t, angulo_servo, distancia) nuevo punto del radar (NaN = error)
+        "alerta"     -> funcion(alerta)                     una regla de alertas.py se activa
+                                                            o se resuelve (alertas.Alerta)
+        "trama"      -> funcion(t, datos, trama)            cada trama recibida (bytes y
+                                                            Trama, o None si no es 16:...)
+        "comando"    -> funcion(datos, estado)              resultado de un comando enviado
+                                                            (confirmado, rechazado... ver comandos.py)
+    Las funciones se llaman desde el hilo de recepción (el del transporte),
+    salvo "alerta", que llega desde el hilo de alertas.py.
+    """
+
+    def __init__(self, transporte, ventana_puntos=7, max_escala=30,
+                 capacidad_TH=CAPACIDAD_TH, ventana_media=VENTANA_MEDIA,
+                 capacidad_radar=CAPACIDAD_RADAR,
+                 checksum_comandos=None, exigir_checksum=False, confirmar_comandos=True):
+        self.transporte = transporte
+        self.checksum_comandos = checksum_comandos   # None, "suma" (*HH) o "crc16" (*HHHH)
+        # Comandos al satélite de uno en uno, esperando su respuesta (comandos.py);
+        # con confirmar_comandos=False se escriben directamente, como antes
+        self.comandos = (PlanificadorComandos(self._transmitir, self._resultado_comando)
+                         if confirmar_comandos else None)
+        transporte.al_trama = self._al_trama
+        transporte.al_cerrar = self.detener_recepcion
+        self._suscriptores = {}
+
+        # Temperatura / humedad
+        self.recibiendo = False        # indica si el hilo de recepción está iniciado
+        self.recepcion_activa = False  # indica si se deben almacenar nuevos datos (Parar/Reanudar)
+        self.modo_calculo = "tierra"   # "tierra" o "arduino"
+        self.temp = 0.0
+        self.hum = 0.0
+        self.limite_temp = 30.0
+        self.t0_TH = None              # tiempo de referencia (primera pulsación de "Iniciar")
+        self._t0_grabacion = False     # t0_TH ya se ha llevado al inicio de la grabación reproducida
+        self.serie_TH = BufferCircular(capacidad_TH, ("temperatura", "humedad", "media"))
+        # Niveles de detalle mín./máx. de serie_TH para dibujar intervalos largos
+        self.lod_TH = PiramideMinMax(self.serie_TH)
+        self.estadistica_temp = EstadisticaMovil(ventana_media)
+        self.errores_TH = 0            # paquetes de T/H seguidos con error
+
+        # Buffers del paquete T/H/media y último ángulo del servo
+        self.ultimo_angulo_deg = 90.0  # ángulo "frontal" por defecto
+        self.temp_buffer = None
+        self.hum_buffer = None
+        self.media_buffer = None
+
+        # Radar ultrasónico
+        self.max_escala = max_escala
+        self.margen_reduccion_dist = 50.0
+        self.tiempo_ventana_dist = 5.0
+        # Máx./mín. de las distancias de los últimos tiempo_ventana_dist s (ajuste dinámico de escala)
+        self.extremos_dist = ExtremosVentanaTiempo(self.tiempo_ventana_dist)
+        # Historial del radar indexado por tiempo (unix): consultas por rango y por instante
+        self.serie_radar = BufferCircular(capacidad_radar, ("angulo", "distancia"))
+        self.errores_distancia = 0
+        self.ultimo_cambio_escala_tiempo = time.time()
+        self.estado_radar = EstadoRadar(ventana_puntos, max_escala)
+
+        # Decodificación de tramas por tabla (grupo, codigo)
+        self.decodificador = protocolo.Decodificador(al_desconocida=self._grupo_desconocido,
+                                                     al_no_protocolo=self._no_protocolo,
+                                                     al_invalida=self._trama_invalida,
+                                                     exigir_checksum=exigir_checksum)
+        self._registrar_manejadores()
+        # Ajuste automático de periodo_global y del periodo DHT (control_enlace.py), apagado por defecto
+        self.control_enlace = ControlEnlace(self.enviar, self.decodificador.contadores,
+                                            lambda: self.comandos.pendientes if self.comandos else 0)
+        separador = getattr(transporte, "separador", None)
+        if separador is not None:
+            separador.al_resincronizar = self._trama_resincronizada
+
+        # Alertas (alertas.py): se evalúan con cada muestra y se notifican desde otro hilo
+        self.alertas = MotorAlertas([
+            Regla("temperatura_media", self.limite_temp, consecutivas=N_MEDIAS_ALARMA,
+                  histeresis=0.5, mensaje="{consecutivas} medias consecutivas > {umbral} °C", enlace=True),
+            Regla("errores_TH", 0, consecutivas=N_ERRORES_TH,
+                  mensaje="{consecutivas} lecturas de T/H seguidas con error"),
+            Regla("errores_distancia", 0, consecutivas=N_ERRORES_DISTANCIA,
+                  mensaje="{consecutivas} errores de distancia seguidos"),
+        ])
+        self.alertas.suscribir(self._alerta)
+
+        # Métricas (metricas.py): lo que ya se cuenta en otro sitio se lee al exportar
+        self.metricas = RegistroMetricas()
+        self._t_decodificacion = self.metricas.histograma(
+            "decodificacion_segundos", "Tiempo en decodificar y despachar una trama")
+        self.metricas.registrar_colector(self._metricas)
+
+    # -------------------------
+    # Eventos
+    # -------------------------
+    def suscribir(self, evento, funcion):
+        self._suscriptores.setdefault(evento, []).append(funcion)
+
+    def _emitir(self, evento, *args):
+        for funcion in self._suscriptores.get(evento, ()):
+            try:
+                funcion(*args)
+            except Exception:
+                logging.exception("Error en el suscriptor de '%s'", evento)
+
+    # -------------------------
+    # Comandos
+    # -------------------------
+    def enviar(self, comando):
+        """Encola un comando (bytes) para la estación de Tierra. Seguro desde cualquier hilo."""
+        if self.comandos is not None and comando.startswith(b"16:"):
+            self.comandos.encolar(comando)
+        else:
+            self._transmitir(comando)
+
+    def _transmitir(self, comando):
+        if comando.startswith(b"16:1:8:"):
+            # El separador solo busca paquetes binarios (0x00) si se han pedido al satélite
+            separador = getattr(self.transporte, "separador", None)
+            if separador is not None:
+                separador.binario = comando == protocolo.comando_formato(True)
+        if self.checksum_comandos and comando.endswith(protocolo.FIN_TRAMA):
+            comando = protocolo.con_checksum(comando, self.checksum_comandos)
+        self.transporte.enviar(comando)
+
+    def _resultado_comando(self, comando, estado):
+        self._emitir("comando", comando, estado)
+
+    def _alerta(self, alerta):
+        self._emitir("alerta", alerta)
+        regla = self.alertas.reglas[alerta.regla]
+        if regla.enlace and alerta.activa:
+            # Una vez por alerta (no con cada paquete mientras dura)
+            self.enviar(protocolo.COMANDO_ALARMA)
+
+    def fijar_limite(self, limite):
+        self.limite_temp = limite
+        self.alertas.fijar_umbral("temperatura_media", limite)
+
+    def ahora(self):
+        """Instante actual (unix): el reloj, o el de la última trama si se reproduce una grabación."""
+        t = getattr(self.transporte, "t_trama", None)
+        return time.time() if t is None else t
+
+    def tiempo_relativo(self):
+        """Segundos desde t0_TH (0 si aún no se ha iniciado)."""
+        if self.t0_TH is not None:
+            return self.ahora() - self.t0_TH
+        return 0.0
+
+    # -------------------------
+    # Recepción
+    # -------------------------
+    def iniciar_recepcion(self):
+        """Arranca el transporte si no está ya en marcha. Devuelve True si lo ha arrancado."""
+        if self.recibiendo:
+            self.recepcion_activa = True
+            return False
+        self.recibiendo = True
+        self.recepcion_activa = True
+        if self.t0_TH is None:
+            self.t0_TH = time.time()
+        self.transporte.iniciar_en_hilo()
+        return True
+
+    def detener_recepcion(self):
+        if self.recibiendo:
+            self.recibiendo = False
+            self.transporte.detener()
+            if self.comandos is not None:
+                self.comandos.vaciar()
+
+    def cerrar(self):
+        """Detiene la recepción y los hilos de la estación (comandos y alertas). Al salir del programa."""
+        self.detener_recepcion()
+        # Primero las alertas: las que quedan en su cola aún pueden encolar ALARMA
+        self.alertas.detener()
+        if self.comandos is not None:
+            self.comandos.detener()
+
+    def _al_trama(self, trama_bytes):
+        """Llamada por el transporte con cada trama recibida (sin el '|') o paquete binario."""
+        t_grabado = getattr(self.transporte, "t_trama", None)
+        if t_grabado is not None and not self._t0_grabacion:
+            # Reproducción: los tiempos cuentan desde la primera trama grabada, no desde "Iniciar"
+            self._t0_grabacion = True
+            self.t0_TH = self.ultimo_cambio_escala_tiempo = t_grabado
+        datos = protocolo.limpiar(trama_bytes)
+        if datos:
+            self.procesar_trama(datos)
+
+    # -------------------------
+    # Procesado de tramas
+    # -------------------------
+    def _registrar_manejadores(self):
+        """Tabla (grupo, codigo) -> manejador. Grupos nuevos: self.decodificador.registrar(...)."""
+        registrar = self.decodificador.registrar
+        # Grupo 0: mensajes de texto
+        registrar("0", None, self._grupo_mensaje)
+        # Grupo 1: temperatura / humedad
+        registrar("1", "-1", self._error_TH)
+        registrar("1", "-2", self._error_TH)
+        registrar("1", "01", self._temperatura, (float,), self._temperatura_corrupta)
+        registrar("1", "02", self._humedad, (float,), self._humedad_corrupta)
+        registrar("1", "03", self._media, (float,), self._media_corrupta)
+        registrar("1", None, self._no_reconocida)
+        # Grupo 2: servo
+        registrar("2", "-1", self._servo_no_disponible)
+        registrar("2", "0", self._angulo_servo, (float,), self._angulo_servo_corrupto)
+        registrar("2", None, self._otro_servo)
+        # Grupo 3: distancia (radar)
+        registrar("3", "-1", self._distancia_error)
+        registrar("3", "-2", self._distancia_error)
+        registrar("3", "0", self._distancia, (float, float), self._distancia_corrupta)
+        registrar("3", None, self._no_reconocida)
+
+    def procesar_trama(self, datos):
+        """Procesa los bytes de una trama ya limpia (sin '|') o un protocolo.PaqueteBinario."""
+        # Esperamos formato 16:grupo:codigo[:valor][*checksum]
+        t_ini = time.perf_counter()
+        binario = isinstance(datos, protocolo.PaqueteBinario)
+        if binario:
+            # Un paquete binario puede llevar varias tramas (T, H y media juntas)
+            tramas = self.decodificador.procesar_binario(datos)
+        else:
+            tramas = (self.decodificador.procesar(datos),)
+        self._t_decodificacion.observar(time.perf_counter() - t_ini)
+        if binario and not tramas:
+            # Paquete dañado (ya contado como malo): se graba tal cual
+            if "trama" in self._suscriptores:
+                self._emitir("trama", self.ahora(), bytes(datos), None)
+            return
+        for trama in tramas:
+            # Hacia fuera, las tramas binarias se ven como su equivalente 16:grupo:codigo:valor
+            if binario:
+                datos = trama.datos
+            if self.control_enlace.activo:
+                self.control_enlace.registrar_trama(time.monotonic(), datos)
+            if "trama" in self._suscriptores:
+                self._emitir("trama", self.ahora(), datos, trama)
+
+    def procesar_linea(self, linea):
+        """Procesa una línea de texto ya limpia (sin '|')."""
+        self.procesar_trama(linea.encode('utf-8'))
+
+    def _metricas(self):
+        """Colector de metricas.py: enlace, series y transporte."""
+        enlace = self.decodificador.contadores.resumen()
+        familias = [
+            ("tramas_total", "counter", "Tramas por grupo y estado", ("grupo", "estado"),
+             [((grupo, estado), fila[estado]) for grupo, fila in enlace.items()
+              for estado in protocolo.ContadoresEnlace.CAMPOS]),
+            ("errores_distancia", "gauge", "Errores de distancia seguidos", (),
+             [((), self.errores_distancia)]),
+            ("muestras_TH_total", "counter", "Muestras de T/H guardadas", (), [((), self.serie_TH.total)]),
+            ("ecos_radar_total", "counter", "Puntos del radar guardados", (), [((), self.serie_radar.total)]),
+            ("alertas_total", "counter", "Alertas notificadas por estado", ("estado",),
+             [((estado,), n) for estado, n in self.alertas.contadores.items()]),
+            ("alertas_activas", "gauge", "Reglas de alerta activas", (), [((), len(self.alertas.activas()))]),
+        ]
+        control = self.control_enlace
+        if control.activo:
+            familias += [
+                ("periodo_global_ms", "gauge", "periodo_global fijado por el control de enlace", (),
+                 [((), control.periodo_global)]),
+                ("periodo_TH_ms", "gauge", "Periodo DHT fijado por el control de enlace", (),
+                 [((), control.periodo_TH)]),
+                ("control_enlace_ajustes_total", "counter", "Ajustes de periodo del control de enlace", (),
+                 [((), control.ajustes)]),
+            ]
+            if control.perdida is not None:
+                familias.append(("control_enlace_perdida", "gauge", "Pérdida estimada en la última ventana",
+                                 (), [((), control.perdida)]))
+        if self.comandos is not None:
+            familias += [
+                ("comandos_total", "counter", "Comandos por resultado", ("estado",),
+                 [((estado,), n) for estado, n in self.comandos.contadores.items()]),
+                ("comandos_pendientes", "gauge", "Comandos en cola o esperando respuesta", (),
+                 [((), self.comandos.pendientes)]),
+                ("comandos_transmisiones_total", "counter", "Comandos escritos (incluye reenvíos)", (),
+                 [((), self.comandos.transmisiones)]),
+                ("comandos_reenvios_total", "counter", "Reenvíos por falta de respuesta", (),
+                 [((), self.comandos.reenvios)]),
+                ("comandos_espera_segundos", "gauge", "Tiempo de espera actual de la respuesta", (),
+                 [((), self.comandos.espera)]),
+            ]
+        t = self.transporte
+        if hasattr(t, "lecturas"):
+            familias += [
+                ("lecturas_total", "counter", "Lecturas del puerto con datos", (), [((), t.lecturas)]),
+                ("bytes_leidos_total", "counter", "Bytes leídos del puerto", (), [((), t.bytes_leidos)]),
+                ("espera_puerto_segundos_total", "counter", "Tiempo esperando datos del puerto", (),
+                 [((), t.tiempo_espera)]),
+                ("proceso_tramas_segundos_total", "counter", "Tiempo procesando las tramas leídas", (),
+                 [((), t.tiempo_proceso)]),
+                ("cola_envio", "gauge", "Comandos pendientes de enviar", (), [((), t.pendientes_envio)]),
+                ("bytes_descartados_total", "counter", "Bytes descartados al resincronizar", (),
+                 [((), t.separador.descartados)]),
+                ("paquetes_binarios_total", "counter", "Paquetes binarios recibidos (16:1:8:1|)", (),
+                 [((), t.separador.binarios)]),
+            ]
+        return familias
+
+    def _trama_resincronizada(self, datos):
+        self.decodificador.contadores.resincronizada(protocolo.grupo_crudo(datos))
+
+    def _no_protocolo(self, datos):
+        print("Mensaje:", datos.decode('utf-8', errors='ignore'))
+
+    def _trama_invalida(self, datos):
+        texto = datos.decode('utf-8', errors='ignore')
+        print("Trama con checksum incorrecto:", texto)
+        logging.warning("Trama con checksum incorrecto: %s", texto)
+
+    def _grupo_desconocido(self, trama):
+        print("Mensaje grupo no previsto:", trama)
+        logging.warning("Mensaje grupo no previsto: %s", trama)
+
+    def _no_reconocida(self, trama):
+        grupo = trama.grupo.decode('ascii', errors='replace')
+        print(f"Mensaje grupo {grupo} no reconocido:", trama)
+        logging.warning("Mensaje grupo %s no reconocido: %s", grupo, trama)
+
+    # Grupo 0: Mensajes de texto (16:0:lo_que_sea)
+    def _grupo_mensaje(self, trama):
+        mensaje_texto = protocolo.texto_mensaje(trama)
+        print("MENSAJE DE TEXTO DESDE SATÉLITE:", mensaje_texto)
+        self._emitir("mensaje", mensaje_texto)
+        if self.comandos is not None:
+            self.comandos.recibir_texto(mensaje_texto)
+
+    # Grupo 1: Sensor humedad/temperatura (16:1:...)
+    def _error_TH(self, trama):
+        """16:1:-1| o 16:1:-2| -> errores de lectura/envío."""
+        print("Error de T/H recibido:", trama)
+        t_rel = self.tiempo_relativo()
+        self.lod_TH.agregar(t_rel, np.nan, np.nan, np.nan)
+        self.estadistica_temp.agregar(np.nan)
+        self.errores_TH += 1
+        self.alertas.evaluar("temperatura_media", np.nan)
+        self.alertas.evaluar("errores_TH", self.errores_TH)
+        self._emitir("muestra_TH", t_rel, np.nan, np.nan, np.nan)
+
+    def _temperatura(self, trama, temp):
+        """16:1:01:<temp>|"""
+        self.temp = self.temp_buffer = temp
+        logging.info('Temp %s', trama)
+
+    def _temperatura_corrupta(self, trama):
+        print("Temperatura corrupta:", trama)
+        logging.warning("Temperatura corrupta: %s", trama)
+
+    def _humedad(self, trama, hum):
+        """16:1:02:<hum>|"""
+        self.hum = self.hum_buffer = hum
+        logging.info('Hum %s', trama)
+
+    def _humedad_corrupta(self, trama):
+        print("Humedad corrupta:", trama)
+        logging.warning("Humedad corrupta: %s", trama)
+
+    def _media(self, trama, media):
+        """16:1:03:<media>|"""
+        self.media_buffer = media
+        logging.info('Media %s', trama)
+        self._completar_paquete(trama)
+
+    def _media_corrupta(self, trama):
+        print("Media corrupta:", trama)
+        logging.warning("Media corrupta: %s", trama)
+        self.media_buffer = None
+        self._completar_paquete(trama)
+
+    def _completar_paquete(self, trama):
+        # Solo generamos un "nuevo punto" cuando llega el 03 (paquete completo)
+        if self.temp_buffer is None or self.hum_buffer is None:
+            print("Faltan T/H para completar paquete:", trama)
+            logging.warning("Faltan T/H para completar paquete: %s", trama)
+            return
+        self._nuevo_punto_TH()
+
+    def _nuevo_punto_TH(self):
+        t_rel = self.tiempo_relativo()
+
+        # Con la recepción en pausa se guarda un hueco (NaN)
+        if self.recepcion_activa:
+            t_nueva, h_nueva = self.temp_buffer, self.hum_buffer
+        else:
+            t_nueva, h_nueva = np.nan, np.nan
+
+        # La media móvil se actualiza siempre (O(1)), así al cambiar
+        # de modo la ventana ya contiene las últimas temperaturas.
+        # Si hay algún hueco en la ventana la media queda en NaN.
+        media_tierra = self.estadistica_temp.agregar(t_nueva)
+
+        # Cálculo de la media según el modo
+        if self.modo_calculo == "tierra":
+            logging.info('Calculo media en: %s', self.modo_calculo)
+            media = media_tierra
+        else:
+            media = self.media_buffer if self.media_buffer is not None else np.nan
+
+        self.lod_TH.agregar(t_rel, t_nueva, h_nueva, media)
+        self._emitir("muestra_TH", t_rel, t_nueva, h_nueva, media)
+
+        # Alerta si las N_MEDIAS_ALARMA últimas medias válidas > límite
+        self.errores_TH = 0
+        self.alertas.evaluar("temperatura_media", media)
+        self.alertas.evaluar("errores_TH", 0)
+
+    # Grupo 2: Servo (16:2:...)
+    def _servo_no_disponible(self, trama):
+        """16:2:-1|"""
+        self.estado_radar.fijar_texto("Ángulo N/A")
+        if self.comandos is not None:
+            self.comandos.recibir_servo(None)
+
+    def _angulo_servo(self, trama, angulo):
+        """16:2:0:<angulo>|"""
+        self.ultimo_angulo_deg = angulo
+        logging.info('Angulo servo %s', trama)
+        if self.comandos is not None:
+            self.comandos.recibir_servo(angulo)
+
+    def _angulo_servo_corrupto(self, trama):
+        print("Ángulo servo corrupto:", trama)
+        logging.warning("Ángulo servo corrupto: %s", trama)
+
+    def _otro_servo(self, trama):
+        # Otros códigos del grupo 2 (p.e. órdenes de mover / velocidad) no necesitan tratamiento aquí
+        print("Mensaje grupo 2:", trama)
+
+    # Grupo 3: Distancia (16:3:...)
+    def _error_distancia(self, texto):
+        """Punto de error en el radar usando el último ángulo conocido."""
+        angulo_rad = np.deg2rad(self.ultimo_angulo_deg - 90.0)
+        self.errores_distancia += 1
+        self.alertas.evaluar("errores_distancia", self.errores_distancia)
+        ahora = self.ahora()
+        self.serie_radar.agregar(ahora, self.ultimo_angulo_deg - 90.0, np.nan)
+        self.estado_radar.agregar_punto(angulo_rad, np.nan, texto)
+        self._emitir("radar", ahora, self.ultimo_angulo_deg, np.nan)
+
+    def _distancia_error(self, trama):
+        """16:3:-1| o 16:3:-2|"""
+        self._error_distancia("Error distancia")
+
+    def _distancia(self, trama, angulo_servo, d):
+        """16:3:0:<anguloServo>:<distancia>| (ángulo 0..180, distancia en cm)."""
+        logging.info('Distancia radar %s', trama)
+        self._punto_radar(angulo_servo, d)
+
+    def _distancia_corrupta(self, trama):
+        # Esperamos al menos 5 partes: 16, 3, 0, anguloServo, distancia
+        if len(trama.partes) < 5:
+            print("Mensaje grupo 3 incompleto:", trama)
+            logging.warning("Mensaje grupo 3 incompleto: %s", trama)
+            return
+        # Texto no convertible a float: tratamos como dato corrupto
+        self._error_distancia("Dato corrupto")
+
+    def _punto_radar(self, angulo_servo, d):
+        # Actualizamos el último ángulo del servo recibido
+        self.ultimo_angulo_deg = angulo_servo
+        angulo_rad = np.deg2rad(angulo_servo - 90.0)
+        self.errores_distancia = 0
+        self.alertas.evaluar("errores_distancia", 0)
+
+        ahora = self.ahora()
+        self.serie_radar.agregar(ahora, angulo_servo - 90.0, d)
+        self._ajustar_escala(ahora, d)
+
+        # Mostramos el ángulo ya centrado en [-90, 90]
+        self.estado_radar.agregar_punto(
+            angulo_rad, d,
+            f"Ángulo: {angulo_servo-90:.0f}º    Distancia: {d:.1f} cm",
+            ahora
+        )
+        self._emitir("radar", ahora, angulo_servo, d)
+
+    def _ajustar_escala(self, ahora, d):
+        """Ajuste dinámico de la escala radial según las distancias de los últimos segundos."""
+        self.extremos_dist.duracion = self.tiempo_ventana_dist
+        self.extremos_dist.agregar(ahora, d)
+        if not self.extremos_dist:
+            return
+        max_reciente = self.extremos_dist.maximo
+
+        if max_reciente > self.max_escala:
+            self.max_escala = int(max_reciente) + 1
+            self.estado_radar.fijar_escala(self.max_escala)
+            self.ultimo_cambio_escala_tiempo = ahora
+
+        elif (self.max_escala - max_reciente >= self.margen_reduccion_dist and
+              (ahora - self.ultimo_cambio_escala_tiempo >= self.tiempo_ventana_dist)):
+            self.max_escala = int(max_reciente) + 1
+            self.estado_radar.fijar_escala(self.max_escala)
+            self.ultimo_cambio_escala_tiempo = ahora
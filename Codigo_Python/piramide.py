@@ -0,0 +1,140 @@
+"""
+Pirámide de niveles de detalle (mín./máx.) para dibujar series largas de T/H.
+
+El nivel 0 es la serie original (un BufferCircular). Cada nivel k > 0 resume
+grupos de `factor` cubos del nivel anterior guardando, por columna, el mínimo
+y el máximo con el instante de cada uno, y el intervalo de tiempo que cubren.
+Se actualiza al añadir cada muestra (O(niveles)) y cada nivel es otro
+BufferCircular de capacidad capacidad/factor**k: cubre el mismo tiempo que la
+serie original y toda la pirámide tiene como mucho 1/(factor-1) más filas.
+
+consultar(t_min, t_max, max_puntos) elige el nivel más fino que cabe en
+max_puntos y devuelve, por columna, los puntos (x, y) a dibujar: la serie
+original si cabe, o la envolvente mín./máx. (dos puntos por cubo, en el
+orden en que llegaron, para que una bajada no se dibuje como subida) si no.
+Así un día entero se dibuja con los mismos ~max_puntos que 30 s.
+"""
+
+import numpy as np
+
+from buffer_circular import BufferCircular
+
+
+class PiramideMinMax:
+    """Niveles de detalle mín./máx. sobre una serie (BufferCircular) que se va llenando."""
+
+    def __init__(self, serie, factor=4, niveles=8):
+        if factor < 2:
+            raise ValueError("El factor de la pirámide debe ser al menos 2")
+        self.serie = serie
+        self.factor = int(factor)
+        self.columnas = serie.columnas[1:]
+        ncol = len(self.columnas)
+        # Columnas de cada nivel: tiempo (inicio del cubo), fin del cubo y, de cada
+        # columna, mín., máx. y el instante de cada uno
+        nombres = (["fin"] + [f"{c}_min" for c in self.columnas] + [f"{c}_max" for c in self.columnas]
+                   + [f"{c}_tmin" for c in self.columnas] + [f"{c}_tmax" for c in self.columnas])
+        self.niveles = []
+        for k in range(1, niveles + 1):
+            capacidad = max(16, serie.capacidad // self.factor ** k)
+            self.niveles.append(BufferCircular(capacidad, nombres))
+        # Cubo a medio llenar de cada nivel: [n, t_ini, t_fin, mínimos, máximos,
+        # instantes de los mínimos, instantes de los máximos]
+        self._parciales = [[0, np.nan, np.nan] + [np.full(ncol, np.nan) for _ in range(4)]
+                           for _ in self.niveles]
+
+    def agregar(self, t, *valores):
+        """Añade la muestra a la serie y actualiza los niveles."""
+        self.serie.agregar(t, *valores)
+        v = np.array([np.nan if x is None else x for x in valores], dtype=float)
+        t = self.serie.ultimo("tiempo")
+        instantes = np.full(len(v), t)
+        self._acumular(0, t, t, v, v, instantes, instantes)
+
+    def _acumular(self, k, t_ini, t_fin, minimos, maximos, t_minimos, t_maximos):
+        if k >= len(self.niveles):
+            return
+        parcial = self._parciales[k]
+        if parcial[0] == 0:
+            parcial[1] = t_ini
+            parcial[3][:] = minimos
+            parcial[4][:] = maximos
+            parcial[5][:] = t_minimos
+            parcial[6][:] = t_maximos
+        else:
+            # Si hay empate se queda el primero; un NaN no sustituye a nada, y un
+            # cubo solo de huecos queda en NaN (con el instante de su primer hueco)
+            nuevo = (minimos < parcial[3]) | (np.isnan(parcial[3]) & ~np.isnan(minimos))
+            parcial[3][nuevo] = minimos[nuevo]
+            parcial[5][nuevo] = t_minimos[nuevo]
+            nuevo = (maximos > parcial[4]) | (np.isnan(parcial[4]) & ~np.isnan(maximos))
+            parcial[4][nuevo] = maximos[nuevo]
+            parcial[6][nuevo] = t_maximos[nuevo]
+        parcial[2] = t_fin
+        parcial[0] += 1
+        if parcial[0] == self.factor:
+            self.niveles[k].agregar(parcial[1], parcial[2], *parcial[3], *parcial[4], *parcial[5], *parcial[6])
+            parcial[0] = 0
+            self._acumular(k + 1, parcial[1], parcial[2],
+                           *(a.copy() for a in parcial[3:7]))
+
+    def vaciar(self):
+        self.serie.vaciar()
+        for nivel in self.niveles:
+            nivel.vaciar()
+        for parcial in self._parciales:
+            parcial[0] = 0
+
+    # -------------------------
+    # Consultas
+    # -------------------------
+    def _contar(self, serie, t_min, t_max):
+        if not len(serie):
+            return 0
+        return len(serie.ventana(t_min, t_max)["tiempo"])
+
+    def nivel_para(self, t_min, t_max, max_puntos):
+        """Nivel más fino con como mucho max_puntos puntos en [t_min, t_max] (0 = serie original)."""
+        if self._contar(self.serie, t_min, t_max) <= max_puntos:
+            return 0
+        for k, nivel in enumerate(self.niveles, start=1):
+            # Cada cubo son dos puntos (mín. y máx.)
+            if 2 * self._contar(nivel, t_min, t_max) <= max_puntos:
+                return k
+        return len(self.niveles)
+
+    def consultar(self, t_min, t_max, max_puntos=1000):
+        """
+        Devuelve (nivel, {columna: (x, y)}) con como mucho ~max_puntos puntos
+        por columna para el intervalo [t_min, t_max].
+        """
+        k = self.nivel_para(t_min, t_max, max_puntos)
+        if k == 0:
+            visibles = self.serie.ventana(t_min, t_max)
+            return 0, {c: (visibles["tiempo"], visibles[c]) for c in self.columnas}
+
+        visibles = self.niveles[k - 1].ventana(t_min, t_max)
+        # Lo más reciente aún no forma un cubo completo de este nivel: se añaden
+        # los cubos a medio llenar de los niveles k, k-1, ..., 1 (en orden de tiempo)
+        # que se solapan con [t_min, t_max]
+        cola = [p for p in reversed(self._parciales[:k]) if p[0] and p[2] >= t_min and p[1] <= t_max]
+
+        resultado = {}
+        for i, c in enumerate(self.columnas):
+            minimos, maximos = visibles[f"{c}_min"], visibles[f"{c}_max"]
+            t_minimos, t_maximos = visibles[f"{c}_tmin"], visibles[f"{c}_tmax"]
+            if cola:
+                minimos = np.concatenate([minimos, [p[3][i] for p in cola]])
+                maximos = np.concatenate([maximos, [p[4][i] for p in cola]])
+                t_minimos = np.concatenate([t_minimos, [p[5][i] for p in cola]])
+                t_maximos = np.concatenate([t_maximos, [p[6][i] for p in cola]])
+            # Los dos puntos de cada cubo en el orden en que llegaron
+            min_primero = t_minimos <= t_maximos
+            x = np.empty(2 * len(minimos))
+            y = np.empty(2 * len(minimos))
+            x[0::2] = np.where(min_primero, t_minimos, t_maximos)
+            x[1::2] = np.where(min_primero, t_maximos, t_minimos)
+            y[0::2] = np.where(min_primero, minimos, maximos)
+            y[1::2] = np.where(min_primero, maximos, minimos)
+            resultado[c] = (x, y)
+        return k, resultado
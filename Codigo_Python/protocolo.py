@@ -0,0 +1,680 @@
+"""
+Protocolo 16:grupo:codigo[:valor]| entre la estación de Tierra y el satélite.
+
+Aquí solo hay codificación de comandos y decodificación de tramas, sin
+puerto serie ni interfaz gráfica, para poder usarlo desde la GUI, desde el
+modo sin pantalla o desde pruebas.
+
+Grupos:
+    0 -> mensajes de texto          (16:0:<texto>|)
+    1 -> sensor temperatura/humedad (16:1:01:<t>| 16:1:02:<h>| 16:1:03:<media>| 16:1:-1|)
+    2 -> servo                      (16:2:0:<angulo>| 16:2:-1|)
+    3 -> distancia (radar)          (16:3:0:<angulo>:<distancia>| 16:3:-2|)
+
+Cualquier trama o comando puede llevar al final un checksum: payload*HH|
+(suma de bytes, como el firmware) o payload*HHHH| (CRC-16).
+
+Con 16:1:8:1| el satélite manda las tramas de datos (grupos 1, 2 y 3) en
+binario: 0x00 + COBS(tipo, largo, datos, checksum) + 0x00, con los valores
+en coma fija (ver TRAMAS BINARIAS). Los mensajes de texto siguen en ASCII y
+SeparadorTramas acepta los dos formatos mezclados, así que ASCII queda
+siempre como formato de reserva (16:1:8:0| o un firmware que no conozca el
+comando).
+"""
+
+import binascii
+import math
+import struct
+
+CABECERA = "16"
+FIN_TRAMA = b'|'
+_CABECERA_B = CABECERA.encode("ascii")
+
+
+# =====================================================
+# COMANDOS (Tierra -> Satélite)
+# =====================================================
+def _comando(*campos):
+    return (":".join(str(c) for c in (CABECERA,) + campos) + "|").encode("ascii")
+
+
+def comando_iniciar():
+    """16:1:1| -> iniciar envío de T/H."""
+    return _comando(1, 1)
+
+
+def comando_parar():
+    """16:1:2| -> parar envío de T/H."""
+    return _comando(1, 2)
+
+
+def comando_reanudar():
+    """16:1:3| -> reanudar envío de T/H."""
+    return _comando(1, 3)
+
+
+def comando_periodo(periodo_ms):
+    """16:1:4:<periodo>| -> periodo de envío del DHT (ms)."""
+    return _comando(1, 4, int(periodo_ms))
+
+
+def comando_media_tierra():
+    """16:1:5| -> la media de temperatura se calcula en Tierra (Python)."""
+    return _comando(1, 5)
+
+
+def comando_media_satelite():
+    """16:1:6| -> la media de temperatura se calcula en el satélite."""
+    return _comando(1, 6)
+
+
+def comando_periodo_global(periodo_ms):
+    """16:1:7:<periodo_global>| -> periodo GLOBAL de envío (límite LoRa, 0 = sin límite)."""
+    return _comando(1, 7, int(periodo_ms))
+
+
+def comando_formato(binario):
+    """16:1:8:<0|1>| -> tramas de datos en ASCII (0) o en binario (1, ver TRAMAS BINARIAS)."""
+    return _comando(1, 8, int(bool(binario)))
+
+
+def comando_angulo(angulo):
+    """16:2:1:<angulo>| -> mover el servo a un ángulo en [-90, 90]."""
+    return _comando(2, 1, int(angulo))
+
+
+# Acabado en '|' como los demás: la estación de Tierra lee hasta '|' y sin él
+# "ALARMA" se juntaba con el comando siguiente, que se perdía
+COMANDO_ALARMA = b'ALARMA|'
+
+
+# =====================================================
+# INTEGRIDAD (igual que enviarConChecksum / verificarYQuitarChecksum del firmware)
+# =====================================================
+# payload*HH|   -> suma de los bytes del payload módulo 256, en hexadecimal
+# payload*HHHH| -> CRC-16/CCITT-FALSE del payload, en hexadecimal (solo Python)
+SEPARADOR_CHECKSUM = b'*'
+PREFIJO_ERROR = b"CHKERR:"   # la estación de Tierra avisa de una trama del satélite con checksum incorrecto
+SIN_CHECKSUM, CORRECTA, INCORRECTA = 0, 1, 2
+_HEX = frozenset(b"0123456789abcdefABCDEF")
+
+
+def checksum(payload):
+    """Suma de los bytes módulo 256 (calcularChecksum del firmware)."""
+    return sum(payload) & 0xFF
+
+
+def crc16(payload):
+    """CRC-16/CCITT-FALSE (polinomio 0x1021, valor inicial 0xFFFF)."""
+    return binascii.crc_hqx(payload, 0xFFFF)
+
+
+def con_checksum(comando, tipo="suma"):
+    """Añade *HH (tipo "suma") o *HHHH (tipo "crc16") antes del '|' final de un comando."""
+    payload = comando[:-1] if comando.endswith(FIN_TRAMA) else comando
+    if tipo == "crc16":
+        cola = b"*%04X" % crc16(payload)
+    elif tipo == "suma":
+        cola = b"*%02X" % checksum(payload)
+    else:
+        raise ValueError(f"Tipo de checksum desconocido: {tipo}")
+    return payload + cola + (FIN_TRAMA if comando.endswith(FIN_TRAMA) else b"")
+
+
+def verificar(datos, estricto=True):
+    """
+    Comprueba el checksum final de una trama (sin '|'). Devuelve (payload, estado):
+    SIN_CHECKSUM si no termina en *HH / *HHHH (p. ej. un '*' dentro de un texto),
+    CORRECTA o INCORRECTA. Con estricto=False una cola que no coincide se
+    toma como parte de los datos: (datos, SIN_CHECKSUM), p. ej. "Error*BEEF".
+    """
+    pos = datos.rfind(SEPARADOR_CHECKSUM)
+    if pos < 0:
+        return datos, SIN_CHECKSUM
+    cola = datos[pos + 1:]
+    if len(cola) not in (2, 4) or not _HEX.issuperset(cola):
+        return datos, SIN_CHECKSUM
+    payload = datos[:pos]
+    calculado = checksum(payload) if len(cola) == 2 else crc16(payload)
+    if int(cola, 16) == calculado:
+        return payload, CORRECTA
+    return (payload, INCORRECTA) if estricto else (datos, SIN_CHECKSUM)
+
+
+def grupo_crudo(datos):
+    """Grupo de una trama sin decodificar (b"?" si no se puede saber)."""
+    partes = datos.split(SEPARADOR, 2)
+    if len(partes) > 2 and partes[0] == _CABECERA_B and partes[1].lstrip(b"-").isdigit():
+        return partes[1]
+    return b"?"
+
+
+class ContadoresEnlace:
+    """Tramas buenas, malas (checksum incorrecto) y resincronizadas por grupo."""
+
+    CAMPOS = ("buenas", "malas", "resincronizadas")
+
+    def __init__(self):
+        self._grupos = {}   # grupo (bytes) -> [buenas, malas, resincronizadas]
+
+    def _fila(self, grupo):
+        fila = self._grupos.get(grupo)
+        if fila is None:
+            fila = self._grupos[grupo] = [0, 0, 0]
+        return fila
+
+    def buena(self, grupo):
+        self._fila(grupo)[0] += 1
+
+    def mala(self, grupo):
+        self._fila(grupo)[1] += 1
+
+    def resincronizada(self, grupo):
+        self._fila(grupo)[2] += 1
+
+    def resumen(self):
+        """{grupo: {"buenas", "malas", "resincronizadas", "calidad"}} (calidad = buenas / recibidas)."""
+        resumen = {}
+        for grupo, fila in sorted(self._grupos.items()):
+            datos = dict(zip(self.CAMPOS, fila))
+            recibidas = fila[0] + fila[1]
+            datos["calidad"] = fila[0] / recibidas if recibidas else None
+            resumen[grupo.decode("ascii", errors="replace")] = datos
+        return resumen
+
+    def reiniciar(self):
+        self._grupos.clear()
+
+
+# =====================================================
+# TRAMAS (Satélite -> Tierra)
+# =====================================================
+SEPARADOR = b':'
+_MENSAJE = b"16:0:"
+_INICIO_TEXTO = len(_MENSAJE)
+
+
+class Trama:
+    """
+    Trama recibida, sin el '|' final. Se trabaja sobre los bytes: el texto
+    (linea) solo se decodifica si alguien lo pide (mensajes, registro...).
+    """
+
+    __slots__ = ("datos", "partes")
+    valores = None   # valores ya convertidos (solo en TramaBinaria)
+
+    def __init__(self, datos, partes):
+        self.datos = datos      # bytes de la trama
+        self.partes = partes    # datos.split(b':')
+
+    @property
+    def grupo(self):
+        return self.partes[1]
+
+    @property
+    def codigo(self):
+        return self.partes[2]
+
+    @property
+    def valor(self):
+        return self.partes[3] if len(self.partes) > 3 else None
+
+    @property
+    def linea(self):
+        return self.datos.decode('utf-8', errors='ignore')
+
+    def __str__(self):
+        return self.linea
+
+
+MAX_TRAMA = 256   # bytes; la trama más larga del protocolo es un mensaje de texto del grupo 0
+_INICIO = _CABECERA_B + SEPARADOR
+
+
+class SeparadorTramas:
+    """
+    Separa en tramas el flujo de bytes leído del puerto, lea lo que lea cada vez.
+
+    Lo que llega se añade a un bytearray y en cada lectura se sacan todas las
+    tramas completas (terminadas en '|'); una trama cortada entre dos
+    lecturas se completa con la siguiente. Si delante de la cabecera "16:"
+    hay basura (bytes perdidos, texto de depuración del Arduino) se descarta
+    y la trama se entrega a partir de la cabecera (resincronización). Si se
+    acumulan más de max_trama bytes sin '|' se descartan y se espera a la
+    siguiente cabecera. Las líneas sin ninguna cabecera se entregan tal cual.
+
+    Con binario=True (tras pedir 16:1:8:1|) un 0x00 antes del siguiente '|'
+    abre un paquete binario, que llega hasta el siguiente 0x00 (dentro puede
+    haber '|'). Se entrega ya sin COBS como PaqueteBinario; el tipo, el
+    largo y el checksum los comprueba el Decodificador. Si no es COBS
+    válido, o son dos 0x00 seguidos, el segundo 0x00 se toma como inicio
+    del paquete siguiente (resincronización). En ASCII (por defecto) un
+    0x00 es ruido como cualquier otro byte y la trama se recupera en la
+    siguiente cabecera o '|'.
+    """
+
+    def __init__(self, max_trama=MAX_TRAMA, al_resincronizar=None, binario=False):
+        self.max_trama = max_trama
+        self.al_resincronizar = al_resincronizar   # funcion(trama) al recuperar una trama tras basura
+        self.binario = binario   # se esperan paquetes binarios (16:1:8:1|)
+        self._buffer = bytearray()
+        self.tramas = 0
+        self.binarios = 0      # paquetes binarios entregados (incluidos en tramas)
+        self.resincronizaciones = 0
+        self.descartados = 0   # bytes descartados
+
+    def agregar(self, datos):
+        """Añade bytes leídos y devuelve la lista de tramas completas (sin el '|') y PaqueteBinario."""
+        buffer = self._buffer
+        buffer += datos
+        tramas = []
+        inicio = 0
+        while True:
+            fin = buffer.find(FIN_TRAMA, inicio)
+            cero = (buffer.find(DELIMITADOR_BINARIO, inicio, fin if fin >= 0 else len(buffer))
+                    if self.binario else -1)
+            if cero >= 0:
+                inicio = self._binario(buffer, inicio, cero, tramas)
+                if inicio < 0:
+                    inicio = cero
+                    break   # paquete binario incompleto: se espera a la siguiente lectura
+                continue
+            if fin < 0:
+                break
+            trama = self._sincronizar(bytes(buffer[inicio:fin]))
+            inicio = fin + 1
+            if trama is not None:
+                tramas.append(trama)
+        del buffer[:inicio]
+
+        # Demasiados bytes sin '|': nos quedamos solo desde la última cabecera
+        if len(buffer) > self.max_trama:
+            pos = buffer.rfind(_INICIO)
+            if pos < 0 or len(buffer) - pos > self.max_trama:
+                pos = len(buffer)
+            if pos > 0:
+                self.descartados += pos
+                self.resincronizaciones += 1
+                del buffer[:pos]
+        self.tramas += len(tramas)
+        return tramas
+
+    def _binario(self, buffer, inicio, cero, tramas):
+        """Paquete binario que empieza en buffer[cero]. Devuelve dónde seguir (-1 si está incompleto)."""
+        if buffer[inicio:cero].strip():
+            # Restos de una trama de texto cortada por el paquete
+            self.descartados += cero - inicio
+            self.resincronizaciones += 1
+        cierre = buffer.find(DELIMITADOR_BINARIO, cero + 1, cero + MAX_PAQUETE_BINARIO + 2)
+        if cierre < 0:
+            if len(buffer) - cero <= MAX_PAQUETE_BINARIO + 1:
+                return -1
+            # Demasiado largo: ese 0x00 no abría un paquete
+            self.descartados += 1
+            self.resincronizaciones += 1
+            return cero + 1
+        if cierre == cero + 1:
+            self.descartados += 1
+            return cierre
+        paquete = cobs_decodificar(buffer[cero + 1:cierre])
+        if paquete is None:
+            self.descartados += cierre - cero
+            self.resincronizaciones += 1
+            return cierre
+        tramas.append(PaqueteBinario(paquete))
+        self.binarios += 1
+        return cierre + 1
+
+    def _sincronizar(self, trama):
+        trama = trama.lstrip()
+        resincronizada = False
+        if not (trama.startswith(_INICIO) or trama.startswith(PREFIJO_ERROR)):
+            pos = trama.find(_INICIO)
+            if pos > 0:
+                if trama[pos - len(PREFIJO_ERROR):pos] == PREFIJO_ERROR:
+                    pos -= len(PREFIJO_ERROR)
+                self.descartados += pos
+                self.resincronizaciones += 1
+                trama = trama[pos:]
+                resincronizada = True
+        if len(trama) > self.max_trama:
+            self.descartados += len(trama)
+            return None
+        if resincronizada and self.al_resincronizar is not None:
+            self.al_resincronizar(trama)
+        return trama
+
+    def vaciar(self):
+        self._buffer.clear()
+
+
+def limpiar(datos):
+    """Quita espacios y '|' sobrantes de los bytes de una trama (un PaqueteBinario queda igual)."""
+    if isinstance(datos, PaqueteBinario):
+        return datos
+    return datos.strip().rstrip(b'|')
+
+
+def decodificar(datos):
+    """
+    Separa los bytes de una trama (ya limpia) en sus campos. Devuelve None
+    si no sigue el formato 16:grupo:codigo[:valor] (p. ej. texto de
+    depuración del Arduino).
+    """
+    partes = datos.split(SEPARADOR)
+    if len(partes) < 3 or partes[0] != _CABECERA_B:
+        return None
+    return Trama(datos, partes)
+
+
+def texto_mensaje(trama):
+    """Texto de una trama del grupo 0 (lo que va después de "16:0:")."""
+    return trama.datos[_INICIO_TEXTO:].decode('utf-8', errors='ignore').strip()
+
+
+# =====================================================
+# TRAMAS BINARIAS (16:1:8:1|)
+# =====================================================
+# En el enlace: 0x00 + COBS(paquete) + 0x00. COBS quita los 0x00 del
+# paquete (un byte más), así que un 0x00 siempre es un delimitador y tras
+# un byte perdido se resincroniza en el paquete siguiente. El paquete:
+#     tipo (1) | largo (1) | datos (largo) | checksum (suma módulo 256, como *HH)
+# Datos en little-endian y coma fija:
+#     TIPO_TH          temp, hum, media: int16 en centésimas (media = SIN_MEDIA si no se calcula)
+#     TIPO_SERVO       ángulo del servo: uint8 (0..180)
+#     TIPO_RADAR       ángulo del servo: uint8, distancia: uint16 en décimas de cm
+#     TIPO_ERROR|grupo código: int8 (16:<grupo>:<código>|)
+# Un paquete de T/H ocupa 12 bytes (unos 42 las tres tramas ASCII) y un punto
+# del radar 9 (unos 17).
+DELIMITADOR_BINARIO = b'\x00'
+TIPO_TH = 0x01
+TIPO_SERVO = 0x02
+TIPO_RADAR = 0x03
+TIPO_ERROR = 0x80
+SIN_MEDIA = 0x7FFF
+MAX_PAQUETE_BINARIO = 32   # bytes con COBS; el más largo (T/H) tiene 10
+_TH = struct.Struct("<hhh")
+_SERVO = struct.Struct("<B")
+_RADAR = struct.Struct("<BH")
+_ERROR = struct.Struct("<b")
+_ESTRUCTURAS = {TIPO_TH: _TH, TIPO_SERVO: _SERVO, TIPO_RADAR: _RADAR}
+
+
+def cobs_codificar(datos):
+    """COBS: cada bloque lleva delante la distancia al siguiente 0x00; el resultado no tiene 0x00."""
+    salida = bytearray()
+    for bloque in bytes(datos).split(DELIMITADOR_BINARIO):
+        while len(bloque) >= 0xFE:
+            salida.append(0xFF)
+            salida += bloque[:0xFE]
+            bloque = bloque[0xFE:]
+        salida.append(len(bloque) + 1)
+        salida += bloque
+    return bytes(salida)
+
+
+def cobs_decodificar(datos):
+    """Inverso de cobs_codificar. None si los bytes no son COBS válido."""
+    salida = bytearray()
+    i, n = 0, len(datos)
+    while i < n:
+        codigo = datos[i]
+        fin = i + codigo
+        if codigo == 0 or fin > n:
+            return None
+        salida += datos[i + 1:fin]
+        i = fin
+        if codigo < 0xFF and i < n:
+            salida.append(0)
+    return bytes(salida)
+
+
+def _fijo(valor, escala, minimo=-0x8000, maximo=0x7FFF):
+    return min(maximo, max(minimo, int(round(valor * escala))))
+
+
+def empaquetar(tipo, datos=b""):
+    """Paquete listo para enviar: 0x00 + COBS(tipo, largo, datos, checksum) + 0x00."""
+    paquete = bytes((tipo, len(datos))) + datos
+    paquete += bytes((checksum(paquete),))
+    return DELIMITADOR_BINARIO + cobs_codificar(paquete) + DELIMITADOR_BINARIO
+
+
+def binaria_TH(temp, hum, media=None):
+    """Temperatura, humedad y media (None si no la calcula el satélite) en un paquete."""
+    media = SIN_MEDIA if media is None else _fijo(media, 100, maximo=SIN_MEDIA - 1)
+    return empaquetar(TIPO_TH, _TH.pack(_fijo(temp, 100), _fijo(hum, 100), media))
+
+
+def binaria_servo(angulo_servo):
+    """Equivale a 16:2:0:<anguloServo>|."""
+    return empaquetar(TIPO_SERVO, _SERVO.pack(_fijo(angulo_servo, 1, 0, 0xFF)))
+
+
+def binaria_radar(angulo_servo, distancia):
+    """Equivale a 16:3:0:<anguloServo>:<distancia>|."""
+    return empaquetar(TIPO_RADAR, _RADAR.pack(_fijo(angulo_servo, 1, 0, 0xFF),
+                                              _fijo(distancia, 10, 0, 0xFFFF)))
+
+
+def binaria_error(grupo, codigo):
+    """Equivale a 16:<grupo>:<codigo>| (16:1:-1|, 16:2:-1|, 16:3:-2|...)."""
+    return empaquetar(TIPO_ERROR | grupo, _ERROR.pack(codigo))
+
+
+class PaqueteBinario(bytes):
+    """Paquete binario sin COBS (tipo, largo, datos, checksum), tal como lo entrega SeparadorTramas."""
+
+    __slots__ = ()
+
+
+class TramaBinaria(Trama):
+    """
+    Una trama sacada de un paquete binario. Los valores ya vienen convertidos
+    (struct), así que el Decodificador no separa ni convierte nada. datos y
+    partes (el 16:grupo:codigo:valor equivalente) solo se generan si alguien
+    los pide: registro, grabación, control de enlace...
+    """
+
+    __slots__ = ("_grupo", "_codigo", "valores", "_formato", "_datos")
+
+    def __init__(self, grupo, codigo, valores=(), formato=b""):
+        self._grupo = grupo
+        self._codigo = codigo
+        self.valores = valores
+        self._formato = formato
+        self._datos = None
+
+    @property
+    def grupo(self):
+        return self._grupo
+
+    @property
+    def codigo(self):
+        return self._codigo
+
+    @property
+    def datos(self):
+        if self._datos is None:
+            datos = SEPARADOR.join((_CABECERA_B, self._grupo, self._codigo))
+            if self.valores:
+                datos += SEPARADOR + self._formato % self.valores
+            self._datos = datos
+        return self._datos
+
+    @property
+    def partes(self):
+        return self.datos.split(SEPARADOR)
+
+
+def desempaquetar(paquete):
+    """
+    Comprueba un PaqueteBinario y lo convierte en sus tramas (lista de
+    TramaBinaria; el de T/H da tres: 01, 02 y 03). None si está dañado:
+    largo o checksum incorrectos o tipo desconocido.
+    """
+    if len(paquete) < 3 or paquete[1] != len(paquete) - 3 or checksum(paquete[:-1]) != paquete[-1]:
+        return None
+    tipo = paquete[0]
+    estructura = _ERROR if tipo & TIPO_ERROR else _ESTRUCTURAS.get(tipo)
+    if estructura is None or paquete[1] != estructura.size:
+        return None
+    valores = estructura.unpack_from(paquete, 2)
+    if tipo == TIPO_TH:
+        temp, hum, media = valores
+        return [TramaBinaria(b"1", b"01", (temp / 100.0,), b"%.2f"),
+                TramaBinaria(b"1", b"02", (hum / 100.0,), b"%.2f"),
+                TramaBinaria(b"1", b"03", (math.nan if media == SIN_MEDIA else media / 100.0,), b"%.2f")]
+    if tipo == TIPO_RADAR:
+        return [TramaBinaria(b"3", b"0", (valores[0], valores[1] / 10.0), b"%d:%.1f")]
+    if tipo == TIPO_SERVO:
+        return [TramaBinaria(b"2", b"0", valores, b"%d")]
+    return [TramaBinaria(b"%d" % (tipo & ~TIPO_ERROR), b"%d" % valores[0])]
+
+
+def _clave(campo):
+    return campo.encode("ascii") if isinstance(campo, str) else bytes(campo)
+
+
+class Decodificador:
+    """
+    Tabla de despacho (grupo, codigo) -> manejador.
+
+    registrar(grupo, codigo, manejador, tipos, corrupta):
+        - codigo None registra el manejador por defecto de todo el grupo;
+        - tipos convierte los campos a partir del código (p. ej. (float,)
+          para 16:1:01:<t>, (float, float) para 16:3:0:<ang>:<dist>) y el
+          manejador recibe manejador(trama, *valores);
+        - si falta algún campo o no se puede convertir se llama a
+          corrupta(trama) (o a al_corrupta si no se indica).
+    Las tramas de grupos sin manejador van a al_desconocida(trama). Para
+    añadir un grupo nuevo basta con registrarlo; el lector no cambia.
+
+    Antes de separar campos se comprueba el checksum (si lo hay, o siempre
+    con exigir_checksum=True): las tramas incorrectas y los avisos CHKERR:
+    de la estación de Tierra van a al_invalida(datos) sin llegar a
+    convertir ningún valor. Un mensaje de texto puede contener '*': hasta
+    que el enlace no trae alguna trama con checksum correcto (o sin
+    exigir_checksum), una cola *HH que no coincide es parte del texto. Las líneas que no son 16:... van a
+    al_no_protocolo(datos). Todo se cuenta por grupo en `contadores`.
+
+    Los paquetes binarios (PaqueteBinario) pasan por decodificar_binario /
+    procesar_binario: cada una de sus tramas va al mismo manejador que su
+    equivalente ASCII, con los valores ya convertidos.
+    """
+
+    def __init__(self, al_desconocida=None, al_corrupta=None, al_no_protocolo=None,
+                 al_invalida=None, exigir_checksum=False):
+        self._tabla = {}     # (grupo, codigo) -> (manejador, tipos, corrupta)
+        self._grupos = {}    # grupo -> (manejador, tipos, corrupta)
+        self._conocidos = set()
+        self.al_desconocida = al_desconocida
+        self.al_corrupta = al_corrupta
+        self.al_no_protocolo = al_no_protocolo
+        self.al_invalida = al_invalida
+        self.exigir_checksum = exigir_checksum
+        self.con_checksum = False   # ya ha llegado alguna trama con checksum correcto
+        self.contadores = ContadoresEnlace()
+
+    def registrar(self, grupo, codigo, manejador, tipos=(), corrupta=None):
+        entrada = (manejador, tuple(tipos), corrupta)
+        self._conocidos.add(_clave(grupo))
+        if codigo is None:
+            self._grupos[_clave(grupo)] = entrada
+        else:
+            self._tabla[(_clave(grupo), _clave(codigo))] = entrada
+
+    def despachar(self, trama):
+        valores = trama.valores
+        if valores is None:
+            partes = trama.partes
+            grupo, codigo = partes[1], partes[2]
+        else:
+            grupo, codigo = trama.grupo, trama.codigo
+        entrada = self._tabla.get((grupo, codigo)) or self._grupos.get(grupo)
+        if entrada is None:
+            if self.al_desconocida is not None:
+                self.al_desconocida(trama)
+            return
+
+        manejador, tipos, corrupta = entrada
+        if not tipos:
+            manejador(trama)
+            return
+        if valores is not None:
+            manejador(trama, *valores)
+            return
+        try:
+            valores = [tipo(campo) for tipo, campo in zip(tipos, partes[3:3 + len(tipos)])]
+        except ValueError:
+            valores = ()
+        if len(valores) < len(tipos):
+            corrupta = corrupta or self.al_corrupta
+            if corrupta is not None:
+                corrupta(trama)
+            return
+        manejador(trama, *valores)
+
+    def procesar(self, datos):
+        """
+        Comprueba, decodifica y despacha una trama. Devuelve la Trama, o None
+        si no es del protocolo o no ha pasado la comprobación de integridad.
+        """
+        trama = self.decodificar(datos)
+        if trama is not None:
+            self.despachar(trama)
+        return trama
+
+    def decodificar(self, datos):
+        """Comprobación de integridad y separación de campos (sin despachar)."""
+        if datos.startswith(PREFIJO_ERROR):
+            self._invalida(datos[len(PREFIJO_ERROR):])
+            return None
+        # Camino rápido: sin '*' no hay checksum que comprobar
+        if SEPARADOR_CHECKSUM in datos:
+            # En las tramas de datos un '*' solo puede ser el checksum; en los textos, no
+            estricto = self.exigir_checksum or self.con_checksum or not datos.startswith(_MENSAJE)
+            payload, estado = verificar(datos, estricto)
+            if estado == CORRECTA:
+                self.con_checksum = True
+        else:
+            payload, estado = datos, SIN_CHECKSUM
+        if estado == INCORRECTA or (estado == SIN_CHECKSUM and self.exigir_checksum):
+            self._invalida(datos)
+            return None
+
+        trama = decodificar(payload)
+        if trama is None:
+            if self.al_no_protocolo is not None:
+                self.al_no_protocolo(datos)
+            return None
+        grupo = trama.partes[1]
+        self.contadores.buena(grupo if grupo in self._conocidos else b"?")
+        return trama
+
+    def decodificar_binario(self, paquete):
+        """Como decodificar() para un PaqueteBinario: lista de TramaBinaria, o None si está dañado."""
+        tramas = desempaquetar(paquete)
+        if tramas is None:
+            grupo = b"%d" % (paquete[0] & ~TIPO_ERROR) if paquete else b"?"
+            self.contadores.mala(grupo if grupo in self._conocidos else b"?")
+            if self.al_invalida is not None:
+                self.al_invalida(b"bin:" + binascii.hexlify(paquete))
+            return None
+        for trama in tramas:
+            self.contadores.buena(trama.grupo)
+        return tramas
+
+    def procesar_binario(self, paquete):
+        """Comprueba, desempaqueta y despacha un PaqueteBinario. Devuelve sus tramas ([] si está dañado)."""
+        tramas = self.decodificar_binario(paquete) or []
+        for trama in tramas:
+            self.despachar(trama)
+        return tramas
+
+    def _invalida(self, datos):
+        # En una trama corrupta el grupo puede venir dañado: solo se cuentan los grupos registrados
+        grupo = grupo_crudo(datos)
+        self.contadores.mala(grupo if grupo in self._conocidos else b"?")
+        if self.al_invalida is not None:
+            self.al_invalida(datos)
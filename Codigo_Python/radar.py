@@ -0,0 +1,155 @@
+"""
+Estado del radar ultrasónico compartido entre el hilo de recepción y la GUI.
+
+El hilo de recepción solo publica datos aquí (nunca toca matplotlib); la
+interfaz lee una instantánea cuando le toca redibujar.
+
+Además de los últimos puntos (la línea del barrido actual), cada distancia
+válida se acumula en una RejillaOcupacion polar (ángulo x distancia) que se
+desvanece con el tiempo: memoria y coste de dibujado constantes, con la
+imagen de todos los barridos recientes. El alcance de la rejilla sigue a la
+escala del radar (alcance_rejilla) para que las celdas no sean más grandes
+que lo que se ve.
+"""
+
+from collections import deque
+import math
+import threading
+import time
+
+import numpy as np
+
+ALCANCE_BASE = 25.0   # cm: la rejilla cubre ALCANCE_BASE * 2**k, el menor que abarca la escala
+
+
+def alcance_rejilla(max_escala):
+    """
+    Alcance (cm) de la rejilla para la escala del radar: siempre se ve al menos
+    la mitad de sus celdas. Al ir en potencias de 2 no se rehace con cada
+    pequeño cambio de escala, y al doblarlo las celdas se juntan de dos en dos.
+    """
+    alcance = ALCANCE_BASE
+    while alcance < max_escala:
+        alcance *= 2
+    return alcance
+
+
+class RejillaOcupacion:
+    """
+    Rejilla polar de ocupación: n_angulos celdas en [-90º, 90º] por
+    n_distancias celdas en [0, max_distancia] cm.
+
+    Cada eco suma 1 a su celda y todo decae con exp(-t / vida) (vida en s).
+    El decaimiento es perezoso: en lugar de multiplicar toda la rejilla en
+    cada trama, los ecos se guardan escalados por exp(t / vida) respecto a
+    un instante de referencia y el factor común se aplica al leer. Añadir un
+    eco es O(1); solo de vez en cuando se renormaliza la rejilla entera
+    para que el factor no se desborde.
+    """
+
+    MAX_EXPONENTE = 30.0   # renormalizar antes de que exp() pierda precisión
+
+    def __init__(self, n_angulos=90, n_distancias=70, max_distancia=700.0, vida=30.0):
+        self.n_angulos = n_angulos
+        self.n_distancias = n_distancias
+        self.max_distancia = float(max_distancia)
+        self.vida = float(vida)
+        self.bordes_angulo = np.linspace(-np.pi / 2, np.pi / 2, n_angulos + 1)   # radianes
+        self.bordes_distancia = np.linspace(0.0, self.max_distancia, n_distancias + 1)
+        self._valores = np.zeros((n_angulos, n_distancias))
+        self._t_ref = None
+
+    def agregar(self, angulo_rad, distancia, t=None):
+        """Suma un eco (ángulo en radianes [-pi/2, pi/2], distancia en cm). Ignora NaN y fuera de rango."""
+        if not (0.0 <= distancia < self.max_distancia):   # también descarta NaN
+            return
+        t = time.time() if t is None else t
+        if self._t_ref is None:
+            self._t_ref = t
+        exponente = (t - self._t_ref) / self.vida
+        if exponente > self.MAX_EXPONENTE:
+            self._valores *= math.exp(-exponente)
+            self._t_ref, exponente = t, 0.0
+        i = int((angulo_rad + np.pi / 2) / np.pi * self.n_angulos)
+        j = int(distancia / self.max_distancia * self.n_distancias)
+        i = min(max(i, 0), self.n_angulos - 1)
+        self._valores[i, j] += math.exp(exponente)
+
+    def cambiar_alcance(self, max_distancia):
+        """Cambia el alcance conservando los ecos: cada celda pasa a la que contiene su centro."""
+        max_distancia = float(max_distancia)
+        if max_distancia == self.max_distancia:
+            return
+        centros = (np.arange(self.n_distancias) + 0.5) * self.max_distancia / self.n_distancias
+        destino = (centros / max_distancia * self.n_distancias).astype(int)
+        dentro = destino < self.n_distancias   # lo que queda fuera tampoco se ve con la escala nueva
+        valores = np.zeros_like(self._valores)
+        np.add.at(valores, (slice(None), destino[dentro]), self._valores[:, dentro])
+        self._valores = valores
+        self.max_distancia = max_distancia
+        self.bordes_distancia = np.linspace(0.0, max_distancia, self.n_distancias + 1)
+
+    def ocupacion(self, t=None):
+        """Copia de la rejilla en [0, 1) (1 - exp(-ecos acumulados)), lista para dibujar."""
+        if self._t_ref is None:
+            return np.zeros_like(self._valores)
+        t = time.time() if t is None else t
+        ecos = self._valores * math.exp(-(t - self._t_ref) / self.vida)
+        return -np.expm1(-ecos)
+
+    def vaciar(self):
+        self._valores[:] = 0.0
+        self._t_ref = None
+
+
+class EstadoRadar:
+    """Últimos puntos (ángulo, distancia), texto de estado y escala del radar."""
+
+    def __init__(self, ventana_puntos, max_escala, rejilla=None):
+        self._lock = threading.Lock()
+        self.rejilla = (rejilla if rejilla is not None
+                        else RejillaOcupacion(max_distancia=alcance_rejilla(max_escala)))
+        self._angulos = deque(maxlen=ventana_puntos)     # radianes
+        self._distancias = deque(maxlen=ventana_puntos)  # cm (NaN = error)
+        self._texto = ""
+        self._max_escala = max_escala
+        self.version = 0   # se incrementa con cada cambio publicado
+
+    def agregar_punto(self, angulo_rad, distancia, texto, t=None):
+        """Añade un punto (los más antiguos se descartan solos al llenarse la ventana)."""
+        with self._lock:
+            self._angulos.append(angulo_rad)
+            self._distancias.append(distancia)
+            self.rejilla.agregar(angulo_rad, distancia, t)
+            self._texto = texto
+            self.version += 1
+
+    def fijar_texto(self, texto):
+        with self._lock:
+            self._texto = texto
+            self.version += 1
+
+    def fijar_escala(self, max_escala):
+        with self._lock:
+            if max_escala != self._max_escala:
+                self._max_escala = max_escala
+                self.rejilla.cambiar_alcance(alcance_rejilla(max_escala))
+                self.version += 1
+
+    @property
+    def max_escala(self):
+        return self._max_escala
+
+    def instantanea(self):
+        """Devuelve (version, angulos, distancias, texto, max_escala) de forma consistente."""
+        with self._lock:
+            return (self.version,
+                    np.array(self._angulos, dtype=float),
+                    np.array(self._distancias, dtype=float),
+                    self._texto,
+                    self._max_escala)
+
+    def ocupacion(self, t=None):
+        """Devuelve (bordes de distancia, rejilla de ocupación en t) (copias) para dibujarla con pcolormesh."""
+        with self._lock:
+            return self.rejilla.bordes_distancia.copy(), self.rejilla.ocupacion(t)
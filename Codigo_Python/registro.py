@@ -0,0 +1,218 @@
+"""
+Registro (logging) de la estación de Tierra sin bloquear la recepción.
+
+El hilo de recepción solo pone cada registro en una cola (nunca espera al
+disco). Un hilo escritor los saca por lotes y los escribe en el archivo,
+volcando al disco cuando el lote llega a tam_lote registros o cuando han
+pasado intervalo segundos desde el primero. El archivo rota por tamaño
+(max_bytes / copias) o por tiempo (cuando = "midnight", "H"...).
+
+Los avisos repetidos (p. ej. "Mensaje grupo 3 incompleto") se limitan por
+categoría: como mucho limite_avisos cada periodo_avisos segundos; el
+siguiente que pasa indica cuántos se han omitido. Uso:
+
+    import registro
+    registro.configurar_registro("estacion_tierra.log")
+"""
+
+import atexit
+import logging
+import logging.handlers
+import queue
+import threading
+import time
+
+FORMATO = "%(asctime)s - %(levelname)s - %(message)s"
+_FIN = object()
+
+
+# =====================================================
+# LIMITADOR DE AVISOS
+# =====================================================
+class FiltroFrecuencia(logging.Filter):
+    """
+    Deja pasar como mucho `limite` registros de nivel >= nivel por categoría
+    (mismo texto de formato) en cada periodo de `periodo` segundos.
+    """
+
+    def __init__(self, limite=5, periodo=60.0, nivel=logging.WARNING):
+        super().__init__()
+        self.limite = limite
+        self.periodo = periodo
+        self.nivel = nivel
+        self._lock = threading.Lock()
+        self._categorias = {}   # (nivel, msg) -> [inicio_periodo, pasados, omitidos]
+
+    def filter(self, record):
+        if record.levelno < self.nivel:
+            return True
+        clave = (record.levelno, record.msg)
+        ahora = time.monotonic()
+        with self._lock:
+            estado = self._categorias.get(clave)
+            if estado is None or ahora - estado[0] >= self.periodo:
+                omitidos = estado[2] if estado is not None else 0
+                self._categorias[clave] = [ahora, 1, 0]
+            elif estado[1] < self.limite:
+                estado[1] += 1
+                omitidos = 0
+            else:
+                estado[2] += 1
+                return False
+        if omitidos:
+            record.msg = f"{record.getMessage()} ({omitidos} avisos iguales omitidos)"
+            record.args = None
+        return True
+
+
+# =====================================================
+# COLA (lado del hilo que registra)
+# =====================================================
+class ManejadorCola(logging.handlers.QueueHandler):
+    """QueueHandler que nunca bloquea: si la cola está llena el registro se descarta."""
+
+    def __init__(self, cola):
+        super().__init__(cola)
+        self.descartados = 0
+
+    def prepare(self, record):
+        # Solo se resuelve el mensaje; la fecha y el formato los pone el escritor
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+
+# =====================================================
+# ESCRITOR POR LOTES (hilo propio)
+# =====================================================
+class _VolcadoDiferido:
+    """Los manejadores de archivo no vuelcan en cada registro, sino al final de cada lote."""
+
+    def flush(self):
+        pass
+
+    def volcar(self):
+        super().flush()
+
+
+class ArchivoRotativo(_VolcadoDiferido, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class ArchivoRotativoTiempo(_VolcadoDiferido, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class EscritorLotes:
+    """Saca los registros de la cola y los escribe en `destino` por lotes."""
+
+    def __init__(self, cola, destino, tam_lote=200, intervalo=1.0):
+        self.cola = cola
+        self.destino = destino
+        self.tam_lote = tam_lote
+        self.intervalo = intervalo
+        self.lotes = 0
+        self.registros = 0
+        self.tiempo_escritura = 0.0
+        self._hilo = threading.Thread(target=self._bucle, name="registro", daemon=True)
+
+    def iniciar(self):
+        self._hilo.start()
+
+    def detener(self):
+        """Escribe lo pendiente y termina el hilo."""
+        if self._hilo.is_alive():
+            self.cola.put(_FIN)
+            self._hilo.join()
+            self.destino.close()
+
+    def _bucle(self):
+        lote = []
+        limite = 0.0
+        while True:
+            espera = max(0.0, limite - time.monotonic()) if lote else None
+            try:
+                registro = self.cola.get(timeout=espera)
+            except queue.Empty:
+                registro = None
+            if registro is _FIN:
+                self._escribir(lote)
+                return
+            if registro is not None:
+                if not lote:
+                    limite = time.monotonic() + self.intervalo
+                lote.append(registro)
+            if lote and (len(lote) >= self.tam_lote or time.monotonic() >= limite):
+                self._escribir(lote)
+                lote = []
+
+    def _escribir(self, lote):
+        if not lote:
+            return
+        t_ini = time.perf_counter()
+        for registro in lote:
+            self.destino.handle(registro)
+        self.destino.volcar()
+        self.lotes += 1
+        self.registros += len(lote)
+        self.tiempo_escritura += time.perf_counter() - t_ini
+
+
+# =====================================================
+# CONFIGURACIÓN
+# =====================================================
+def configurar_registro(archivo="estacion_tierra.log", nivel=logging.INFO, modo="a",
+                        max_bytes=5_000_000, copias=5, cuando=None,
+                        tam_lote=200, intervalo=1.0,
+                        limite_avisos=5, periodo_avisos=60.0, tam_cola=10000):
+    """
+    Sustituye a logging.basicConfig(filename=...). Devuelve el EscritorLotes
+    (se detiene solo al salir del programa).
+    cuando=None -> rotación por tamaño (max_bytes=0 desactiva la rotación);
+    cuando="midnight", "H"... -> rotación por tiempo (TimedRotatingFileHandler).
+    """
+    if cuando:
+        destino = ArchivoRotativoTiempo(archivo, when=cuando, backupCount=copias,
+                                        encoding="utf-8")
+    else:
+        destino = ArchivoRotativo(archivo, mode=modo, maxBytes=max_bytes,
+                                  backupCount=copias, encoding="utf-8")
+    destino.setFormatter(logging.Formatter(FORMATO))
+
+    cola = queue.Queue(tam_cola)
+    manejador = ManejadorCola(cola)
+    if limite_avisos:
+        manejador.addFilter(FiltroFrecuencia(limite_avisos, periodo_avisos))
+
+    raiz = logging.getLogger()
+    for anterior in raiz.handlers[:]:
+        raiz.removeHandler(anterior)
+    raiz.addHandler(manejador)
+    raiz.setLevel(nivel)
+
+    escritor = EscritorLotes(cola, destino, tam_lote, intervalo)
+    manejador.escritor = escritor
+    escritor.iniciar()
+    atexit.register(escritor.detener)
+    return escritor
+
+
+def estado():
+    """
+    Estado del registro configurado con configurar_registro(): registros
+    pendientes en la cola, descartados, escritos, lotes y segundos escribiendo.
+    None si el registro no se ha configurado así.
+    """
+    for manejador in logging.getLogger().handlers:
+        if isinstance(manejador, ManejadorCola) and hasattr(manejador, "escritor"):
+            escritor = manejador.escritor
+            return {"pendientes": manejador.queue.qsize(), "descartados": manejador.descartados,
+                    "escritos": escritor.registros, "lotes": escritor.lotes,
+                    "tiempo_escritura": escritor.tiempo_escritura}
+    return None
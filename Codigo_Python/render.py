@@ -0,0 +1,234 @@
+"""
+Planificación del dibujado de las gráficas desde el hilo de Tk.
+
+Los hilos de recepción no dibujan nunca: solo publican estado e incrementan
+un número de versión. El planificador, que corre en el bucle de Tk con
+root.after, comprueba las versiones como máximo fps_max veces por segundo y
+redibuja una sola vez aunque hayan llegado muchas tramas seguidas.
+
+PanelMensajes hace lo mismo con los mensajes de texto del satélite: los
+hilos de recepción solo los añaden a una cola y el hilo de Tk los pasa al
+cuadro de texto por lotes, añadiendo las líneas nuevas y borrando las
+caducadas (sin rehacer el contenido entero). BannerAlertas muestra las
+alertas activas (alertas.py) en una etiqueta, sin ventanas modales.
+"""
+
+import logging
+import time
+from collections import deque
+
+
+class PlanificadorRender:
+    """Agrupa los cambios publicados por otros hilos en como máximo fps_max frames por segundo."""
+
+    def __init__(self, root, fps_max=10):
+        self.root = root
+        self.intervalo_ms = max(1, int(1000 / fps_max))
+        self._tareas = []      # [obtener_version, dibujar, ultima_version_dibujada]
+        self._activo = False
+
+    def registrar(self, obtener_version, dibujar):
+        """
+        Registra una gráfica. obtener_version() debe ser barata y segura desde
+        el hilo de Tk; dibujar() se llama solo cuando la versión ha cambiado.
+        """
+        self._tareas.append([obtener_version, dibujar, None])
+
+    def iniciar(self):
+        if not self._activo:
+            self._activo = True
+            self.root.after(self.intervalo_ms, self._tick)
+
+    def detener(self):
+        self._activo = False
+
+    def _tick(self):
+        if not self._activo:
+            return
+        for tarea in self._tareas:
+            version = tarea[0]()
+            if version == tarea[2]:
+                continue
+            tarea[2] = version
+            try:
+                tarea[1]()
+            except Exception:
+                logging.exception("Error al redibujar")
+        self.root.after(self.intervalo_ms, self._tick)
+
+
+class ContadorFrames:
+    """
+    Cuenta frames completos, parciales (blit) y omitidos, y su tiempo de
+    dibujado. Con `histograma` (metricas.Histograma con etiquetas grafica y
+    tipo) cada frame dibujado se observa también allí con el nombre dado.
+    """
+
+    def __init__(self, histograma=None, nombre=""):
+        self.histograma = histograma
+        self.nombre = nombre
+        self.reiniciar()
+
+    def reiniciar(self):
+        self.frames = {"completo": 0, "blit": 0, "omitido": 0}
+        self.tiempo_total = {"completo": 0.0, "blit": 0.0}
+        self.tiempo_max = {"completo": 0.0, "blit": 0.0}
+        self.ultimo = 0.0
+
+    def registrar(self, tipo, segundos):
+        self.frames[tipo] += 1
+        self.tiempo_total[tipo] += segundos
+        self.tiempo_max[tipo] = max(self.tiempo_max[tipo], segundos)
+        self.ultimo = segundos
+        if self.histograma is not None:
+            self.histograma.observar(segundos, self.nombre, tipo)
+
+    def omitido(self):
+        self.frames["omitido"] += 1
+
+    def media_ms(self, tipo):
+        n = self.frames[tipo]
+        return 1000.0 * self.tiempo_total[tipo] / n if n else 0.0
+
+    def resumen(self):
+        return (f"completos={self.frames['completo']} "
+                f"({self.media_ms('completo'):.1f} ms medio, {1000 * self.tiempo_max['completo']:.1f} máx) "
+                f"blit={self.frames['blit']} "
+                f"({self.media_ms('blit'):.1f} ms medio, {1000 * self.tiempo_max['blit']:.1f} máx) "
+                f"omitidos={self.frames['omitido']}")
+
+
+class DibujoBlit:
+    """
+    Redibujado parcial de una figura con blitting.
+
+    Los artistas dinámicos (líneas, textos, títulos) se marcan como animados,
+    así el dibujado completo solo pinta el fondo estático (ejes, rejilla,
+    ticks), que se guarda. En cada frame se restaura ese fondo y se repintan
+    únicamente los artistas dinámicos. El fondo se vuelve a capturar en cada
+    dibujado completo (también al redimensionar la ventana).
+    """
+
+    def __init__(self, canvas, artistas, contador=None):
+        self.canvas = canvas
+        self.figura = canvas.figure
+        self.artistas = list(artistas)
+        self.contador = contador if contador is not None else ContadorFrames()
+        self._fondo = None
+        for artista in self.artistas:
+            artista.set_animated(True)
+        canvas.mpl_connect("draw_event", self._al_dibujar)
+
+    def _al_dibujar(self, event):
+        self._fondo = self.canvas.copy_from_bbox(self.figura.bbox)
+        self._pintar_artistas()
+
+    def _pintar_artistas(self):
+        for artista in self.artistas:
+            self.figura.draw_artist(artista)
+
+    def sustituir(self, anterior, nuevo):
+        """Cambia un artista dinámico por otro (p. ej. una malla rehecha); no está en el fondo guardado."""
+        self.artistas[self.artistas.index(anterior)] = nuevo
+        nuevo.set_animated(True)
+
+    def actualizar(self, completo=False):
+        """Redibuja la figura: completo si se pide o si aún no hay fondo guardado; si no, blit."""
+        t_ini = time.perf_counter()
+        if completo or self._fondo is None:
+            self.canvas.draw()   # dispara draw_event -> guarda el fondo y pinta los artistas
+            tipo = "completo"
+        else:
+            self.canvas.restore_region(self._fondo)
+            self._pintar_artistas()
+            self.canvas.blit(self.figura.bbox)
+            tipo = "blit"
+        self.contador.registrar(tipo, time.perf_counter() - t_ini)
+
+
+class PanelMensajes:
+    """
+    Últimos mensajes (máx. max_visibles y máx. vida segundos) en un tk.Text.
+
+    agregar() se puede llamar desde cualquier hilo y no toca la interfaz;
+    actualizar() se llama desde el hilo de Tk (p. ej. cada 200 ms) y aplica
+    de una vez todo lo pendiente. Si llegan más de max_pendientes mensajes
+    entre dos actualizaciones solo se guardan los últimos.
+    """
+
+    def __init__(self, texto, max_visibles=5, vida=4.0, max_pendientes=100):
+        self.texto = texto
+        self.max_visibles = max_visibles
+        self.vida = vida
+        self._entrantes = deque(maxlen=max_pendientes)   # (t, texto); append es seguro entre hilos
+        self._visibles = deque()                          # (t, texto) de cada línea del widget
+        self.recibidos = 0
+
+    def agregar(self, mensaje, t=None):
+        # Una línea por mensaje: así borrar el más antiguo es borrar la primera línea
+        self._entrantes.append((time.time() if t is None else t,
+                                " ".join(str(mensaje).splitlines())))
+        self.recibidos += 1
+
+    def actualizar(self, ahora=None):
+        """Pasa al widget los mensajes nuevos y quita los caducados. Devuelve True si ha cambiado algo."""
+        ahora = time.time() if ahora is None else ahora
+        nuevos = []
+        while self._entrantes:
+            t, mensaje = self._entrantes.popleft()
+            if ahora - t <= self.vida:
+                nuevos.append((t, mensaje))
+        nuevos = nuevos[-self.max_visibles:]
+
+        en_widget = len(self._visibles)
+        self._visibles.extend(nuevos)
+        quitados = 0
+        while self._visibles and (len(self._visibles) > self.max_visibles
+                                  or ahora - self._visibles[0][0] > self.vida):
+            self._visibles.popleft()
+            quitados += 1
+        # Los primeros quitados son líneas del widget; el resto, nuevos que ya no se muestran
+        borrar = min(quitados, en_widget)
+        nuevos = nuevos[quitados - borrar:]
+        if not nuevos and not borrar:
+            return False
+
+        self.texto.configure(state="normal")
+        if borrar:
+            self.texto.delete("1.0", f"{borrar + 1}.0")
+        for _, mensaje in nuevos:
+            self.texto.insert("end-1c", mensaje + "\n")
+        self.texto.configure(state="disabled")
+        return True
+
+
+class BannerAlertas:
+    """
+    Etiqueta con las alertas activas: fondo rojo mientras hay alguna y
+    texto_normal con los colores originales cuando no. actualizar(activas)
+    se llama desde el hilo de Tk con MotorAlertas.activas(); solo toca el
+    widget si la lista ha cambiado.
+    """
+
+    def __init__(self, etiqueta, texto_normal="Sin alertas", fondo="#c62828", color="white"):
+        self.etiqueta = etiqueta
+        self.texto_normal = texto_normal
+        self.fondo = fondo
+        self.color = color
+        self._normal = (etiqueta.cget("background"), etiqueta.cget("foreground"))
+        self._mostradas = None
+        self.actualizar([])
+
+    def actualizar(self, activas):
+        """Devuelve True si ha cambiado el contenido."""
+        activas = list(activas)
+        if activas == self._mostradas:
+            return False
+        self._mostradas = activas
+        if activas:
+            texto = "⚠ " + "   ·   ".join(texto for _, texto in activas)
+            self.etiqueta.configure(text=texto, background=self.fondo, foreground=self.color)
+        else:
+            fondo, color = self._normal
+            self.etiqueta.configure(text=self.texto_normal, background=fondo, foreground=color)
+        return True
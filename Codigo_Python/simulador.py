@@ -0,0 +1,376 @@
+"""
+Simulador del satélite (Arduino_Transmisor/Satélite.ino) para pruebas de carga.
+
+Genera las mismas tramas que el firmware:
+    16:1:01:<t>| 16:1:02:<h>| 16:1:03:<media>|   T/H/media (limitado por el periodo global)
+    16:1:-1|                                      error de lectura del DHT
+    16:3:0:<angulo>:<distancia>|                  barrido del radar
+    16:3:-2|                                      sin eco / fuera de rango
+    16:2:0:<angulo>|  16:2:-1|                    respuesta a 16:2:1:<ang>|
+    16:0:<texto>|                                 mensajes de texto
+y responde a los comandos 16:1:x y 16:2:1 como el firmware (con checksum
+*HH opcional en ambos sentidos). Con 16:1:8:1| (o binario=True) las tramas
+de datos salen en binario (protocolo.binaria_*) y los mensajes de texto
+siguen en ASCII. Con respuestas=False no contesta a los comandos (ni
+16:0 ni 16:2:0), como el firmware anterior. Los periodos, el ruido y las tasas de
+error, pérdida y corrupción se pueden configurar muy por encima de lo que
+permiten el DHT11 y LoRa.
+
+Con capacidad_enlace (bytes/s) se simula además el tiempo en el aire de
+LoRa: cada trama ocupa el canal len/capacidad s y, si lo pendiente de
+transmitir pasa de cola_enlace s, la trama se pierde. Así la pérdida crece
+cuando se envía más de lo que cabe (para probar control_enlace.py).
+
+El tiempo es simulado (milisegundos), así que se puede generar un flujo
+de horas de telemetría sin esperar (generar_flujo) o conectarlo en tiempo
+real a la estación con BackendSimulado.
+"""
+
+import asyncio
+import math
+import random
+
+import protocolo
+
+
+class SateliteSimulado:
+    """Réplica en Python del bucle del firmware del satélite."""
+
+    MIN_CM = 3.0
+    MAX_CM = 700.0
+    PASO_SERVO = 2
+    TIEMPO_MANTENER_ANG = 4000
+
+    def __init__(self, periodo_TH=5000, periodo_global=5000, intervalo_dist=600,
+                 intervalo_servo=20, ruido=0.2, tasa_error_TH=0.0, tasa_error_dist=0.0,
+                 tasa_perdida=0.0, tasa_corrupcion=0.0, checksum=None, semilla=None,
+                 capacidad_enlace=None, cola_enlace=1.0, binario=False, respuestas=True):
+        self.periodo_TH = periodo_TH          # intervaloEnvio (ms)
+        self.periodo_global = periodo_global  # periodoGlobalEnvio (ms, 0 = sin límite)
+        self.intervalo_dist = intervalo_dist  # INTERVALO_DIST (ms)
+        self.intervalo_servo = intervalo_servo
+        self.ruido = ruido                    # desviación típica relativa del ruido de los sensores
+        self.tasa_error_TH = tasa_error_TH    # probabilidad de 16:1:-1 en cada lectura del DHT
+        self.tasa_error_dist = tasa_error_dist
+        self.tasa_perdida = tasa_perdida      # probabilidad de que una trama no llegue
+        self.tasa_corrupcion = tasa_corrupcion
+        self.checksum = checksum              # None, "suma" (*HH, enviarConChecksum) o "crc16"
+        self.binario = binario                # formato de las tramas de datos (16:1:8:<0|1>|)
+        self.respuestas = respuestas          # False: firmware sin mensajes 16:0 ni respuestas del servo
+        self.capacidad_enlace = capacidad_enlace  # bytes/s del enlace (None = sin límite)
+        self.cola_enlace = cola_enlace        # s de tramas pendientes que caben antes de perder
+        self._t_canal_libre = 0.0             # ms en que el canal termina lo pendiente
+        self.rng = random.Random(semilla)
+
+        # Estado del firmware
+        self.enviar_datos = True
+        self.media_en_satelite = True
+        self.modo_manual = False
+        self.angulo = 0
+        self.direccion = 1
+        self.angulo_objetivo = 0
+        self.inicio_manual = 0
+        self.ultimo_comando = ""
+        self.buffer_temps = []
+
+        self.ahora = 0                         # ms simulados
+        self._t_TH = 0
+        self._t_global = -math.inf
+        self._t_dist = 0
+        self._t_servo = 0
+        self._salida = bytearray()
+        self._entrada = bytearray()
+
+        # Contadores para comprobar lo que ha recibido la estación
+        self.enviadas = 0
+        self.perdidas = 0
+        self.corruptas = 0
+        self.saturadas = 0                     # perdidas por falta de capacidad del enlace
+
+        self._enviar_texto("Satélite iniciado. Transmitiendo datos.")
+
+    # -------------------------
+    # Salida de tramas
+    # -------------------------
+    def _enviar(self, payload):
+        trama = (payload + "|").encode("utf-8")
+        if self.checksum:
+            trama = protocolo.con_checksum(trama, self.checksum)
+        self._transmitir(trama)
+
+    def _enviar_error(self, grupo, codigo):
+        if self.binario:
+            self._transmitir(protocolo.binaria_error(grupo, codigo))
+        else:
+            self._enviar(f"16:{grupo}:{codigo}")
+
+    def _transmitir(self, trama):
+        self.enviadas += 1
+        if self.capacidad_enlace:
+            inicio = max(self._t_canal_libre, self.ahora)
+            if inicio - self.ahora > self.cola_enlace * 1000.0:
+                self.perdidas += 1
+                self.saturadas += 1
+                return
+            self._t_canal_libre = inicio + 1000.0 * len(trama) / self.capacidad_enlace
+        if self.tasa_perdida and self.rng.random() < self.tasa_perdida:
+            self.perdidas += 1
+            return
+        if self.tasa_corrupcion and self.rng.random() < self.tasa_corrupcion:
+            trama = self._corromper(trama)
+            self.corruptas += 1
+        self._salida += trama
+
+    def _corromper(self, trama):
+        """Cambia, borra o duplica un byte (nunca el '|' o 0x00 final, como un error de LoRa)."""
+        datos = bytearray(trama[:-1])
+        if not datos:
+            return trama
+        i = self.rng.randrange(len(datos))
+        tipo = self.rng.random()
+        if tipo < 0.5:
+            datos[i] = self.rng.choice(b"0123456789:.-x#")
+        elif tipo < 0.8:
+            del datos[i]
+        else:
+            datos.insert(i, datos[i])
+        return bytes(datos) + trama[-1:]
+
+    def _enviar_texto(self, msg):
+        if self.respuestas:
+            self._enviar("16:0:" + msg)
+
+    def leer_salida(self):
+        """Devuelve (y vacía) los bytes que el satélite ha enviado hasta ahora."""
+        datos = bytes(self._salida)
+        self._salida.clear()
+        return datos
+
+    # -------------------------
+    # Comandos recibidos
+    # -------------------------
+    def recibir(self, datos):
+        """Procesa bytes recibidos de la estación (uno o varios comandos terminados en '|')."""
+        self._entrada += datos
+        while True:
+            fin = self._entrada.find(b"|")
+            if fin < 0:
+                break
+            comando = self._entrada[:fin].decode("utf-8", errors="ignore").strip()
+            del self._entrada[:fin + 1]
+            if comando:
+                self._comando(comando)
+
+    def _comando(self, com_sat):
+        # Checksum opcional "payload*HH" (verificarYQuitarChecksum)
+        payload, estado = protocolo.verificar(com_sat.encode("utf-8"))
+        if estado == protocolo.INCORRECTA:
+            self._enviar_texto("Satélite: checksum incorrecto. Comando ignorado")
+            return
+        com_sat = payload.decode("utf-8", errors="ignore")
+        if com_sat == self.ultimo_comando:
+            return   # el firmware ignora comandos duplicados
+        self.ultimo_comando = com_sat
+
+        campos = com_sat.split(":")
+        def campo(i, defecto):
+            try:
+                return int(campos[i])
+            except (IndexError, ValueError):
+                return defecto
+        c1, c2, c3 = campo(1, -1), campo(2, -1), campo(3, -1)
+
+        if c1 == 1:
+            if c2 in (1, 3):
+                self.enviar_datos = True
+                self._enviar_texto("Satélite: envío de datos T/H activado")
+            elif c2 == 2:
+                self.enviar_datos = False
+                self._enviar_texto("Satélite: envío de datos T/H detenido")
+            elif c2 == 4:
+                if 500 <= c3 <= 5000:
+                    self.periodo_TH = c3
+                    self._enviar_texto(f"Satélite: periodo de envío = {c3} ms")
+                else:
+                    self._enviar_texto("Satélite: periodo de envío fuera de rango (500-5000 ms)")
+            elif c2 == 5:
+                self.media_en_satelite = False
+                self._enviar_texto("Satélite: media de temperatura calculada en Tierra (Python)")
+            elif c2 == 6:
+                self.media_en_satelite = True
+                self._enviar_texto("Satélite: media de temperatura calculada en el propio satélite")
+            elif c2 == 7:
+                if c3 == 0 or 500 <= c3 <= 10000:
+                    self.periodo_global = c3
+                    self._enviar_texto(f"Satélite: periodo GLOBAL de envío = {c3} ms.")
+                else:
+                    self._enviar_texto("Satélite: periodo GLOBAL fuera de rango "
+                                       "(500-10000 ms o 0 para desactivar)")
+            elif c2 == 8:
+                if c3 in (0, 1):
+                    self.binario = c3 == 1
+                    self._enviar_texto(f"Satélite: formato de tramas = {c3} "
+                                       f"({'binario' if self.binario else 'ASCII'})")
+                else:
+                    self._enviar_texto("Satélite: formato de tramas fuera de rango (0 ASCII, 1 binario)")
+        elif c1 == 2 and c2 == 1:
+            if -90 <= c3 <= 90:
+                self.angulo_objetivo = self.angulo = c3 + 90
+                self.modo_manual = True
+                self.inicio_manual = self.ahora
+                if self.respuestas and self.binario:
+                    self._transmitir(protocolo.binaria_servo(self.angulo))
+                elif self.respuestas:
+                    self._enviar(f"16:2:0:{self.angulo}")
+                self._enviar_texto(f"Satélite: servo movido a {c3} grados")
+            else:
+                if self.respuestas:
+                    self._enviar_error(2, -1)
+                self._enviar_texto("Satélite: ángulo de servo fuera de rango (-90 a 90)")
+
+    # -------------------------
+    # Sensores simulados
+    # -------------------------
+    def _leer_TH(self):
+        t_s = self.ahora / 1000.0
+        temp = 25.0 + 3.0 * math.sin(t_s / 300.0) + self.rng.gauss(0, self.ruido)
+        hum = 45.0 + 5.0 * math.cos(t_s / 400.0) + self.rng.gauss(0, 5 * self.ruido)
+        return temp, hum
+
+    def _medir_distancia(self):
+        """Escena fija: pared a 150 cm y un objeto a 40 cm entre 60º y 80º del servo."""
+        base = 40.0 if 60 <= self.angulo <= 80 else 150.0
+        d = base * (1.0 + self.rng.gauss(0, self.ruido / 10))
+        if d < self.MIN_CM or d > self.MAX_CM:
+            return -1.0
+        return d
+
+    # -------------------------
+    # Bucle principal
+    # -------------------------
+    def _proximo_TH(self):
+        """Próxima lectura del DHT: periodo propio y, además, el periodo global (límite LoRa)."""
+        if not self.enviar_datos:
+            return math.inf
+        t = self._t_TH + max(1, self.periodo_TH)
+        if self.periodo_global:
+            t = max(t, self._t_global + self.periodo_global)
+        return t
+
+    def _paso_TH(self):
+        if self.tasa_error_TH and self.rng.random() < self.tasa_error_TH:
+            self._enviar_error(1, -1)
+            return
+        t, h = self._leer_TH()
+        if self.media_en_satelite:
+            self.buffer_temps.append(t)
+            if len(self.buffer_temps) > 10:
+                self.buffer_temps.pop(0)
+        if self.binario:
+            media = sum(self.buffer_temps) / len(self.buffer_temps) if self.media_en_satelite else None
+            self._transmitir(protocolo.binaria_TH(t, h, media))
+            return
+        self._enviar(f"16:1:01:{t:.2f}")
+        self._enviar(f"16:1:02:{h:.2f}")
+        if self.media_en_satelite:
+            media = sum(self.buffer_temps) / len(self.buffer_temps)
+            self._enviar(f"16:1:03:{media:.2f}")
+
+    def _paso_distancia(self):
+        d = self._medir_distancia()
+        if d < 0 or (self.tasa_error_dist and self.rng.random() < self.tasa_error_dist):
+            self._enviar_error(3, -2)
+        elif self.binario:
+            self._transmitir(protocolo.binaria_radar(self.angulo, d))
+        else:
+            self._enviar(f"16:3:0:{self.angulo}:{d:.1f}")
+
+    def _paso_servo(self):
+        if self.modo_manual:
+            if self.ahora - self.inicio_manual >= self.TIEMPO_MANTENER_ANG:
+                self.modo_manual = False
+            return
+        self.angulo += self.direccion * self.PASO_SERVO
+        if self.angulo >= 180:
+            self.angulo, self.direccion = 180, -1
+        elif self.angulo <= 0:
+            self.angulo, self.direccion = 0, 1
+
+    def avanzar(self, hasta_ms):
+        """Ejecuta el bucle del firmware hasta el instante simulado hasta_ms."""
+        while True:
+            t_TH = self._proximo_TH()
+            t_dist = self._t_dist + max(1, self.intervalo_dist)
+            t_servo = self._t_servo + max(1, self.intervalo_servo)
+            siguiente = max(self.ahora, min(t_TH, t_dist, t_servo))
+            if siguiente > hasta_ms:
+                break
+            self.ahora = siguiente
+            if self.ahora >= t_TH:
+                self._t_TH = self._t_global = self.ahora
+                self._paso_TH()
+            if self.ahora >= t_dist:
+                self._t_dist = self.ahora
+                self._paso_distancia()
+            if self.ahora >= t_servo:
+                self._t_servo = self.ahora
+                self._paso_servo()
+        self.ahora = max(self.ahora, hasta_ms)
+
+    def proximo_evento(self):
+        """Instante (ms simulados) del próximo evento que puede generar tramas."""
+        return max(self.ahora, min(self._proximo_TH(), self._t_dist + max(1, self.intervalo_dist)))
+
+
+def generar_flujo(simulador, duracion_s, bloque_ms=1000):
+    """Genera, sin esperar, los bytes que enviaría el satélite durante duracion_s segundos."""
+    fin = simulador.ahora + duracion_s * 1000
+    while simulador.ahora < fin:
+        simulador.avanzar(min(fin, simulador.ahora + bloque_ms))
+        datos = simulador.leer_salida()
+        if datos:
+            yield datos
+
+
+class BackendSimulado:
+    """
+    Backend del transporte conectado a un SateliteSimulado dentro del proceso.
+    velocidad = 1 -> tiempo real; 10 -> diez veces más rápido; 0 -> sin esperas.
+    """
+
+    def __init__(self, simulador=None, velocidad=1.0):
+        self.simulador = simulador if simulador is not None else SateliteSimulado()
+        self.velocidad = velocidad
+        self._loop = None
+        self._t_inicio = None
+        self._ms_inicio = None
+
+    async def abrir(self):
+        self._loop = asyncio.get_running_loop()
+        self._t_inicio = self._loop.time()
+        self._ms_inicio = self.simulador.ahora
+
+    def _ms_actual(self):
+        return self._ms_inicio + (self._loop.time() - self._t_inicio) * 1000.0 * self.velocidad
+
+    async def leer(self):
+        sim = self.simulador
+        while True:
+            if self.velocidad:
+                sim.avanzar(self._ms_actual())
+            else:
+                sim.avanzar(sim.proximo_evento())
+            datos = sim.leer_salida()
+            if datos:
+                return datos
+            if self.velocidad:
+                espera = (sim.proximo_evento() - self._ms_actual()) / (1000.0 * self.velocidad)
+                await asyncio.sleep(max(0.0, espera))
+            else:
+                await asyncio.sleep(0)
+
+    async def escribir(self, datos):
+        self.simulador.recibir(datos)
+
+    def cerrar(self):
+        pass
@@ -0,0 +1,389 @@
+"""
+Supervisor de varias estaciones de Tierra (una por puerto) en procesos separados.
+
+Cada puerto configurado tiene su propio proceso con su EstacionTierra
+(transporte, decodificador, estadísticas...). Así un enlace lento o
+bloqueado no frena a los demás y la decodificación se reparte entre núcleos.
+Los procesos mandan al supervisor sus eventos en lotes por una cola
+compartida:
+
+    ("muestra_TH", (t_unix, temp, hum, media))
+    ("radar", (t, angulo_servo, distancia))
+    ("mensaje", (texto,))   ("alerta", (regla, estado, texto))   (alertas.py)
+    ("trama", (t, datos, payload))       solo si se graba
+    ("enlace", (resumen, lotes_descartados))   cada segundo
+    ("fin", (motivo,))
+
+La cola de eventos está acotada: si el supervisor no da abasto, cada
+estación descarta lotes (y los cuenta) en lugar de bloquear su recepción.
+El supervisor junta todo en un único panel de texto y en una única
+grabación (grabacion.py, con el índice de la estación en cada registro).
+Los registros de log de las estaciones llegan por otra cola al log del
+supervisor. Uso:
+
+    python supervisor.py COM3 COM4 --grabar pases.tlm --periodo 2000
+    python supervisor.py simulador simulador --intervalo 5
+"""
+
+import argparse
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import signal
+import sys
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+import protocolo
+import registro
+from grabacion import GrabadorTelemetria
+
+TAM_COLA_EVENTOS = 1024    # lotes en la cola compartida
+PERIODO_LOTE = 0.1         # s entre envíos de lotes desde cada estación
+PERIODO_ENLACE = 1.0       # s entre envíos de los contadores del enlace
+MAX_MENSAJES = 5           # últimos mensajes de texto que guarda cada estación
+
+
+# =====================================================
+# PROCESO DE CADA ESTACIÓN
+# =====================================================
+class _EnvioLotes:
+    """Junta los eventos de la estación y los manda al supervisor de PERIODO_LOTE en PERIODO_LOTE s."""
+
+    def __init__(self, indice, cola):
+        self.indice = indice
+        self.cola = cola
+        self.descartados = 0
+        self._lote = []
+        self._lock = threading.Lock()
+
+    def agregar(self, evento, args):
+        with self._lock:
+            self._lote.append((evento, args))
+
+    def enviar(self, bloquear=False):
+        with self._lock:
+            lote, self._lote = self._lote, []
+        if not lote:
+            return
+        try:
+            self.cola.put((self.indice, lote), block=bloquear, timeout=1.0 if bloquear else None)
+        except queue.Full:
+            self.descartados += 1
+
+
+class _FiltroEstacion(logging.Filter):
+    """Antepone el nombre de la estación a sus mensajes de log."""
+
+    def __init__(self, nombre):
+        super().__init__()
+        self.nombre = nombre
+
+    def filter(self, record):
+        record.msg = f"[{self.nombre}] {record.getMessage()}"
+        record.args = None
+        record.exc_info = None   # las trazas no siempre se pueden pasar entre procesos
+        return True
+
+
+def _estacion(indice, puerto, opciones, eventos, comandos, registros, parar):
+    """Punto de entrada del proceso de una estación."""
+    # Ctrl+C llega a todos los procesos; es el supervisor quien decide cuándo parar
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    if opciones["silencioso"]:
+        sys.stdout = open(os.devnull, "w")
+    raiz = logging.getLogger()
+    raiz.handlers[:] = []
+    manejador = registro.ManejadorCola(registros)
+    manejador.addFilter(_FiltroEstacion(puerto))
+    raiz.addHandler(manejador)
+    raiz.setLevel(opciones["nivel_log"])
+
+    # Importados aquí: con "spawn" cada proceso carga su propia copia
+    from nucleo import EstacionTierra
+    from transporte import TransporteAsync, crear_backend
+
+    estacion = EstacionTierra(TransporteAsync(crear_backend(puerto, opciones["baudios"])),
+                              checksum_comandos=opciones["checksum"],
+                              exigir_checksum=opciones["exigir_checksum"])
+    envio = _EnvioLotes(indice, eventos)
+
+    def muestra_TH(t_rel, temp, hum, media):
+        t0 = estacion.t0_TH or time.time()
+        envio.agregar("muestra_TH", (t0 + t_rel, temp, hum, media))
+
+    estacion.suscribir("muestra_TH", muestra_TH)
+    estacion.suscribir("radar", lambda *args: envio.agregar("radar", args))
+    estacion.suscribir("mensaje", lambda *args: envio.agregar("mensaje", args))
+    estacion.suscribir("alerta", lambda a: envio.agregar("alerta", (a.regla, a.estado, a.texto)))
+    if opciones["grabar"]:
+        estacion.suscribir("trama", lambda t, datos, trama: envio.agregar(
+            "trama", (t, datos, trama.datos if trama is not None else None)))
+
+    if not estacion.iniciar_recepcion():
+        envio.agregar("fin", (f"no se pudo abrir {puerto}",))
+        envio.enviar(bloquear=True)
+        return
+    logging.info("Estación %d arrancada en %s (pid %d)", indice, puerto, os.getpid())
+    servidor_metricas = None
+    if opciones["puerto_metricas"] is not None:
+        from metricas import ServidorMetricas
+        servidor_metricas = ServidorMetricas(estacion.metricas, opciones["puerto_metricas"] + indice).iniciar()
+
+    for comando in opciones["comandos"]:
+        estacion.enviar(comando)
+
+    motivo = "detenida"
+    t_enlace = time.monotonic()
+    try:
+        while not parar.is_set():
+            if not estacion.recibiendo:
+                motivo = "enlace cerrado"
+                break
+            try:
+                estacion.enviar(comandos.get(timeout=PERIODO_LOTE))
+            except queue.Empty:
+                pass
+            if time.monotonic() - t_enlace >= PERIODO_ENLACE:
+                t_enlace = time.monotonic()
+                envio.agregar("enlace", (estacion.decodificador.contadores.resumen(), envio.descartados))
+            envio.enviar()
+    finally:
+        estacion.cerrar()
+        if servidor_metricas is not None:
+            servidor_metricas.detener()
+        logging.info("Enlace: %s", estacion.decodificador.contadores.resumen())
+        envio.agregar("enlace", (estacion.decodificador.contadores.resumen(), envio.descartados))
+        envio.agregar("fin", (motivo,))
+        envio.enviar(bloquear=True)
+
+
+# =====================================================
+# ESTADO AGREGADO
+# =====================================================
+class EstadoEstacion:
+    """Último estado conocido de una estación, tal como lo ve el supervisor."""
+
+    def __init__(self, indice, puerto):
+        self.indice = indice
+        self.puerto = puerto
+        self.activa = True
+        self.motivo = ""
+        self.temp = self.hum = self.media = np.nan
+        self.t_ultima = None
+        self.muestras_TH = 0
+        self.ecos_radar = 0
+        self.distancia = np.nan
+        self.alarmas = 0                 # alertas activadas
+        self.alertas = {}                # regla -> texto de las activas
+        self.tramas = 0
+        self.mensajes = deque(maxlen=MAX_MENSAJES)
+        self.enlace = {}
+        self.lotes_descartados = 0
+
+    def aplicar(self, evento, args):
+        if evento == "muestra_TH":
+            self.t_ultima, self.temp, self.hum, self.media = args
+            self.muestras_TH += 1
+        elif evento == "radar":
+            self.t_ultima, _, self.distancia = args
+            self.ecos_radar += 1
+        elif evento == "mensaje":
+            self.mensajes.append(args[0])
+        elif evento == "alerta":
+            regla, estado, texto = args
+            if estado == "activa":
+                self.alarmas += 1
+                self.alertas[regla] = texto
+            else:
+                self.alertas.pop(regla, None)
+        elif evento == "trama":
+            self.tramas += 1
+        elif evento == "enlace":
+            self.enlace, self.lotes_descartados = args
+        elif evento == "fin":
+            self.activa = False
+            self.motivo = args[0]
+
+    @property
+    def calidad(self):
+        """Tramas buenas / recibidas de todos los grupos (None si aún no hay)."""
+        buenas = sum(g["buenas"] for g in self.enlace.values())
+        recibidas = buenas + sum(g["malas"] for g in self.enlace.values())
+        return buenas / recibidas if recibidas else None
+
+
+# =====================================================
+# SUPERVISOR
+# =====================================================
+class Supervisor:
+    """
+    Arranca un proceso por puerto y junta sus eventos. procesar() se llama
+    periódicamente desde el proceso principal (no crea hilos propios salvo
+    el que pasa los logs de las estaciones al log del supervisor).
+    """
+
+    def __init__(self, puertos, baudios=9600, grabar=None, checksum=None,
+                 exigir_checksum=False, comandos=(), silencioso=True, tam_cola=TAM_COLA_EVENTOS,
+                 puerto_metricas=None):
+        if len(puertos) > 255:
+            raise ValueError("Como mucho 255 estaciones (el índice se graba en un byte)")
+        self._ctx = multiprocessing.get_context("spawn")
+        self.estados = [EstadoEstacion(i, p) for i, p in enumerate(puertos)]
+        self._opciones = {
+            "baudios": baudios,
+            "checksum": checksum,
+            "exigir_checksum": exigir_checksum,
+            "comandos": list(comandos),
+            "silencioso": silencioso,
+            "grabar": grabar is not None,
+            "puerto_metricas": puerto_metricas,
+            "nivel_log": logging.getLogger().level,
+        }
+        self._eventos = self._ctx.Queue(tam_cola)
+        self._registros = self._ctx.Queue(-1)
+        self._parar = self._ctx.Event()
+        self._comandos = [self._ctx.Queue() for _ in puertos]
+        self._procesos = []
+        self._oyente_log = None
+        self.grabador = GrabadorTelemetria(grabar) if grabar else None
+
+    def iniciar(self):
+        # Los logs de las estaciones van a los manejadores ya configurados en este proceso
+        self._oyente_log = logging.handlers.QueueListener(
+            self._registros, *logging.getLogger().handlers, respect_handler_level=True)
+        self._oyente_log.start()
+        for estado, comandos in zip(self.estados, self._comandos):
+            proceso = self._ctx.Process(
+                target=_estacion, name=f"estacion-{estado.indice}", daemon=True,
+                args=(estado.indice, estado.puerto, self._opciones, self._eventos,
+                      comandos, self._registros, self._parar))
+            proceso.start()
+            self._procesos.append(proceso)
+        logging.info("Supervisor: %d estaciones arrancadas", len(self._procesos))
+
+    def enviar(self, comando, indice=None):
+        """Manda un comando a una estación (o a todas con indice=None)."""
+        colas = self._comandos if indice is None else [self._comandos[indice]]
+        for cola in colas:
+            cola.put(comando)
+
+    def procesar(self, espera=0.1):
+        """Aplica los lotes recibidos (espera hasta `espera` s al primero). Devuelve cuántos eventos."""
+        total = 0
+        bloquear = True
+        while True:
+            try:
+                indice, lote = self._eventos.get(block=bloquear, timeout=espera if bloquear else None)
+            except queue.Empty:
+                break
+            bloquear = False
+            estado = self.estados[indice]
+            for evento, args in lote:
+                estado.aplicar(evento, args)
+                if evento == "trama" and self.grabador is not None:
+                    t, datos, payload = args
+                    trama = protocolo.decodificar(payload) if payload is not None else None
+                    self.grabador.agregar(t, datos, trama, estacion=indice)
+            total += len(lote)
+        # Un proceso que muere sin avisar (p. ej. por una excepción) también cuenta como parado
+        for estado, proceso in zip(self.estados, self._procesos):
+            if estado.activa and not proceso.is_alive() and self._eventos.empty():
+                estado.activa = False
+                estado.motivo = f"proceso terminado (código {proceso.exitcode})"
+        return total
+
+    @property
+    def activas(self):
+        return sum(estado.activa for estado in self.estados)
+
+    def detener(self, espera=5.0):
+        self._parar.set()
+        limite = time.monotonic() + espera
+        while self.activas and time.monotonic() < limite:
+            self.procesar(0.1)
+        for proceso in self._procesos:
+            proceso.join(max(0.0, limite - time.monotonic()))
+            if proceso.is_alive():
+                proceso.terminate()
+        if self.grabador is not None:
+            self.grabador.cerrar()
+        if self._oyente_log is not None:
+            self._oyente_log.stop()
+
+    def panel(self):
+        """Texto con una fila por estación (el panel que imprime main())."""
+        filas = [f"{'#':>2} {'puerto':<22} {'estado':<8} {'T °C':>7} {'H %':>7} {'media':>7} "
+                 f"{'T/H':>6} {'radar':>6} {'dist':>6} {'alar.':>5} {'calidad':>7} {'desc.':>5}"]
+        for e in self.estados:
+            calidad = f"{e.calidad:.1%}" if e.calidad is not None else "-"
+            filas.append(f"{e.indice:>2} {e.puerto[:22]:<22} {'activa' if e.activa else 'parada':<8} "
+                         f"{e.temp:>7.2f} {e.hum:>7.2f} {e.media:>7.2f} {e.muestras_TH:>6} "
+                         f"{e.ecos_radar:>6} {e.distancia:>6.0f} {e.alarmas:>5} {calidad:>7} "
+                         f"{e.lotes_descartados:>5}")
+            if e.alertas:
+                filas.append(f"   alertas: {'; '.join(e.alertas.values())}")
+            if e.mensajes:
+                filas.append(f"   último mensaje: {e.mensajes[-1]}")
+            if not e.activa and e.motivo:
+                filas.append(f"   {e.motivo}")
+        return "\n".join(filas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Supervisor de varias estaciones de Tierra")
+    parser.add_argument("puertos", nargs="+",
+                        help='puertos de las estaciones (COM3, /dev/ttyUSB0, "simulador", '
+                             '"grabacion:<ruta>[@velocidad][#estacion]"...)')
+    parser.add_argument("--baudios", type=int, default=9600)
+    parser.add_argument("--grabar", default=None,
+                        help="graba las tramas de todas las estaciones en este archivo (grabacion.py)")
+    parser.add_argument("--checksum", choices=("suma", "crc16"), default=None,
+                        help="añade checksum a los comandos (*HH suma, como el firmware, o *HHHH CRC-16)")
+    parser.add_argument("--exigir-checksum", action="store_true",
+                        help="descarta las tramas recibidas sin checksum")
+    parser.add_argument("--periodo", type=int, default=None,
+                        help="si se indica, pide a todos los satélites iniciar el envío de T/H con este periodo (ms)")
+    parser.add_argument("--metricas-puerto", type=int, default=None,
+                        help="la estación i sirve sus métricas (metricas.py) en este puerto + i")
+    parser.add_argument("--intervalo", type=float, default=2.0, help="segundos entre refrescos del panel")
+    parser.add_argument("--verboso", action="store_true",
+                        help="deja que las estaciones escriban por la consola")
+    parser.add_argument("--log", default="supervisor.log", help="archivo de registro")
+    args = parser.parse_args(argv)
+
+    registro.configurar_registro(args.log)
+    # Como servicio se para con SIGTERM: se cierra igual que con Ctrl+C
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    comandos = []
+    if args.periodo is not None:
+        comandos = [protocolo.comando_iniciar(), protocolo.comando_periodo(args.periodo)]
+
+    supervisor = Supervisor(args.puertos, args.baudios, grabar=args.grabar,
+                            checksum=args.checksum, exigir_checksum=args.exigir_checksum,
+                            comandos=comandos, silencioso=not args.verboso,
+                            puerto_metricas=args.metricas_puerto)
+    supervisor.iniciar()
+    print(f"Supervisando {len(args.puertos)} estaciones. Ctrl+C para salir.")
+    t_panel = time.monotonic()
+    try:
+        while supervisor.activas:
+            supervisor.procesar(0.2)
+            if time.monotonic() - t_panel >= args.intervalo:
+                t_panel = time.monotonic()
+                print(supervisor.panel(), end="\n\n", flush=True)
+    except KeyboardInterrupt:
+        print("Deteniendo las estaciones.")
+    finally:
+        supervisor.detener()
+        print(supervisor.panel())
+        logging.info("Supervisor detenido.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Pruebas de la cola de comandos con confirmación (comandos.py) contra el satélite simulado."""
+
+import threading
+import time
+
+import protocolo
+from comandos import CONFIRMADO, ENVIADO, RECHAZADO, PlanificadorComandos
+from simulador import SateliteSimulado
+
+
+def conectar(respuestas, **opciones):
+    """Planificador cuyos comandos llegan a un SateliteSimulado y cuyas respuestas vuelven al planificador."""
+    satelite = SateliteSimulado(respuestas=respuestas, semilla=0)
+    satelite.leer_salida()
+    separador = protocolo.SeparadorTramas()
+    resultados = []
+    terminados = threading.Condition()
+
+    def transmitir(datos):
+        satelite.recibir(datos)
+        for trama in separador.agregar(satelite.leer_salida()):
+            trama = protocolo.decodificar(trama)
+            if trama.partes[1] == b"0":
+                planificador.recibir_texto(protocolo.texto_mensaje(trama))
+            elif trama.partes[1:3] == [b"2", b"0"]:
+                planificador.recibir_servo(float(trama.partes[3]))
+            elif trama.partes[1:3] == [b"2", b"-1"]:
+                planificador.recibir_servo(None)
+
+    def al_resultado(comando, estado):
+        with terminados:
+            resultados.append((comando, estado))
+            terminados.notify_all()
+
+    planificador = PlanificadorComandos(transmitir, al_resultado, **opciones)
+
+    def esperar(n, limite=5.0):
+        with terminados:
+            assert terminados.wait_for(lambda: len(resultados) >= n, limite)
+        return resultados
+
+    return satelite, planificador, esperar
+
+
+def test_comandos_confirmados_por_el_satelite():
+    satelite, planificador, esperar = conectar(True)
+    planificador.encolar(protocolo.comando_periodo(1000))
+    planificador.encolar(protocolo.comando_angulo(30))
+    assert [estado for _, estado in esperar(2)] == [CONFIRMADO, CONFIRMADO]
+    assert (satelite.periodo_TH, satelite.angulo_objetivo) == (1000, 120)
+    planificador.encolar(protocolo.comando_angulo(100))
+    assert esperar(3)[2][1] == RECHAZADO
+    assert planificador.reenvios == 0
+    planificador.detener()
+
+
+def test_firmware_sin_respuestas_no_bloquea_la_cola():
+    satelite, planificador, esperar = conectar(False, espera_inicial=0.2)
+    t_ini = time.monotonic()
+    planificador.encolar(protocolo.comando_periodo(1000))
+    planificador.encolar(protocolo.comando_periodo_global(2000))
+    planificador.encolar(protocolo.comando_angulo(30))
+    assert [estado for _, estado in esperar(3)] == [ENVIADO] * 3
+    # Solo el primero espera respuesta, una vez y sin reenvíos
+    assert time.monotonic() - t_ini < 1.0
+    assert planificador.transmisiones == 3 and planificador.reenvios == 0
+    assert planificador.responde is False
+    assert (satelite.periodo_TH, satelite.periodo_global) == (1000, 2000)
+
+    # Si el satélite contesta alguna vez, se vuelve a esperar la confirmación
+    satelite.respuestas = True
+    planificador.encolar(protocolo.comando_periodo(2000))
+    planificador.encolar(protocolo.comando_angulo(45))
+    assert [estado for _, estado in esperar(5)][3:] == [ENVIADO, CONFIRMADO]
+    assert planificador.responde is True
+    planificador.detener()
@@ -0,0 +1,97 @@
+"""
+Pruebas del ajuste automático de periodos (control_enlace.py) con el
+satélite simulado y un enlace de capacidad limitada, en tiempo simulado.
+"""
+
+import logging
+import re
+
+import protocolo
+from control_enlace import PERIODO_MIN, ControlEnlace
+from simulador import SateliteSimulado
+
+CAPACIDAD = 50       # bytes/s: con periodo 500 ms se pierde mucho más del 5 %
+SEGUNDOS = 1800
+PERIODO_INICIAL = 5000
+
+
+def simular(capacidad=CAPACIDAD, segundos=SEGUNDOS, paso_ms=100):
+    """Satélite y ControlEnlace en tiempo simulado. Devuelve (control, satélite, comandos enviados)."""
+    sim = SateliteSimulado(periodo_TH=PERIODO_INICIAL, periodo_global=PERIODO_INICIAL,
+                           capacidad_enlace=capacidad, semilla=3)
+    # El decodificador (sin manejadores) solo cuenta las tramas buenas y dañadas
+    decodificador = protocolo.Decodificador(al_desconocida=lambda trama: None,
+                                            al_no_protocolo=lambda datos: None,
+                                            al_invalida=lambda datos: None)
+    contadores = decodificador.contadores
+    separador = protocolo.SeparadorTramas()
+    separador.al_resincronizar = lambda datos: contadores.resincronizada(protocolo.grupo_crudo(datos))
+    comandos = []
+
+    def enviar(comando):
+        comandos.append(comando)
+        sim.recibir(comando)
+
+    control = ControlEnlace(enviar, contadores, periodo_global=PERIODO_INICIAL,
+                            periodo_TH=PERIODO_INICIAL, activo=True)
+    while sim.ahora < segundos * 1000:
+        sim.avanzar(sim.ahora + paso_ms)
+        t = sim.ahora / 1000.0
+        for datos in separador.agregar(sim.leer_salida()):
+            datos = protocolo.limpiar(datos)
+            if datos:
+                decodificador.procesar(datos)
+                control.registrar_trama(t, datos)
+    return control, sim, comandos
+
+
+def test_converge_con_enlace_limitado(caplog):
+    with caplog.at_level(logging.INFO):
+        control, sim, comandos = simular()
+    final = [(periodo, perdida) for t, perdida, _, periodo, _ in control.historial
+             if t >= 2 * SEGUNDOS / 3]
+    assert final
+    periodos = [periodo for periodo, _ in final]
+    perdidas = [perdida for _, perdida in final]
+
+    # periodo_global baja del inicial y se queda en una banda acotada, sin llegar al mínimo
+    assert PERIODO_MIN < min(periodos) and max(periodos) < PERIODO_INICIAL
+    # Diente de sierra de AIMD: el máximo de la banda no llega al doble del mínimo
+    assert max(periodos) < 2 * min(periodos)
+    # El satélite tiene el periodo que cree el control
+    assert sim.periodo_global == control.periodo_global
+
+    # Pérdida de las ventanas del último tercio dentro del objetivo
+    assert sum(perdidas) / len(perdidas) <= control.perdida_objetivo
+
+    # Cada ajuste queda en el log y cada comando enviado aparece en él, en orden
+    registros = [r for r in caplog.records
+                 if r.levelno == logging.INFO and r.getMessage().startswith("Control de enlace")]
+    assert control.ajustes > 0
+    assert len(registros) == control.ajustes
+    en_log = []
+    for registro in registros:
+        mensaje = registro.getMessage()
+        m = re.search(r"periodo_global \d+ -> (\d+) ms", mensaje)
+        if m:
+            en_log.append(protocolo.comando_periodo_global(int(m.group(1))))
+        m = re.search(r"\bperiodo \d+ -> (\d+) ms", mensaje)
+        if m:
+            en_log.append(protocolo.comando_periodo(int(m.group(1))))
+    assert en_log == comandos
+
+
+def test_periodo_minimo_fijo_satura_el_enlace():
+    # Referencia: sin control, con el periodo mínimo se pierde más del doble del objetivo
+    sim = SateliteSimulado(periodo_TH=PERIODO_MIN, periodo_global=PERIODO_MIN,
+                           capacidad_enlace=CAPACIDAD, semilla=3)
+    sim.avanzar(600 * 1000)
+    assert sim.perdidas / sim.enviadas > 2 * ControlEnlace(None).perdida_objetivo
+
+
+def test_inactivo_no_envia_nada():
+    comandos = []
+    control = ControlEnlace(comandos.append, activo=False)
+    for i in range(1000):
+        control.registrar_trama(i * 0.6, b"16:3:0:90:12.5")
+    assert comandos == [] and control.ajustes == 0
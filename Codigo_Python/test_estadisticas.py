@@ -0,0 +1,176 @@
+"""
+Pruebas de EstadisticaMovil frente al cálculo con listas que había antes.
+
+La referencia reproduce el código original de Python.py: la media de
+temperaturas[-10:] (NaN si falta algún valor) y la alerta cuando las tres
+últimas medias_10[-3:] son válidas y superan el límite.
+"""
+
+import math
+import random
+
+import numpy as np
+import pytest
+
+from alertas import ACTIVA, Regla
+from estadisticas import EstadisticaMovil, ExtremosVentanaTiempo
+
+LIMITE = 25.0
+N_MEDIAS = 3
+
+
+# ==========================================
+# REFERENCIA CON LISTAS (código original)
+# ==========================================
+class ReferenciaListas:
+    """Media de las últimas `ventana` temperaturas y alerta de N_MEDIAS medias, con listas."""
+
+    def __init__(self, ventana):
+        self.ventana = ventana
+        self.temperaturas = []
+        self.medias_10 = []
+
+    def error_TH(self, recepcion_activa=True):
+        """16:1:-1|: hueco sin media y sin evaluar la alerta."""
+        self.temperaturas.append(np.nan if recepcion_activa else None)
+        while len(self.medias_10) < len(self.temperaturas):
+            self.medias_10.append(np.nan)
+        return self.medias_10[-1]
+
+    def paquete(self, temp, recepcion_activa=True):
+        """16:1:03|: devuelve (media, alerta)."""
+        self.temperaturas.append(temp if recepcion_activa else None)
+        while len(self.medias_10) < len(self.temperaturas):
+            self.medias_10.append(np.nan)
+        if len(self.temperaturas) >= self.ventana:
+            ultimos = [t for t in self.temperaturas[-self.ventana:] if t is not None]
+            if len(ultimos) == self.ventana:
+                self.medias_10[-1] = sum(ultimos) / self.ventana
+        alerta = False
+        if len(self.medias_10) >= N_MEDIAS:
+            ultimas_3 = self.medias_10[-N_MEDIAS:]
+            alerta = all((m is not None) and not np.isnan(m) and m > LIMITE for m in ultimas_3)
+        return self.medias_10[-1], alerta
+
+
+def secuencia(rng, n, p_error=0.05, p_pausa=0.03):
+    """Eventos ("error" | "pausa" | "dato", temperatura) alrededor del límite."""
+    eventos = []
+    for _ in range(n):
+        r = rng.random()
+        if r < p_error:
+            eventos.append(("error", None))
+        elif r < p_error + p_pausa:
+            eventos.append(("pausa", rng.uniform(20.0, 30.0)))
+        else:
+            eventos.append(("dato", rng.uniform(20.0, 30.0)))
+    return eventos
+
+
+def mismas_medias(a, b):
+    if math.isnan(a) or math.isnan(b):
+        return math.isnan(a) and math.isnan(b)
+    return a == pytest.approx(b, rel=1e-9, abs=1e-9)
+
+
+# ==========================================
+# MEDIA MÓVIL Y ALERTA
+# ==========================================
+@pytest.mark.parametrize("semilla", range(8))
+@pytest.mark.parametrize("ventana", [1, 3, 10])
+def test_media_y_alerta_como_con_listas(semilla, ventana):
+    rng = random.Random(semilla)
+    referencia = ReferenciaListas(ventana)
+    estadistica = EstadisticaMovil(ventana)
+    # Como en nucleo.py, sin histéresis ni enfriamiento para comparar muestra a muestra
+    regla = Regla("temperatura_media", LIMITE, consecutivas=N_MEDIAS, histeresis=0.0, enfriamiento=0.0)
+
+    for paso, (tipo, temp) in enumerate(secuencia(rng, 2000)):
+        if tipo == "error":
+            media_ref = referencia.error_TH()
+            media = estadistica.agregar(np.nan)
+            regla.evaluar(media, paso)
+            assert mismas_medias(media, media_ref), paso
+            continue
+
+        activa = tipo == "dato"
+        media_ref, alerta_ref = referencia.paquete(temp, activa)
+        media = estadistica.agregar(temp if activa else np.nan)
+        assert mismas_medias(media, media_ref), paso
+
+        estaba_activa = regla.activa
+        estado = regla.evaluar(media, paso)
+        # La alerta se notifica una vez, cuando la condición de antes pasa a cumplirse...
+        assert (estado == ACTIVA) == (alerta_ref and not estaba_activa), paso
+        # ...y sigue activa mientras la condición de antes se cumpla
+        if alerta_ref:
+            assert regla.activa, paso
+        # Sin histéresis, una media válida por debajo del límite la resuelve
+        if not math.isnan(media) and media <= LIMITE:
+            assert not regla.activa, paso
+
+
+def test_ventana_llena_al_renovarse():
+    estadistica = EstadisticaMovil(10)
+    for i in range(9):
+        assert math.isnan(estadistica.agregar(float(i)))
+    assert estadistica.agregar(9.0) == pytest.approx(4.5)
+    # Al entrar cada valor sale el más antiguo
+    assert estadistica.agregar(10.0) == pytest.approx(5.5)
+    assert len(estadistica) == 10
+
+
+def test_hueco_invalida_la_media_hasta_que_sale():
+    estadistica = EstadisticaMovil(4)
+    for v in (1.0, 2.0, None, 4.0):
+        estadistica.agregar(v)
+    assert math.isnan(estadistica.media)
+    for v in (5.0, 6.0):
+        estadistica.agregar(v)
+        assert math.isnan(estadistica.media)
+    # El None ya ha salido de la ventana (4.0, 5.0, 6.0, 7.0)
+    assert estadistica.agregar(7.0) == pytest.approx(5.5)
+
+
+@pytest.mark.parametrize("semilla", range(4))
+def test_varianza_minimo_y_maximo(semilla):
+    rng = random.Random(semilla)
+    ventana = 10
+    estadistica = EstadisticaMovil(ventana)
+    valores = []
+    for _ in range(1000):
+        v = math.nan if rng.random() < 0.1 else rng.uniform(-5.0, 40.0)
+        valores.append(v)
+        estadistica.agregar(v)
+        ultimos = np.array(valores[-ventana:])
+        validos = ultimos[~np.isnan(ultimos)]
+        if len(validos):
+            assert estadistica.minimo == validos.min()
+            assert estadistica.maximo == validos.max()
+        if len(validos) >= 2:
+            assert estadistica.varianza == pytest.approx(validos.var(ddof=1), rel=1e-6, abs=1e-9)
+        else:
+            assert math.isnan(estadistica.varianza)
+
+
+def test_ventana_no_positiva():
+    with pytest.raises(ValueError):
+        EstadisticaMovil(0)
+
+
+# ==========================================
+# EXTREMOS EN UNA VENTANA DE TIEMPO
+# ==========================================
+def test_extremos_ventana_tiempo():
+    rng = random.Random(1)
+    extremos = ExtremosVentanaTiempo(5.0)
+    puntos = []
+    t = 0.0
+    for _ in range(500):
+        t += rng.uniform(0.1, 1.0)
+        d = rng.uniform(0.0, 400.0)
+        puntos.append((t, d))
+        extremos.agregar(t, d)
+        recientes = [v for (ti, v) in puntos if t - ti <= 5.0]
+        assert extremos.maximo == max(recientes)
+        assert extremos.minimo == min(recientes)
@@ -0,0 +1,36 @@
+"""Pruebas de la exportación de la telemetría por bloques (exportacion.py)."""
+
+import os
+import time
+
+import numpy as np
+
+from exportacion import ExportadorTelemetria, leer_ventana
+
+T0 = 1_700_000_000.0
+
+
+def test_bloque_lleno_se_escribe(tmp_path):
+    exportador = ExportadorTelemetria(str(tmp_path), formato="npz", tam_bloque=4, intervalo=60.0)
+    for i in range(10):
+        exportador.agregar("TH", (T0 + i, 20.0 + i, 50.0, np.nan))
+    exportador.volcar()
+    assert len(os.listdir(tmp_path / "TH")) == 3   # dos llenos y el resto al volcar
+    datos = leer_ventana(str(tmp_path), "TH")
+    assert np.array_equal(datos["tiempo"], T0 + np.arange(10))
+    exportador.cerrar()
+
+
+def test_bloque_a_medias_se_escribe_sin_muestras_nuevas(tmp_path):
+    exportador = ExportadorTelemetria(str(tmp_path), formato="npz", intervalo=0.2)
+    for i in range(3):
+        exportador.agregar("radar", (T0 + 0.6 * i, 10.0 * i, 150.0))
+    # No llega nada más ni se llama a volcar(): el hilo escritor lo escribe al pasar el intervalo
+    limite = time.monotonic() + 5.0
+    while not exportador.archivos and time.monotonic() < limite:
+        time.sleep(0.05)
+    assert exportador.archivos == 1
+    datos = leer_ventana(str(tmp_path), "radar")
+    assert np.array_equal(datos["angulo"], [0.0, 10.0, 20.0])
+    assert not os.listdir(tmp_path / "TH")
+    exportador.cerrar()
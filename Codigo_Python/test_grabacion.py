@@ -0,0 +1,113 @@
+"""Pruebas de la grabación de telemetría y de su reproducción (grabacion.py)."""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import protocolo
+from grabacion import CABECERA, BackendGrabacion, GrabadorTelemetria, LectorGrabacion
+from nucleo import EstacionTierra
+from transporte import TransporteAsync
+
+T0 = 1_700_000_000.0
+PERIODO_TH = 5.0
+
+
+def grabar_pase(ruta, n_paquetes=20):
+    """Grabación sintética: un paquete T/H cada PERIODO_TH s y un punto del radar cada 0.6 s."""
+    grabador = GrabadorTelemetria(str(ruta))
+    eventos = []
+    for i in range(n_paquetes):
+        t = T0 + i * PERIODO_TH
+        for codigo, valor in ((b"01", 20.0 + i), (b"02", 50.0), (b"03", 20.0)):
+            eventos.append((t, b"16:1:" + codigo + b":" + str(valor).encode()))
+    for k in range(int(n_paquetes * PERIODO_TH / 0.6)):
+        eventos.append((T0 + k * 0.6 + 0.1, b"16:3:0:90:" + str(10.0 + k % 7).encode()))
+    for t, datos in sorted(eventos):
+        grabador.agregar(t, datos, protocolo.decodificar(datos))
+    return grabador
+
+
+def reproducir(ruta, velocidad):
+    """Reproduce la grabación en una estación y devuelve (muestras T/H, puntos del radar)."""
+    estacion = EstacionTierra(TransporteAsync(BackendGrabacion(str(ruta), velocidad)))
+    muestras, radar = [], []
+    estacion.suscribir("muestra_TH", lambda t, temp, hum, media: muestras.append((t, temp)))
+    estacion.suscribir("radar", lambda t, angulo, d: radar.append(t))
+    fin = threading.Event()
+    estacion.transporte.al_cerrar = lambda: (estacion.detener_recepcion(), fin.set())
+    estacion.iniciar_recepcion()
+    assert fin.wait(10.0)
+    estacion.cerrar()
+    return estacion, muestras, radar
+
+
+def test_reproduccion_sin_esperas_conserva_los_tiempos(tmp_path):
+    ruta = tmp_path / "pase.tlm"
+    grabar_pase(ruta).cerrar()
+    estacion, muestras, radar = reproducir(ruta, 0)
+
+    assert len(muestras) == 20
+    tiempos = np.array([t for t, _ in muestras])
+    # Tiempos relativos desde la primera trama grabada, a PERIODO_TH s, aunque se reproduzca sin esperas
+    assert estacion.t0_TH == T0
+    assert np.allclose(tiempos, np.arange(20) * PERIODO_TH)
+    assert [temp for _, temp in muestras] == [20.0 + i for i in range(20)]
+    # Los puntos del radar llevan el instante (unix) grabado
+    assert np.allclose(np.diff(radar), 0.6)
+    assert radar[0] == T0 + 0.1
+
+
+def test_regrabar_una_reproduccion_da_la_misma_grabacion(tmp_path):
+    original = tmp_path / "pase.tlm"
+    copia = tmp_path / "copia.tlm"
+    grabar_pase(original).cerrar()
+    estacion = EstacionTierra(TransporteAsync(BackendGrabacion(str(original), 0)))
+    grabador = GrabadorTelemetria(str(copia), estacion)
+    fin = threading.Event()
+    estacion.transporte.al_cerrar = lambda: (estacion.detener_recepcion(), fin.set())
+    estacion.iniciar_recepcion()
+    assert fin.wait(10.0)
+    estacion.cerrar()
+    grabador.cerrar()
+
+    a, b = LectorGrabacion(str(original)), LectorGrabacion(str(copia))
+    assert np.array_equal(a.registros["tiempo"], b.registros["tiempo"])
+    a.cerrar()
+    b.cerrar()
+
+
+def test_grabacion_sin_cerrar_se_puede_leer(tmp_path):
+    ruta = tmp_path / "pase.tlm"
+    grabador = GrabadorTelemetria(str(ruta), intervalo_volcado=0.1)
+    # La cabecera está en disco desde el principio: una grabación recién creada ya se lee
+    lector = LectorGrabacion(str(ruta))
+    assert len(lector) == 0
+    lector.cerrar()
+
+    for i in range(10):
+        datos = b"16:1:01:" + str(20.0 + i).encode()
+        grabador.agregar(T0 + i, datos, protocolo.decodificar(datos))
+    grabador.agregar(T0 + 10, b"16:0:Hola", protocolo.decodificar(b"16:0:Hola"))
+    # Sin más tramas ni cerrar(): el hilo de la grabación vuelca el bloque a medias
+    limite = time.monotonic() + 5.0
+    while os.path.getsize(ruta) == CABECERA.size and time.monotonic() < limite:
+        time.sleep(0.05)
+
+    lector = LectorGrabacion(str(ruta))
+    assert len(lector) == 11
+    t, temperaturas = lector.serie(1, "01")
+    assert np.array_equal(temperaturas, 20.0 + np.arange(10))
+    assert list(lector.mensajes()) == [(T0 + 10, "Hola")]
+    lector.cerrar()
+    grabador.cerrar()
+
+
+def test_archivo_vacio_no_es_una_grabacion(tmp_path):
+    ruta = tmp_path / "vacio.tlm"
+    ruta.write_bytes(b"")
+    with pytest.raises(ValueError):
+        LectorGrabacion(str(ruta))
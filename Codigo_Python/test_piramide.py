@@ -0,0 +1,52 @@
+"""Pruebas de la pirámide mín./máx. (piramide.py)."""
+
+import numpy as np
+
+from buffer_circular import BufferCircular
+from piramide import PiramideMinMax
+
+
+def piramide_con(valores, capacidad=4096):
+    serie = BufferCircular(capacidad, ("temperatura", "humedad", "media"))
+    piramide = PiramideMinMax(serie)
+    for i, v in enumerate(valores):
+        piramide.agregar(float(i), v, -v, np.nan)
+    return piramide
+
+
+def test_envolvente_sigue_el_sentido_de_la_senal():
+    # Temperatura bajando (humedad subiendo), con algún hueco
+    valores = [np.nan if i % 97 == 0 else 100.0 - 0.01 * i for i in range(3000)]
+    piramide = piramide_con(valores)
+    k, visibles = piramide.consultar(0.0, 3000.0, 200)
+    assert k > 0
+    x, y = visibles["temperatura"]
+    assert np.all(np.diff(x) >= 0)
+    assert np.nanmax(np.diff(y)) < 0
+    x, y = visibles["humedad"]
+    assert np.all(np.diff(x) >= 0)
+    assert np.nanmin(np.diff(y)) > 0
+    # Una columna solo de huecos queda en NaN, con tiempos válidos
+    x, y = visibles["media"]
+    assert np.isnan(y).all() and np.isfinite(x).all()
+
+
+def test_envolvente_conserva_extremos_de_cada_cubo():
+    rng = np.random.default_rng(0)
+    valores = rng.normal(20.0, 3.0, 5000)
+    piramide = piramide_con(valores, capacidad=8192)
+    k, visibles = piramide.consultar(0.0, 5000.0, 300)
+    x, y = visibles["temperatura"]
+    # Cada punto es una muestra real, en su instante
+    assert np.array_equal(y, valores[x.astype(int)])
+    assert y.max() == valores[:int(x.max()) + 1].max()
+
+
+def test_vista_del_pasado_sin_cubos_del_presente():
+    piramide = piramide_con([50.0 - 0.01 * i for i in range(3000)])
+    k, visibles = piramide.consultar(0.0, 500.0, 50)
+    assert k > 0
+    x, y = visibles["temperatura"]
+    # Solo cubos que empiezan dentro de la ventana (el último puede acabar algo después)
+    assert x.max() < 600.0
+    assert np.nanmin(y) > 50.0 - 0.01 * 600
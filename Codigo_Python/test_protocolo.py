@@ -0,0 +1,238 @@
+"""Pruebas de las tramas (protocolo.py): checksums, CHKERR:, separación del flujo y tramas binarias."""
+
+import pytest
+
+import protocolo
+from protocolo import CORRECTA, INCORRECTA, SIN_CHECKSUM
+
+
+# =====================================================
+# CHECKSUMS
+# =====================================================
+@pytest.mark.parametrize("payload, esperado", [
+    (b"", 0x00),
+    (b"A", 0x41),
+    (b"16:1:4:1000", sum(b"16:1:4:1000") & 0xFF),
+    (bytes([0xFF, 0x02]), 0x01),          # módulo 256
+])
+def test_suma(payload, esperado):
+    assert protocolo.checksum(payload) == esperado
+
+
+@pytest.mark.parametrize("payload, esperado", [
+    (b"123456789", 0x29B1),               # vector de referencia de CRC-16/CCITT-FALSE
+    (b"", 0xFFFF),
+    (b"A", 0xB915),
+])
+def test_crc16(payload, esperado):
+    assert protocolo.crc16(payload) == esperado
+
+
+@pytest.mark.parametrize("comando, tipo, esperado", [
+    (b"16:1:1|", "suma", b"16:1:1*%02X|" % protocolo.checksum(b"16:1:1")),
+    (b"16:1:1", "suma", b"16:1:1*%02X" % protocolo.checksum(b"16:1:1")),
+    (b"123456789|", "crc16", b"123456789*29B1|"),
+    (b"16:2:1:-5|", "crc16", b"16:2:1:-5*%04X|" % protocolo.crc16(b"16:2:1:-5")),
+])
+def test_con_checksum(comando, tipo, esperado):
+    assert protocolo.con_checksum(comando, tipo) == esperado
+
+
+def test_con_checksum_tipo_desconocido():
+    with pytest.raises(ValueError):
+        protocolo.con_checksum(b"16:1:1|", "md5")
+
+
+# =====================================================
+# VERIFICACIÓN
+# =====================================================
+TRAMAS = [b"16:1:01:23.45", b"16:3:0:90:150.0", b"16:0:Sat\xc3\xa9lite: periodo = 2000 ms",
+          b"16:0:0:Error*BEEF", b"16:0:a*b*c", b""]
+
+
+@pytest.mark.parametrize("tipo", ["suma", "crc16"])
+@pytest.mark.parametrize("payload", TRAMAS)
+def test_ida_y_vuelta(payload, tipo):
+    assert protocolo.verificar(protocolo.con_checksum(payload, tipo)) == (payload, CORRECTA)
+
+
+@pytest.mark.parametrize("tipo", ["suma", "crc16"])
+@pytest.mark.parametrize("payload", TRAMAS[:4])
+def test_trama_danada(payload, tipo):
+    trama = bytearray(protocolo.con_checksum(payload, tipo))
+    trama[3] ^= 0x01                      # un bit cambiado en el payload
+    assert protocolo.verificar(bytes(trama))[1] == INCORRECTA
+
+
+@pytest.mark.parametrize("datos", [
+    b"16:1:01:23.45",                     # sin '*'
+    b"16:0:hola*",                        # '*' sin nada detrás
+    b"16:0:3*4=12",                       # detrás del '*' no hay solo hexadecimal
+    b"16:0:nota*ABC",                     # ni 2 ni 4 caracteres
+    b"16:0:a*b*c",
+])
+def test_sin_checksum(datos):
+    assert protocolo.verificar(datos) == (datos, SIN_CHECKSUM)
+
+
+@pytest.mark.parametrize("datos", [b"16:0:0:Error*BEEF", b"16:0:valor*12"])
+def test_cola_que_no_coincide(datos):
+    # Estricto: parece un checksum y no cuadra; si no, es parte del texto
+    assert protocolo.verificar(datos) == (datos[:datos.rfind(b"*")], INCORRECTA)
+    assert protocolo.verificar(datos, estricto=False) == (datos, SIN_CHECKSUM)
+
+
+# =====================================================
+# DECODIFICADOR
+# =====================================================
+def decodificador(**opciones):
+    invalidas = []
+    dec = protocolo.Decodificador(al_invalida=invalidas.append, **opciones)
+    for grupo in (b"0", b"1", b"2", b"3"):
+        dec.registrar(grupo, None, lambda trama: None)
+    return dec, invalidas
+
+
+def test_texto_con_asterisco_sin_checksums_en_el_enlace():
+    dec, invalidas = decodificador()
+    trama = dec.decodificar(b"16:0:0:Error*BEEF")
+    assert protocolo.texto_mensaje(trama) == "0:Error*BEEF"
+    assert not invalidas
+
+
+def test_texto_con_asterisco_en_enlace_con_checksum():
+    dec, invalidas = decodificador()
+    assert dec.decodificar(protocolo.con_checksum(b"16:1:01:20.5")) is not None
+    assert dec.con_checksum
+    # El firmware añade su checksum detrás de un '*' del texto
+    trama = dec.decodificar(protocolo.con_checksum(b"16:0:0:Error*BEEF"))
+    assert protocolo.texto_mensaje(trama) == "0:Error*BEEF"
+    # Y una cola que no coincide ya es un texto dañado
+    assert dec.decodificar(b"16:0:0:Error*BEEF") is None
+    assert invalidas == [b"16:0:0:Error*BEEF"]
+
+
+def test_trama_de_datos_danada():
+    dec, invalidas = decodificador()
+    datos = b"16:1:01:20.5*00"
+    assert dec.decodificar(datos) is None
+    assert invalidas == [datos]
+    assert dec.contadores.resumen()["1"]["malas"] == 1
+
+
+@pytest.mark.parametrize("datos, grupo", [
+    (b"CHKERR:16:3:0:90:15*3F", "3"),     # aviso de la estación de Tierra
+    (b"CHKERR:16:x7:1", "?"),             # grupo dañado
+    (b"CHKERR:", "?"),
+])
+def test_aviso_chkerr(datos, grupo):
+    dec, invalidas = decodificador()
+    assert dec.decodificar(datos) is None
+    assert invalidas == [datos[len(protocolo.PREFIJO_ERROR):]]
+    assert dec.contadores.resumen() == {grupo: {"buenas": 0, "malas": 1, "resincronizadas": 0,
+                                                "calidad": 0.0}}
+
+
+def test_exigir_checksum():
+    dec, invalidas = decodificador(exigir_checksum=True)
+    assert dec.decodificar(b"16:1:01:20.5") is None
+    assert dec.decodificar(b"16:0:hola*12") is None
+    assert dec.decodificar(protocolo.con_checksum(b"16:1:01:20.5", "crc16")) is not None
+    assert len(invalidas) == 2
+
+
+def test_grupos_sin_registrar_se_cuentan_aparte():
+    dec, _ = decodificador()
+    for datos in (b"16:1:01:20.5", b"16:9:0", b"16:x7:1", b"16:9:0"):
+        dec.decodificar(datos)
+    resumen = dec.contadores.resumen()
+    assert set(resumen) == {"1", "?"}
+    assert resumen["?"]["buenas"] == 3
+
+
+# =====================================================
+# SEPARADOR DE TRAMAS Y TRAMAS BINARIAS
+# =====================================================
+def separar(trozos, **opciones):
+    separador = protocolo.SeparadorTramas(**opciones)
+    tramas = []
+    for trozo in trozos:
+        tramas += separador.agregar(trozo)
+    return separador, tramas
+
+
+@pytest.mark.parametrize("flujo, esperadas", [
+    (b"16:1:01:20.5|\x0016:1:02:50.0|", [b"16:1:01:20.5", b"16:1:02:50.0"]),
+    (b"\x00\x00basura16:3:0:90:15.0|16:3:-2|", [b"16:3:0:90:15.0", b"16:3:-2"]),
+    # Un 0x00 suelto no se come las tramas que le siguen
+    (b"16:1:01:20.5\x00|16:1:02:50.0|16:1:03:20.1|", [b"16:1:01:20.5\x00", b"16:1:02:50.0",
+                                                       b"16:1:03:20.1"]),
+    (b"Satelite listo\r\n16:0:hola|", [b"16:0:hola"]),
+])
+def test_ruido_en_ascii(flujo, esperadas):
+    # Igual si llega de una vez que byte a byte
+    for trozos in ([flujo], [flujo[i:i + 1] for i in range(len(flujo))]):
+        _, tramas = separar(trozos)
+        assert tramas == esperadas
+        assert not any(isinstance(t, protocolo.PaqueteBinario) for t in tramas)
+
+
+def test_paquetes_binarios_negociados():
+    flujo = (b"16:0:formato = 1|" + protocolo.binaria_TH(21.5, 40.0) + protocolo.binaria_radar(90, 15.5)
+             + b"16:0:hola|")
+    for trozos in ([flujo], [flujo[i:i + 3] for i in range(0, len(flujo), 3)]):
+        separador, tramas = separar(trozos, binario=True)
+        assert tramas[0] == b"16:0:formato = 1" and tramas[-1] == b"16:0:hola"
+        assert [protocolo.desempaquetar(p)[0].datos for p in tramas[1:3]] == [b"16:1:01:21.50",
+                                                                             b"16:3:0:90:15.5"]
+        assert separador.binarios == 2
+
+
+@pytest.mark.parametrize("datos", [
+    b"", b"\x00", b"\x00\x00", b"abc", b"a\x00b\x00", bytes(range(256)),
+    b"\x01" * 253, b"\x01" * 254, b"\x01" * 255, b"\x01" * 600 + b"\x00" + b"\x02" * 300,
+])
+def test_cobs_ida_y_vuelta(datos):
+    codificado = protocolo.cobs_codificar(datos)
+    assert b"\x00" not in codificado
+    assert protocolo.cobs_decodificar(codificado) == datos
+
+
+@pytest.mark.parametrize("datos", [b"\x00\x01", b"\x05ab", b"\x02a\x04bc"])
+def test_cobs_no_valido(datos):
+    assert protocolo.cobs_decodificar(datos) is None
+
+
+def paquete(trama_binaria):
+    return protocolo.PaqueteBinario(protocolo.cobs_decodificar(trama_binaria[1:-1]))
+
+
+def test_desempaquetar():
+    tramas = protocolo.desempaquetar(paquete(protocolo.binaria_TH(21.5, 40.25, None)))
+    assert [t.datos for t in tramas[:2]] == [b"16:1:01:21.50", b"16:1:02:40.25"]
+    assert tramas[2].valores[0] != tramas[2].valores[0]   # sin media: NaN
+    assert protocolo.desempaquetar(paquete(protocolo.binaria_error(2, -1)))[0].datos == b"16:2:-1"
+
+
+@pytest.mark.parametrize("danar", [
+    lambda p: p[:-1],                                 # truncado
+    lambda p: p[:2],
+    lambda p: p[:3] + bytes((p[3] ^ 0x10,)) + p[4:],  # un byte cambiado
+    lambda p: p[:-1] + bytes(((p[-1] + 1) & 0xFF,)),  # checksum cambiado
+    lambda p: bytes((0x05, p[1])) + p[2:-1] + bytes(((p[-1] + 4) & 0xFF,)),  # tipo desconocido
+    lambda p: b"",
+])
+def test_desempaquetar_paquete_danado(danar):
+    p = paquete(protocolo.binaria_TH(21.5, 40.0, 20.0))
+    assert protocolo.desempaquetar(protocolo.PaqueteBinario(danar(p))) is None
+
+
+def test_resincronizar_tras_max_trama():
+    # Más de MAX_TRAMA bytes sin '|': se descartan y se sigue en la siguiente cabecera
+    separador, tramas = separar([b"x" * 300, b"16:1:01:2", b"0.5|"])
+    assert tramas == [b"16:1:01:20.5"]
+    assert separador.descartados >= 300 and separador.resincronizaciones >= 1
+
+    # Una "trama" más larga que max_trama entre dos '|' no se entrega
+    separador, tramas = separar([b"16:0:" + b"a" * 300 + b"|16:1:02:50.0|"])
+    assert tramas == [b"16:1:02:50.0"]
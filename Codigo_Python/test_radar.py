@@ -0,0 +1,69 @@
+"""Pruebas de la rejilla de ocupación del radar (radar.py)."""
+
+import math
+
+import numpy as np
+import pytest
+
+from radar import ALCANCE_BASE, EstadoRadar, RejillaOcupacion, alcance_rejilla
+
+
+def test_alcance_sigue_a_la_escala():
+    assert alcance_rejilla(1) == ALCANCE_BASE
+    assert alcance_rejilla(30) == 2 * ALCANCE_BASE
+    assert alcance_rejilla(50) == 2 * ALCANCE_BASE
+    assert alcance_rejilla(51) == 4 * ALCANCE_BASE
+    for escala in range(1, 2000, 7):
+        alcance = alcance_rejilla(escala)
+        assert escala <= alcance < 2 * escala or alcance == ALCANCE_BASE
+
+
+def test_escala_por_defecto_con_celdas_pequenas():
+    estado = EstadoRadar(7, 30)
+    rejilla = estado.rejilla
+    visibles = np.count_nonzero(rejilla.bordes_distancia[1:] <= 30)
+    assert visibles >= rejilla.n_distancias // 2
+
+
+def test_se_desvanece_sin_ecos_nuevos():
+    rejilla = RejillaOcupacion(max_distancia=50.0, vida=30.0)
+    rejilla.agregar(0.0, 20.0, t=0.0)
+    anterior = rejilla.ocupacion(t=0.0).max()
+    for t in range(10, 300, 10):
+        actual = rejilla.ocupacion(t=float(t)).max()
+        assert actual < anterior
+        anterior = actual
+    assert anterior < 0.001
+
+
+def test_cambiar_alcance_conserva_los_ecos():
+    rejilla = RejillaOcupacion(max_distancia=50.0)
+    rng = np.random.default_rng(0)
+    for _ in range(500):
+        rejilla.agregar(rng.uniform(-np.pi / 2, np.pi / 2), rng.uniform(0.0, 50.0), t=0.0)
+    total = rejilla.ocupacion(t=0.0)
+    ecos = -np.log1p(-total).sum()
+
+    # Al doblar el alcance las celdas se juntan de dos en dos: no se pierde nada
+    rejilla.cambiar_alcance(100.0)
+    assert rejilla.bordes_distancia[-1] == 100.0
+    assert -np.log1p(-rejilla.ocupacion(t=0.0)).sum() == pytest.approx(ecos)
+    assert not rejilla.ocupacion(t=0.0)[:, rejilla.n_distancias // 2:].any()
+
+    # Al reducirlo solo se pierde lo que queda fuera del alcance nuevo
+    rejilla.cambiar_alcance(25.0)
+    assert -np.log1p(-rejilla.ocupacion(t=0.0)).sum() < ecos
+
+
+def test_fijar_escala_rehace_la_rejilla():
+    estado = EstadoRadar(7, 30)
+    estado.agregar_punto(0.0, 20.0, "")
+    version = estado.version
+    estado.fijar_escala(120)
+    assert estado.version == version + 1
+    bordes, ocupacion = estado.ocupacion()
+    assert bordes[-1] == alcance_rejilla(120)
+    # El eco sigue en la celda que contiene 20 cm
+    i, j = np.unravel_index(np.argmax(ocupacion), ocupacion.shape)
+    assert bordes[j] <= 20.0 < bordes[j + 1]
+    assert not math.isnan(ocupacion.max())
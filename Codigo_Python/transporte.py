@@ -0,0 +1,405 @@
+"""
+Transporte asíncrono (asyncio) entre la estación de Tierra y el puerto serie.
+
+Un único bucle de eventos, en su propio hilo, tiene dos tareas:
+    - lectura: lee todos los bytes disponibles, separa las tramas por '|'
+      (resincronizando en la cabecera "16:") y los paquetes binarios entre
+      0x00, y los entrega uno a uno a al_trama(bytes);
+    - escritura: saca los comandos de una cola y los escribe de uno en uno.
+Así recepción y envío nunca compiten por el puerto y la GUI solo encola
+(enviar() se puede llamar desde cualquier hilo).
+
+El acceso al puerto se hace con un backend intercambiable:
+    BackendSerial   -> puerto serie real (pyserial)
+    BackendPTY      -> pseudoterminal (para conectar un simulador externo)
+    BackendLoopback -> en memoria, dentro del propio proceso (pruebas y carga)
+    BackendSimulado -> satélite simulado dentro del proceso (simulador.py)
+    BackendGrabacion -> reproducción de una grabación (grabacion.py)
+
+Un backend puede devolver en leer(), en lugar de bytes, una lista de
+(instante, trama) ya separadas (BackendGrabacion): cada trama se entrega
+con t_trama = su instante de recepción original, que la estación usa como
+reloj (nucleo.EstacionTierra.ahora) para que la reproducción conserve los
+tiempos de la grabación.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from protocolo import SeparadorTramas
+
+TAM_LECTURA = 4096
+
+
+# =====================================================
+# BACKENDS
+# =====================================================
+class BackendSerial:
+    """
+    Puerto serie real con pyserial. Las llamadas bloqueantes van a hilos propios.
+
+    Al abrir el puerto (DTR) el Arduino se reinicia y durante el arranque
+    del bootloader lo que se le escribe se pierde. En vez de esperar un
+    tiempo fijo, la lectura empieza en seguida y la placa se da por lista
+    en cuanto llegan los primeros bytes (el "Estación de tierra lista..."
+    del setup() o la primera trama 16:). Las escrituras esperan a ese
+    momento, como mucho espera_reinicio segundos.
+
+    Con reiniciar=False el puerto se abre sin activar DTR y la placa no se
+    reinicia (reconexión a mitad de un pase): se da por lista al abrir. En
+    Linux el driver puede activar DTR al abrir igualmente (HUPCL).
+
+    t_abierto y t_listo (perf_counter) quedan para el informe de arranque.
+    """
+
+    def __init__(self, puerto, baudios=9600, espera_reinicio=2.0, reiniciar=True):
+        self.puerto = puerto
+        self.baudios = baudios
+        self.espera_reinicio = espera_reinicio
+        self.reiniciar = reiniciar
+        self.com = None
+        self.t_abierto = None
+        self.t_listo = None
+        self._listo = None
+        self._hilo_lectura = None
+        self._hilo_escritura = None
+
+    async def abrir(self):
+        import serial
+        self._hilo_lectura = ThreadPoolExecutor(max_workers=1)
+        self._hilo_escritura = ThreadPoolExecutor(max_workers=1)
+        self._listo = asyncio.Event()
+        self.t_listo = None
+        com = serial.Serial(None, self.baudios, timeout=0.1)
+        com.port = self.puerto
+        if not self.reiniciar:
+            com.dtr = False
+        com.open()
+        self.com = com
+        self.t_abierto = time.perf_counter()
+        if self.reiniciar:
+            asyncio.get_running_loop().call_later(self.espera_reinicio, self._sin_respuesta)
+        else:
+            self._marcar_listo()
+
+    def _marcar_listo(self):
+        if not self._listo.is_set():
+            self.t_listo = time.perf_counter()
+            self._listo.set()
+
+    def _sin_respuesta(self):
+        if not self._listo.is_set():
+            logging.warning("La placa no ha enviado nada en %.1f s tras abrir %s; se envía igualmente",
+                            self.espera_reinicio, self.puerto)
+            self._marcar_listo()
+
+    @property
+    def listo(self):
+        """True cuando la placa ya ha arrancado y se le puede escribir."""
+        return self._listo is not None and self._listo.is_set()
+
+    def _leer_bloqueante(self):
+        datos = self.com.read(1)
+        if datos and self.com.in_waiting:
+            datos += self.com.read(self.com.in_waiting)
+        return datos
+
+    async def leer(self):
+        loop = asyncio.get_running_loop()
+        datos = await loop.run_in_executor(self._hilo_lectura, self._leer_bloqueante)
+        if datos and not self._listo.is_set():
+            self._marcar_listo()   # el sketch ya está en marcha
+        return datos
+
+    async def escribir(self, datos):
+        if not self._listo.is_set():
+            await self._listo.wait()
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._hilo_escritura, self.com.write, datos)
+
+    def cerrar(self):
+        if self.com is not None:
+            self.com.close()
+        for hilo in (self._hilo_lectura, self._hilo_escritura):
+            if hilo is not None:
+                hilo.shutdown(wait=False)
+
+
+class BackendPTY:
+    """
+    Pseudoterminal (solo POSIX). La estación usa el extremo maestro; el
+    esclavo (ruta_esclavo) queda libre para conectar un simulador o un
+    programa externo como si fuera el Arduino.
+    """
+
+    def __init__(self):
+        self.maestro = None
+        self.esclavo = None
+        self.ruta_esclavo = None
+
+    async def abrir(self):
+        import tty
+        self.maestro, self.esclavo = os.openpty()
+        tty.setraw(self.esclavo)   # sin eco ni traducción de fin de línea
+        os.set_blocking(self.maestro, False)
+        self.ruta_esclavo = os.ttyname(self.esclavo)
+        logging.info("PTY abierto, extremo para el simulador: %s", self.ruta_esclavo)
+
+    async def _esperar(self, para_escribir):
+        loop = asyncio.get_running_loop()
+        listo = loop.create_future()
+        if para_escribir:
+            loop.add_writer(self.maestro, listo.set_result, None)
+        else:
+            loop.add_reader(self.maestro, listo.set_result, None)
+        try:
+            await listo
+        finally:
+            if para_escribir:
+                loop.remove_writer(self.maestro)
+            else:
+                loop.remove_reader(self.maestro)
+
+    async def leer(self):
+        while True:
+            try:
+                return os.read(self.maestro, TAM_LECTURA)
+            except BlockingIOError:
+                await self._esperar(False)
+
+    async def escribir(self, datos):
+        vista = memoryview(datos)
+        while vista:
+            try:
+                escritos = os.write(self.maestro, vista)
+                vista = vista[escritos:]
+            except BlockingIOError:
+                await self._esperar(True)
+
+    def cerrar(self):
+        for fd in (self.maestro, self.esclavo):
+            if fd is not None:
+                os.close(fd)
+
+
+class BackendLoopback:
+    """
+    Backend en memoria. Lo que se inyecta con inyectar() llega a la estación
+    como si viniera del puerto; lo que la estación escribe se pasa a
+    al_escribir(datos) (si se ha definido) y se guarda en `escritos`.
+    """
+
+    def __init__(self, al_escribir=None):
+        self.al_escribir = al_escribir
+        self.escritos = []
+        self._cola = None
+        self._loop = None
+
+    async def abrir(self):
+        self._loop = asyncio.get_running_loop()
+        self._cola = asyncio.Queue()
+
+    def inyectar(self, datos):
+        """Pone bytes en la entrada de la estación. Seguro desde cualquier hilo."""
+        self._loop.call_soon_threadsafe(self._cola.put_nowait, bytes(datos))
+
+    async def leer(self):
+        datos = await self._cola.get()
+        # Juntamos todo lo pendiente en una sola lectura, como haría un puerto real
+        while not self._cola.empty():
+            datos += self._cola.get_nowait()
+        return datos
+
+    async def escribir(self, datos):
+        self.escritos.append(datos)
+        if self.al_escribir is not None:
+            self.al_escribir(datos)
+
+    def cerrar(self):
+        pass
+
+
+def crear_backend(puerto, baudios=9600):
+    """
+    Elige el backend según el nombre del puerto:
+    "loopback" -> BackendLoopback, "pty" -> BackendPTY,
+    "simulador" -> satélite simulado en tiempo real (simulador.py),
+    "grabacion:<ruta>[@velocidad][#estacion]" -> reproduce una grabación (grabacion.py),
+    cualquier otro -> BackendSerial.
+    """
+    if puerto == "simulador":
+        from simulador import BackendSimulado
+        return BackendSimulado()
+    if puerto.startswith("grabacion:"):
+        from grabacion import BackendGrabacion
+        resto, _, estacion = puerto[len("grabacion:"):].partition("#")
+        ruta, _, velocidad = resto.partition("@")
+        return BackendGrabacion(ruta, float(velocidad) if velocidad else 1.0,
+                                estacion=int(estacion) if estacion else None)
+    if puerto == "loopback":
+        return BackendLoopback()
+    if puerto == "pty":
+        return BackendPTY()
+    return BackendSerial(puerto, baudios)
+
+
+# =====================================================
+# TRANSPORTE
+# =====================================================
+class TransporteAsync:
+    """
+    Lector de tramas y cola única de escritura sobre un backend.
+
+    al_trama(bytes) recibe cada trama sin el '|' final (o un
+    protocolo.PaqueteBinario) y se llama desde el hilo del bucle de
+    eventos. al_cerrar() se llama si el backend falla.
+    Las tramas se separan con un protocolo.SeparadorTramas (resincroniza
+    tras basura y limita la longitud); separador.al_resincronizar(trama)
+    avisa de cada trama recuperada.
+
+    lecturas, bytes_leidos, tiempo_espera (s esperando datos del puerto) y
+    tiempo_proceso (s procesando tramas) se acumulan para metricas.py;
+    t_primeros_datos (perf_counter) es la llegada de los primeros bytes.
+    t_trama es el instante (unix) de la última trama reproducida, o None
+    si el backend es en vivo.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.al_trama = None
+        self.al_cerrar = None
+        self.separador = SeparadorTramas()
+        self.activo = False
+        self._loop = None
+        self._hilo = None
+        self._cola_tx = None
+        self._tareas = []
+        self._listo = threading.Event()
+        self.lecturas = 0
+        self.bytes_leidos = 0
+        self.tiempo_espera = 0.0
+        self.tiempo_proceso = 0.0
+        self.t_primeros_datos = None
+        self.t_trama = None
+
+    @property
+    def pendientes_envio(self):
+        """Comandos en la cola de escritura."""
+        return self._cola_tx.qsize() if self._cola_tx is not None else 0
+
+    # -------------------------
+    # Ciclo de vida
+    # -------------------------
+    def iniciar_en_hilo(self, timeout=None):
+        """Arranca el bucle de eventos en un hilo propio y abre el backend."""
+        if self._hilo is not None:
+            return
+        self._loop = asyncio.new_event_loop()
+        self._hilo = threading.Thread(target=self._loop.run_forever,
+                                      name="transporte", daemon=True)
+        self._hilo.start()
+        asyncio.run_coroutine_threadsafe(self._arrancar(), self._loop)
+        self._listo.wait(timeout)
+
+    async def _arrancar(self):
+        self._cola_tx = asyncio.Queue()
+        self.activo = True
+        self._listo.set()
+        try:
+            await self.backend.abrir()
+        except Exception as e:
+            print("Error al abrir el puerto:", e)
+            logging.error("Error al abrir el puerto: %s", e)
+            self._terminar()
+            return
+        self._tareas = [asyncio.ensure_future(self._leer_tramas()),
+                        asyncio.ensure_future(self._escribir_cola())]
+
+    def detener(self):
+        if self._loop is None:
+            return
+        self._loop.call_soon_threadsafe(self._terminar)
+
+    def _terminar(self):
+        estaba_activo = self.activo
+        self.activo = False
+        for tarea in self._tareas:
+            tarea.cancel()
+        self.backend.cerrar()
+        self._loop.call_soon(self._loop.stop)
+        # Permite volver a arrancar el transporte con iniciar_en_hilo()
+        self._hilo = None
+        self._listo.clear()
+        if estaba_activo and self.al_cerrar is not None:
+            self.al_cerrar()
+
+    # -------------------------
+    # Envío
+    # -------------------------
+    def enviar(self, datos):
+        """Encola bytes para enviar. Seguro desde cualquier hilo; nunca bloquea."""
+        if self._loop is None or not self.activo:
+            logging.warning("Transporte no iniciado, comando descartado: %s", datos)
+            return
+        self._loop.call_soon_threadsafe(self._cola_tx.put_nowait, bytes(datos))
+
+    async def _escribir_cola(self):
+        while True:
+            datos = await self._cola_tx.get()
+            try:
+                await self.backend.escribir(datos)
+            except Exception as e:
+                print("Error al enviar:", e)
+                logging.error("Error al enviar %s: %s", datos, e)
+
+    # -------------------------
+    # Recepción
+    # -------------------------
+    async def _leer_tramas(self):
+        self.separador.vaciar()
+        while True:
+            t_ini = time.perf_counter()
+            try:
+                datos = await self.backend.leer()
+            except asyncio.CancelledError:
+                raise
+            except EOFError as e:
+                # Fin de una fuente finita (p. ej. una grabación reproducida)
+                print(e)
+                logging.info("%s", e)
+                self._terminar()
+                return
+            except Exception as e:
+                print("Error en recepción:", e)
+                logging.error("Error en recepción: %s", e)
+                self._terminar()
+                return
+            t_datos = time.perf_counter()
+            self.tiempo_espera += t_datos - t_ini
+            if not datos:
+                continue
+            if self.t_primeros_datos is None:
+                self.t_primeros_datos = t_datos
+            self.lecturas += 1
+            if isinstance(datos, list):
+                # Tramas ya separadas, cada una con el instante en que se grabó
+                for self.t_trama, trama in datos:
+                    self.bytes_leidos += len(trama) + 1
+                    self._entregar(trama)
+            else:
+                self.bytes_leidos += len(datos)
+                # Todas las tramas completas de esta lectura; lo que queda es una trama a medias
+                for trama in self.separador.agregar(datos):
+                    self._entregar(trama)
+            self.tiempo_proceso += time.perf_counter() - t_datos
+
+    def _entregar(self, trama):
+        if self.al_trama is not None:
+            try:
+                self.al_trama(trama)
+            except Exception:
+                logging.exception("Error procesando la trama %r", trama)